@@ -0,0 +1,159 @@
+# Pré-cálculo em segundo plano dos números caros (painel, horas por funcionário, fechamento do mês)
+#
+# Cada métrica registrada tem uma função de cálculo, um intervalo de
+# atualização e uma validade máxima. Uma thread do próprio processo (ou o
+# comando "flask executar-agendador", num processo separado) recalcula as
+# métricas cujo intervalo passou e grava o resultado com a hora do cálculo;
+# as requisições só leem o valor gravado. Se o valor gravado for mais velho
+# que a validade (agendador parado, banco recém-criado), obter() recalcula
+# na hora, na própria requisição.
+#
+# Na virada do mês, as tarefas de fechamento rodam uma vez para o mês que
+# terminou. A marca de fechamento também é gravada, então reiniciar o
+# processo não repete o trabalho; com vários processos, duas execuções
+# simultâneas são possíveis, por isso as tarefas precisam ser idempotentes.
+import threading
+import time
+from collections import namedtuple
+from datetime import date, datetime
+
+Metrica = namedtuple('Metrica', 'nome calcular intervalo validade chaves')
+
+FECHAMENTO = 'fechamento_mes'  # Nome das marcas de fechamento gravadas
+
+
+def idade(calculado_em, agora=None):
+    return ((agora or datetime.utcnow()) - calculado_em).total_seconds()
+
+
+def mes_anterior(dia):
+    return (dia.year - 1, 12) if dia.month == 1 else (dia.year, dia.month - 1)
+
+
+class Agendador:
+    def __init__(self, carregar, gravar, app=None, passo=1.0):
+        self.carregar = carregar  # (nome, chave) -> (valor, calculado_em) ou None
+        self.gravar = gravar  # (nome, chave, valor, calculado_em)
+        self.app = app
+        self.passo = passo  # Segundos entre duas verificações da thread
+        self.metricas = {}
+        self.fechamentos = []
+        self.execucoes = 0
+        self.falhas = 0
+        self.ultimo_erro = None
+        self._proximas = {}  # Nome -> instante (monotonic) do próximo cálculo
+        self._mes_fechado = None
+        self._thread = None
+        self._trava = threading.Lock()
+        self._parar = threading.Event()
+
+    def registrar(self, nome, calcular, intervalo, validade, chaves=None):
+        """calcular(chave) devolve um valor serializável em JSON; chaves() lista as chaves mantidas pela thread."""
+        self.metricas[nome] = Metrica(nome, calcular, intervalo, validade, chaves or (lambda: ['']))
+
+    def ao_fechar_mes(self, tarefa):
+        """Registra tarefa(ano, mes), chamada uma vez quando o mês termina; o retorno vai para a marca gravada."""
+        self.fechamentos.append(tarefa)
+        return tarefa
+
+    def obter(self, nome, chave='', validade=None):
+        """Devolve (valor, calculado_em), recalculando se o valor gravado passou da validade."""
+        metrica = self.metricas[nome]
+        validade = metrica.validade if validade is None else validade
+        gravado = self.carregar(nome, chave)
+        if gravado is not None and idade(gravado[1]) <= validade:
+            return gravado
+        return self._calcular(metrica, chave)
+
+    def recalcular(self, nome=None):
+        """Recalcula agora uma métrica (ou todas) em todas as suas chaves; devolve quantos valores gravou."""
+        metricas = [self.metricas[nome]] if nome else list(self.metricas.values())
+        total = 0
+        for metrica in metricas:
+            for chave in metrica.chaves():
+                self._calcular(metrica, chave)
+                total += 1
+            self._proximas[metrica.nome] = time.monotonic() + metrica.intervalo
+        return total
+
+    def _calcular(self, metrica, chave):
+        valor, calculado_em = metrica.calcular(chave), datetime.utcnow()
+        self.gravar(metrica.nome, chave, valor, calculado_em)
+        return valor, calculado_em
+
+    def fechar_mes(self, hoje=None):
+        """Roda as tarefas de fechamento do mês anterior a hoje, se ainda não rodaram."""
+        ano, mes = mes_anterior(hoje or date.today())
+        chave = f'{ano}-{mes:02d}'
+        if self._mes_fechado == chave:
+            return False
+        executou = False
+        if self.carregar(FECHAMENTO, chave) is None:
+            resultado = {tarefa.__name__: tarefa(ano, mes) for tarefa in self.fechamentos}
+            self.gravar(FECHAMENTO, chave, resultado, datetime.utcnow())
+            executou = True
+        self._mes_fechado = chave
+        return executou
+
+    def executar_pendentes(self):
+        """Uma passada: fechamento do mês, se virou, e as métricas cujo intervalo venceu."""
+        with self.app.app_context():
+            if self._tentar(self.fechar_mes):
+                self._proximas.clear()  # Mês novo: recalcula tudo já
+            agora = time.monotonic()
+            for metrica in list(self.metricas.values()):
+                if self._proximas.get(metrica.nome, 0) <= agora:
+                    self._tentar(self.recalcular, metrica.nome)
+                    self._proximas[metrica.nome] = agora + metrica.intervalo
+
+    def _tentar(self, funcao, *args):
+        try:
+            resultado = funcao(*args)
+            self.execucoes += 1
+            return resultado
+        except Exception as erro:
+            self.falhas += 1
+            self.ultimo_erro = f'{type(erro).__name__}: {erro}'
+            self.app.logger.exception('agendador: falha em %s%s', funcao.__name__, args)
+            return None
+
+    def executar(self):
+        """Laço do agendador, até encerrar(); usado pela thread e pelo processo separado."""
+        while not self._parar.is_set():
+            self.executar_pendentes()
+            self._parar.wait(self.passo)
+
+    def iniciar(self):
+        if self._thread is not None:
+            return
+        with self._trava:
+            if self._thread is None:
+                self._thread = threading.Thread(target=self.executar, name='agendador', daemon=True)
+                self._thread.start()
+
+    def encerrar(self):
+        self._parar.set()
+        if self._thread is not None:
+            self._thread.join()
+
+    def estado(self):
+        estado = {
+            'thread_ativa': self._thread is not None and self._thread.is_alive(),
+            'execucoes': self.execucoes,
+            'falhas': self.falhas,
+            'ultimo_erro': self.ultimo_erro,
+            'mes_fechado': self._mes_fechado,
+            'metricas': {},
+        }
+        for metrica in self.metricas.values():
+            valores = {}
+            for chave in metrica.chaves():
+                gravado = self.carregar(metrica.nome, chave)
+                segundos = idade(gravado[1]) if gravado else None
+                valores[chave] = {
+                    'calculado_em': gravado[1].isoformat() + 'Z' if gravado else None,
+                    'idade_segundos': round(segundos, 1) if gravado else None,
+                    'vencido': gravado is None or segundos > metrica.validade,
+                }
+            estado['metricas'][metrica.nome] = {'intervalo': metrica.intervalo, 'validade': metrica.validade, 'chaves': valores}
+        return estado
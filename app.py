@@ -1,19 +1,93 @@
-from flask import Flask, render_template, redirect, url_for, request, flash, abort
+from flask import Flask, render_template, redirect, url_for, request, flash, abort, jsonify
 from flask_sqlalchemy import SQLAlchemy
 from flask_login import LoginManager, login_user, logout_user, login_required, UserMixin, current_user
-from werkzeug.security import generate_password_hash, check_password_hash
-from datetime import datetime as dt, timedelta
-import pdfkit
-from flask import make_response
+from datetime import timedelta, timezone
+from flask import make_response, send_file, send_from_directory, Response, stream_with_context
+from markupsafe import Markup
 from werkzeug.utils import secure_filename
+from werkzeug.http import is_resource_modified
+from concurrent.futures import ProcessPoolExecutor, as_completed, TimeoutError
+import base64
+import hashlib
+import click
+import json
 import os
+import time
+import zipfile
+from apuracao import apurar, ColunasPonto, Totais
+from renderizacao import FilaPdf, FilaCheia
+from cache_pdf import CachePdf
+from cache_ttl import CacheTTL
+from gravacao_lote import FilaGravacao
+from banco import opcoes_engine, aplicar_perfil, iniciar_escrita
+from exportacao import linhas_ponto, gerar_csv, gerar_xlsx
+from importacao import ler_funcionarios, escrever_relatorio, HashSenhas, ErroImportacao
+from rescisao import ColunasRescisao, calcular_rescisoes, CABECALHO as CABECALHO_RESCISAO
+from regras_folha import TabelasFolha
+from imagens_aviso import ImagensAviso, ImagemInvalida
+from cache_fragmentos import CacheFragmentos
+from metricas import Metricas
+from agendador import Agendador
+from credenciais import Credenciais, ServidorOcupado
+from arquivo_ponto import ParticoesPonto
+from collections import namedtuple
 
 CHAVE_SECRETA_ADMIN = 'admin@1234'
 
 app = Flask(__name__)
 app.config['SECRET_KEY'] = 'sua-chave-secreta-aqui'
-app.config['SQLALCHEMY_DATABASE_URI'] = 'sqlite:///database.db'
+app.config['SQLALCHEMY_DATABASE_URI'] = os.environ.get('DATABASE_URL', 'sqlite:///database.db')  # Aceita postgresql://
+app.config['BANCO_PERFIL'] = os.environ.get('BANCO_PERFIL', 'producao')  # 'producao' (WAL, pool) ou 'padrao'
+app.config['BANCO_POOL_TAMANHO'] = 10  # Conexões mantidas abertas
+app.config['BANCO_POOL_EXTRA'] = 20  # Conexões extras em picos
+app.config['PDF_RENDERIZADOR'] = 'wkhtmltopdf'  # 'wkhtmltopdf' ou 'reportlab'
+app.config['WKHTMLTOPDF'] = r'C:/Arquivos de Programas/wkhtmltopdf/bin/wkhtmltopdf.exe'
+app.config['PDF_PROCESSOS'] = 2  # Processos geradores de PDF
+app.config['PDF_FILA_MAXIMA'] = 100  # PDFs pendentes antes de recusar novos pedidos
+app.config['PDF_CACHE_TAMANHO'] = 512 * 1024 * 1024  # Limite do cache de PDFs em disco, em bytes
+app.config['PDF_TRABALHOS_PASTA'] = os.path.join(app.instance_path, 'pdf_trabalhos')  # Estado dos PDFs em geração, visto por todos os processos
+app.config['USUARIOS_CACHE_MAXIMO'] = 4096  # Usuários logados mantidos no cache de sessão
+app.config['USUARIOS_CACHE_VALIDADE'] = 60  # Segundos até reler do banco os dados do usuário logado
+app.config['PONTO_LOTE_MAXIMO'] = 200  # Registros de ponto gravados por commit
+app.config['PONTO_INTERVALO'] = 0.005  # Espera máxima (s) para completar um lote de registros
+app.config['PONTO_ESPERA'] = 10  # Tempo máximo (s) que a requisição aguarda a gravação
+app.config['IMPORTACAO_PROCESSOS'] = None  # Processos do hash das senhas importadas pela web (None = número de CPUs)
+app.config['FOLHA_TABELAS'] = os.environ.get('FOLHA_TABELAS')  # JSON com as tabelas da folha; sem ele, as padrão
+app.config['UPLOAD_FOLDER'] = os.environ.get('UPLOAD_FOLDER', os.path.join(app.instance_path, 'avisos'))  # Imagens do mural
+app.config['AVISO_IMAGEM_MAXIMO'] = 5 * 1024 * 1024  # Tamanho máximo de uma imagem de aviso, em bytes
+app.config['AVISO_IMAGEM_LARGURAS'] = (480, 960)  # Larguras das variantes WebP geradas para o mural
+app.config['FRAGMENTOS_BACKEND'] = os.environ.get('FRAGMENTOS_BACKEND', 'memoria')  # 'memoria' ou 'arquivo'
+app.config['FRAGMENTOS_PASTA'] = os.path.join(app.instance_path, 'fragmentos')  # Versões dos fragmentos (todos os processos) e itens do backend 'arquivo'
+app.config['FRAGMENTOS_VALIDADE'] = 3600  # Segundos que um trecho do mural vale sem invalidação
+app.config['FRAGMENTOS_VALIDADE_PAINEL'] = 60  # Estatísticas do painel: atualização por minuto
+app.config['PERFIL_PASTA'] = os.path.join(app.instance_path, 'perfis')  # Perfis cProfile pedidos com X-Perfil
+app.config['METRICAS_TOKEN'] = os.environ.get('METRICAS_TOKEN')  # Permite ao Prometheus ler /admin/metrics sem login
+app.config['AGENDADOR_THREAD'] = os.environ.get('AGENDADOR_THREAD', '1') == '1'  # '0' quando "flask executar-agendador" roda à parte
+app.config['PONTO_ANOS_QUENTES'] = 2  # Anos na tabela ponto (o corrente e o anterior); os mais antigos vão para ponto_AAAA
+app.config['PONTO_ARQUIVAR_AUTOMATICO'] = os.environ.get('PONTO_ARQUIVAR_AUTOMATICO') == '1'  # '1' arquiva no fechamento do mês (agendador); sem ele, só "flask arquivar-ponto"
+app.config['SENHA_METODO'] = os.environ.get('SENHA_METODO', 'scrypt:32768:8:1')  # Método e custo do hash das senhas (Werkzeug)
+app.config['LOGIN_LIMITE_IP'] = (20, 10)  # Tentativas de login por IP: (seguidas, repostas por minuto)
+app.config['LOGIN_LIMITE_CONTA'] = (5, 1)  # Tentativas erradas por conta, de qualquer IP: (seguidas, repostas por minuto)
+app.config['LOGIN_VERIFICACOES_SIMULTANEAS'] = max(1, (os.cpu_count() or 2) // 2)  # Hashes verificados ao mesmo tempo
+app.config['LOGIN_ESPERA_VERIFICACAO'] = 2  # Segundos na fila por uma verificação antes de responder 503
+app.config['ASGI_TRABALHADORES'] = int(os.environ.get('ASGI_TRABALHADORES', os.cpu_count() or 1))  # Processos de "python asgi.py"
+app.config['ASGI_THREADS_WSGI'] = 32  # Threads que atendem as rotas síncronas no modo ASGI
+app.config['AGENDADOR_METRICAS'] = {  # Números pré-calculados: (intervalo de atualização, validade máxima), em segundos
+    'painel_admin': (60, 300),
+    'horas_funcionarios': (300, 900),
+}
+app.config['SQLALCHEMY_ENGINE_OPTIONS'] = opcoes_engine(app.config)
 db = SQLAlchemy(app)
+with app.app_context():
+    aplicar_perfil(db.engine, app.config)
+    metricas = Metricas(app, db.engine)
+fila_pdf = FilaPdf(app)
+fila_pdf.ao_medir = lambda template, segundos: metricas.observar('portal_pdf_segundos', segundos, template=template)
+cache_pdf = CachePdf(app)
+tabelas_folha = TabelasFolha.carregar(app.config['FOLHA_TABELAS'])
+imagens_aviso = ImagensAviso(app)
+cache_fragmentos = CacheFragmentos(app)
+credenciais = Credenciais(app)
 
 login_manager = LoginManager()
 login_manager.login_view = 'login'
@@ -33,18 +107,135 @@ class User(UserMixin, db.Model):
     data_admissao = db.Column(db.Date, default=date.today) # Data de admissão
     data_demissao = db.Column(db.Date)  # Data de demissão, se aplicável
 
+    __table_args__ = (
+        db.Index('ix_user_nome_id', 'nome', 'id'),  # Paginação da lista de funcionários
+        db.Index('ix_user_cpf', 'cpf'),
+        db.Index('ix_user_email_minusculo', db.func.lower(email)),  # Login e cadastros comparam o email sem diferenciar maiúsculas
+    )
+
+# Usuário pelo email, sem diferenciar maiúsculas de minúsculas
+def buscar_por_email(email):
+    return User.query.filter(db.func.lower(User.email) == email.strip().lower()).first()
+
 from datetime import datetime
 class Aviso(db.Model):
+    __table_args__ = (db.Index('ix_aviso_criado_em_id', 'criado_em', 'id'),)  # Paginação do mural
+
     id = db.Column(db.Integer, primary_key=True)
     titulo = db.Column(db.String(100), nullable=False)
     conteudo = db.Column(db.Text, nullable=False)
     imagem = db.Column(db.String(150))
-    criado_em = db.Column(db.DateTime, default=datetime.datetime.utcnow)
+    criado_em = db.Column(db.DateTime, default=datetime.utcnow)
+
+# Paginação por chave (keyset): a próxima página começa depois da última linha da anterior,
+# então o custo não cresce com o número da página. O cursor é opaco para o cliente.
+POR_PAGINA = 50
+POR_PAGINA_MAXIMO = 200
+
+def codificar_cursor(valores):
+    texto = json.dumps([v.isoformat() if isinstance(v, (date, datetime)) else v for v in valores])
+    return base64.urlsafe_b64encode(texto.encode()).decode().rstrip('=')
+
+def decodificar_cursor(cursor, chaves):
+    try:
+        valores = json.loads(base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4)))
+    except ValueError:
+        abort(400)
+    if not isinstance(valores, list) or len(valores) != len(chaves):
+        abort(400)
+    return [
+        datetime.fromisoformat(v) if isinstance(chave.type, db.DateTime) and v is not None else v
+        for chave, v in zip(chaves, valores)
+    ]
+
+def paginar(consulta, chaves, decrescente=False):
+    consulta, limite = consulta_pagina(consulta, chaves, decrescente)
+    return fechar_pagina(db.session.execute(consulta).all(), chaves, limite)
+
+# Consulta da página pedida (uma linha a mais, para saber se há próxima) e o limite usado
+def consulta_pagina(consulta, chaves, decrescente=False):
+    cursor = request.args.get('cursor')
+    limite = max(1, min(request.args.get('limite', POR_PAGINA, type=int), POR_PAGINA_MAXIMO))  # 0 ou negativo viraria LIMIT sem fim
+
+    if cursor:
+        posicao = db.tuple_(*chaves)
+        valores = db.tuple_(*(db.literal(v, chave.type) for chave, v in zip(chaves, decodificar_cursor(cursor, chaves))))
+        consulta = consulta.where(posicao < valores if decrescente else posicao > valores)
+
+    ordem = [chave.desc() if decrescente else chave for chave in chaves]
+    return consulta.order_by(*ordem).limit(limite + 1), limite
+
+def fechar_pagina(linhas, chaves, limite):
+    proximo = None
+    if len(linhas) > limite:
+        linhas = linhas[:limite]
+        proximo = codificar_cursor([getattr(linhas[-1], chave.key) for chave in chaves])
+    return linhas, proximo
+
+def quer_json():
+    return request.args.get('formato') == 'json' or request.accept_mimetypes.best == 'application/json'
+
+# ocultas: colunas só usadas na ordenação/paginação, que não fazem parte da resposta
+def linhas_json(linhas, proximo, ocultas=()):
+    itens = [
+        {k: v.isoformat() if isinstance(v, (date, datetime)) else v for k, v in linha._asdict().items() if k not in ocultas}
+        for linha in linhas
+    ]
+    return jsonify(itens=itens, proximo=proximo)
+
+# Lista de funcionários com busca por nome, email ou CPF
+def consultar_funcionarios(*colunas):
+    consulta = db.select(User.id, User.nome, User.email, User.cpf, User.tipo, User.ativo, *colunas).where(User.tipo == 'funcionario')
+    busca = request.args.get('q', '').strip()
+    if busca:
+        padrao = f'%{busca}%'
+        consulta = consulta.where(db.or_(User.nome.ilike(padrao), User.email.ilike(padrao), User.cpf.like(padrao)))
+    return consulta
+
+# Dados do usuário logado guardados em cache entre requisições (somente leitura)
+class UsuarioSessao(UserMixin, namedtuple('UsuarioSessao', 'id nome tipo ativo')):
+    pass
+
+cache_usuarios = CacheTTL(maximo=app.config['USUARIOS_CACHE_MAXIMO'], validade=app.config['USUARIOS_CACHE_VALIDADE'])
+
+def consulta_usuario_sessao(user_id):
+    return db.select(User.id, User.nome, User.tipo, User.ativo).where(User.id == user_id)
+
+def buscar_usuario_sessao(user_id):
+    linha = db.session.execute(consulta_usuario_sessao(user_id)).first()
+    return UsuarioSessao(*linha) if linha else None
 
 # Carregar usuário pelo ID (requerido pelo Flask-Login)
 @login_manager.user_loader
 def carregar_usuario(user_id):
-    return User.query.get(int(user_id))
+    user_id = int(user_id)
+    return cache_usuarios.obter(user_id, lambda: buscar_usuario_sessao(user_id))
+
+@app.route('/admin/estatisticas/cache_usuarios')
+@login_required
+def estatisticas_cache_usuarios():
+    if current_user.tipo != 'admin':
+        abort(403)
+    return jsonify(cache_usuarios.estatisticas())
+
+# Métricas no formato do Prometheus: para administradores ou com o token de METRICAS_TOKEN
+@app.route('/admin/metrics')
+def exportar_metricas():
+    token = app.config['METRICAS_TOKEN']
+    autorizado_por_token = token and request.headers.get('Authorization') == f'Bearer {token}'
+    if not autorizado_por_token:
+        if not current_user.is_authenticated:
+            return login_manager.unauthorized()
+        if current_user.tipo != 'admin':
+            abort(403)
+    return Response(metricas.exportar(), mimetype='text/plain; version=0.0.4')
+
+@app.route('/admin/estatisticas/cache_fragmentos')
+@login_required
+def estatisticas_cache_fragmentos():
+    if current_user.tipo != 'admin':
+        abort(403)
+    return jsonify(cache_fragmentos.estatisticas())
 
 # Injetar data e hora atual nas templates
 from datetime import datetime
@@ -61,14 +252,12 @@ def dashboard():
 # Página de administração (apenas para admin)
 @app.route('/criar_admin', methods=['GET', 'POST'])
 def criar_login():
-        from werkzeug.security import generate_password_hash
-
         existente = User.query.filter_by(email='admin@gmail.com').first()
         if existente:
             flash('Administrador já existe.', 'warning')
             return redirect(url_for('login'))
         
-        admin = User(nome='Administrador', email='admin@gmail.com', senha=generate_password_hash('admin123'), tipo='admin')
+        admin = User(nome='Administrador', email='admin@gmail.com', senha=credenciais.gerar('admin123'), tipo='admin')
         db.session.add(admin)
         db.session.commit()
         return 'Administrador criado com sucesso.'
@@ -79,8 +268,10 @@ def admin():
     if current_user.tipo != 'admin':
         abort(403)
 
-    funcionarios = User.query.filter_by(tipo='funcionario').all()
-    return render_template('admin/admin.html', funcionario=funcionarios)
+    funcionarios, proximo = paginar(consultar_funcionarios(), [User.nome, User.id])
+    if quer_json():
+        return linhas_json(funcionarios, proximo)
+    return render_template('admin/admin.html', funcionarios=funcionarios, proximo=proximo)
 
 @app.route('/admin/cadastrar_admin', methods=['GET', 'POST'])
 @login_required
@@ -94,11 +285,11 @@ def cadastrar_admin():
         senha = request.form['senha']
         tipo = request.form['tipo']
 
-        if User.query.filter_by(email=email).first():
+        if buscar_por_email(email):
             flash('Email já cadastrado.', 'warning')
             return redirect(url_for('cadastrar_admin'))
         
-        novo_usuario = User(nome=nome, email=email, senha=generate_password_hash(senha), tipo=tipo)
+        novo_usuario = User(nome=nome, email=email, senha=credenciais.gerar(senha), tipo=tipo)
         db.session.add(novo_usuario)
         db.session.commit()
         flash(f'{tipo.capitalize()} cadastrado com sucesso.', 'success')
@@ -112,23 +303,22 @@ def admin_dashboard():
     if current_user.tipo != 'admin':
         abort(403)
 
-    total_funcionarios = User.query.filter_by(tipo='funcionario').count()
-    total_registros = Ponto.query.count()
+    chave = mes_corrente()
 
-    hoje = datetime.today()
-    ano, mes = hoje.year, hoje.month
-    registros = Ponto.query.filter(Ponto.data.startswith(f"{ano}-{mes:02d}")).all()
+    # Números pré-calculados pelo agendador; o cache só evita reler o banco a cada requisição
+    def carregar():
+        return estatisticas_painel(*agendador.obter('painel_admin', chave))
 
-    total_horas = timedelta()
+    estatisticas = cache_fragmentos.obter('painel_admin', (current_user.tipo, chave), carregar, app.config['FRAGMENTOS_VALIDADE_PAINEL'])
+    return responder_painel(estatisticas)
 
-    for r in registros:
-        if r.hora_entrada and r.hora_saida:
-            entrada = dt.strptime(r.hora_entrada, "%H:%M:%S")
-            saida = dt.strptime(r.hora_saida, "%H:%M:%S")
-            total_horas += (saida - entrada)
-    horas_formatadas = round(total_horas.total_seconds() / 3600, 2)
+def estatisticas_painel(valores, calculado_em):
+    return dict(valores, calculado_em=calculado_em.isoformat() + 'Z')
 
-    return render_template('admin/admin_dashboard.html', total_funcionarios=total_funcionarios, total_registros=total_registros, total_horas=horas_formatadas)
+def responder_painel(estatisticas):
+    if quer_json():
+        return jsonify(estatisticas)
+    return render_template('admin/admin_dashboard.html', **estatisticas)
 
 @app.route('/admin/avisos/criar', methods=['GET', 'POST'])
 @login_required
@@ -137,29 +327,76 @@ def criar_aviso():
         abort(403)
 
     if request.method == 'POST':
+        # Recusa antes de ler o corpo quando o envio já declara ser grande demais
+        if request.content_length and request.content_length > app.config['AVISO_IMAGEM_MAXIMO'] + 64 * 1024:
+            abort(413)
+
         titulo = request.form['titulo']
         conteudo = request.form['conteudo']
         imagem = request.files.get('imagem')
 
         nome_arquivo = None
         if imagem and imagem.filename != '':
-            nome_arquivo = secure_filename(imagem.filename)
-            caminho = os.path.join(app.config['UPLOAD_FOLDER'], nome_arquivo)
-            imagem.save(caminho)
+            try:
+                # O mural é renderizado de novo quando as variantes WebP ficarem prontas
+                nome_arquivo = imagens_aviso.salvar(imagem, ao_concluir=lambda _: cache_fragmentos.invalidar('mural'))
+            except ImagemInvalida as erro:
+                flash(f'Imagem não aceita: {erro}', 'danger')
+                return redirect(url_for('criar_aviso'))
 
         aviso = Aviso(titulo=titulo, conteudo=conteudo, imagem=nome_arquivo)
         db.session.add(aviso)
         db.session.commit()
+        cache_fragmentos.invalidar('mural')
         flash('Aviso criado com sucesso.', 'success')
-        return redirect(url_for('listar_avisos_admin'))
+        return redirect(url_for('mural'))
     
     return render_template('admin/form_aviso.html')
 
 @app.route('/avisos')
 @login_required
 def mural():
-    avisos = Aviso.query.order_by(Aviso.data_publicacao.desc()).all()
-    return render_template('mural.html', avisos=avisos)
+    consulta = consulta_mural()
+    if quer_json():
+        avisos, proximo = paginar(consulta, CHAVES_MURAL, decrescente=True)
+        return linhas_json(avisos, proximo)
+
+    # A lista renderizada fica em cache até um novo aviso ser publicado
+    def renderizar():
+        avisos, proximo = paginar(consulta, CHAVES_MURAL, decrescente=True)
+        return render_template('mural_avisos.html', avisos=avisos, proximo=proximo)
+
+    return render_template('mural.html', avisos_html=Markup(cache_fragmentos.obter('mural', partes_mural(), renderizar)))
+
+CHAVES_MURAL = [Aviso.criado_em, Aviso.id]
+
+def consulta_mural():
+    return db.select(Aviso.id, Aviso.titulo, Aviso.conteudo, Aviso.imagem, Aviso.criado_em)
+
+def partes_mural():
+    return (current_user.tipo, request.args.get('cursor', ''), request.args.get('limite', ''))
+
+# Imagens do mural: o nome é o hash do conteúdo, então podem ficar em cache para sempre
+@app.route('/avisos/imagens/<nome>')
+@login_required
+def imagem_aviso(nome):
+    response = send_from_directory(app.config['UPLOAD_FOLDER'], nome, max_age=365 * 24 * 3600)
+    response.cache_control.public = True
+    response.cache_control.immutable = True
+    return response
+
+# Imagens enviadas ficam na pasta de uploads; avisos antigos podem ter uma URL externa
+@app.template_global()
+def url_imagem_aviso(imagem):
+    if imagem.startswith(('http://', 'https://', '/')):
+        return imagem
+    return url_for('imagem_aviso', nome=imagem)
+
+@app.template_global()
+def srcset_imagem_aviso(imagem):
+    if imagem.startswith(('http://', 'https://', '/')):
+        return ''
+    return ', '.join(f"{url_for('imagem_aviso', nome=nome)} {largura}w" for nome, largura in imagens_aviso.variantes(imagem))
 
 @app.route('/admin/avisos/novo', methods=['GET', 'POST'])
 @login_required
@@ -175,6 +412,7 @@ def novo_aviso():
         aviso = Aviso(titulo=titulo, conteudo=conteudo, imagem=imagem)
         db.session.add(aviso)
         db.session.commit()
+        cache_fragmentos.invalidar('mural')
         flash('Aviso publicado com sucesso!', 'success')
         return redirect(url_for('mural'))
     
@@ -192,11 +430,11 @@ def cadastrar_funcionario():
         senha = request.form['senha']
         tipo = request.form['tipo']
 
-        if User.query.filter_by(email=email).first():
+        if buscar_por_email(email):
             flash('Email já cadastrado.', 'warning')
             return redirect(url_for('cadastrar_funcionario'))
         
-        novo_funcionario = User(nome=nome, email=email, senha=generate_password_hash(senha), tipo=tipo)
+        novo_funcionario = User(nome=nome, email=email, senha=credenciais.gerar(senha), tipo=tipo)
         db.session.add(novo_funcionario)
         db.session.commit()
         flash(f'{tipo.capitalize()} cadastrado com sucesso.', 'success')
@@ -211,35 +449,33 @@ def desligar_funcionario(id):
         abort(403)
 
     funcionario = User.query.get_or_404(id)
-    registros = Ponto.query.filter_by(user_id=funcionario.id).all()
-
-    from datetime import datetime, timedelta
+    if request.method == 'POST':
+        totais = resumir(ResumoMensal.user_id == funcionario.id)  # O valor final usa os dados de agora
+    else:
+        horas, _ = agendador.obter('horas_funcionarios')
+        totais = Totais(*horas.get(str(funcionario.id), (0, 0, 0)))
 
-    total_horas = timedelta()
-    for r in registros:
-        if r.hora_entrada and r.hora_saida:
-            entrada = datetime.strptime(r.hora_entrada, "%H:%M:%S")
-            saida = datetime.strptime(r.hora_saida, "%H:%M:%S")
-            total_horas += (saida - entrada)
+    from datetime import datetime
     
     # Geração do TRCT com valores
-    salario_base = 1940.00
-    horas_trabalhadas = total_horas.total_seconds() / 3600
-    valor_hora = salario_base / (22 * 10)
+    horas_trabalhadas = totais.horas_trabalhadas
+    valor_hora = tabelas_folha.regras_do_dia().valor_hora(funcionario.salario_mensal)
     valor_trct = round(horas_trabalhadas * valor_hora, 2)
 
     if request.method == 'POST':
         funcionario.ativo = False
         funcionario.data_demissao = datetime.today().date()
         db.session.commit()
+        cache_usuarios.invalidar(funcionario.id)
         flash(f'Funcionário {funcionario.nome} desligado. Valor do TRCT: R$ {valor_trct}', 'success')
         return redirect(url_for('funcionarios'))
     
     return render_template('admin/desligar_funcionario.html', funcionario=funcionario, total_horas=round(horas_trabalhadas, 2), valor=valor_trct)
 
 def calcular_trct(funcionario, data_demissao):
-    salario_base = funcionario.salario_mensal
-    admissao = funcionario.data_admissao
+    regras = tabelas_folha.regras_do_dia(data_demissao)
+    salario_base = regras.salario(funcionario.salario_mensal)
+    admissao = funcionario.data_admissao or data_demissao  # Sem admissão, conta como admitido no dia (como em rescisao.py)
     demissao = data_demissao
 
     # 1. Saldo de salário
@@ -257,17 +493,17 @@ def calcular_trct(funcionario, data_demissao):
     decimo_terceiro = round((salario_base / 12) * data_demissao.month, 2)
 
     # 5. Multa do FGTS
-    total_fgts = round((salario_base * 0.08) * meses_trabalhados, 2)  # Considerando 8% de FGTS
-    multa_fgts = round(total_fgts * 0.4, 2)  # 40% de multa sobre o FGTS
+    total_fgts = round((salario_base * regras.fgts) * meses_trabalhados, 2)
+    multa_fgts = round(total_fgts * regras.multa_fgts, 2)
 
     # 6. Descontos
-    desconto_inss = round(salario_base * 0.08, 2)  # 8% de INSS
-    desconto_vt = round(salario_base * 0.05, 2)  # 5% de vale transporte
+    desconto_inss = round(regras.desconto_inss(salario_base), 2)
+    desconto_vt = round(salario_base * regras.vale_transporte, 2)
 
     # 7. Total do TRCT
     total_liquido = round(saldo_salario + ferias_vencidas + ferias_proporcionais + decimo_terceiro + multa_fgts - desconto_inss - desconto_vt, 2)
     return {
-        'admissao': admissao.strftime('%d/%m/%Y'),
+        'admissao': funcionario.data_admissao.strftime('%d/%m/%Y') if funcionario.data_admissao else '-',
         'demissao': demissao.strftime('%d/%m/%Y'),
         'motivo_rescisao': "Sem justa causa",
         'saldo_salario': saldo_salario,
@@ -280,7 +516,6 @@ def calcular_trct(funcionario, data_demissao):
         'total_liquido': total_liquido
     }
 
-import pdfkit
 @app.route('/admin/funcionario/<int:id>/trct_pdf')
 @login_required
 def gerar_trct(id):
@@ -294,15 +529,130 @@ def gerar_trct(id):
         return redirect(url_for('funcionarios'))
 
     trct = calcular_trct(funcionario, funcionario.data_demissao)
+    dados_funcionario = dict(nome=funcionario.nome, email=funcionario.email, cpf=funcionario.cpf)
+
+    return servir_pdf("trct_pdf.html", dict(funcionario=dados_funcionario, trct=trct), f'TRCT_{funcionario.nome}.pdf', funcionario.id, 'trct', funcionario.data_demissao.isoformat())
+
+# Simulação de desligamento em lote: TRCT de vários funcionários na mesma data
+def simular_rescisoes(demissao, funcionarios=None):
+    consulta = (
+        db.select(User.id, User.nome, User.salario_mensal, User.data_admissao)
+        .where(User.tipo == 'funcionario', User.ativo.is_(True))
+        .order_by(User.nome, User.id)
+    )
+    if funcionarios:
+        consulta = consulta.where(User.id.in_(funcionarios))
+    linhas = db.session.execute(consulta).all()
+    nomes = {user_id: nome for user_id, nome, _, _ in linhas}
+    colunas = ColunasRescisao.de_linhas([(user_id, salario, admissao) for user_id, _, salario, admissao in linhas], demissao)
+    return calcular_rescisoes(colunas, tabelas_folha), nomes
+
+@app.route('/admin/simular_rescisao')
+@login_required
+def simular_rescisao():
+    if current_user.tipo != 'admin':
+        abort(403)
+
+    try:
+        demissao = date.fromisoformat(request.args['data']) if request.args.get('data') else datetime.today().date()
+    except ValueError:
+        abort(400)
+    rescisoes, nomes = simular_rescisoes(demissao, request.args.getlist('funcionario', type=int))
 
-    rendered_html = render_template("trct_pdf.html", funcionario=funcionario, trct=trct)
+    if quer_json():
+        itens = [dict(zip(CABECALHO_RESCISAO, linha)) for linha in rescisoes.linhas(nomes)]
+        return jsonify(data=demissao.isoformat(), funcionarios=len(rescisoes), totais=rescisoes.totais(), itens=itens)
 
-    config = pdfkit.configuration(wkhtmltopdf=r'C:/Arquivos de Programas/wkhtmltopdf/bin/wkhtmltopdf.exe')
-    pdf = pdfkit.from_string(rendered_html, False, configuration=config)
+    totais = ['TOTAL', '', '', demissao.isoformat()] + list(rescisoes.totais().values())
+    linhas = list(rescisoes.linhas(nomes)) + [totais]
+    response = Response(gerar_csv(linhas, cabecalho=CABECALHO_RESCISAO), mimetype='text/csv; charset=utf-8')
+    response.headers['Content-Disposition'] = f'attachment; filename=simulacao_rescisao_{demissao.isoformat()}.csv'
+    return response
+
+@app.cli.command('simular-rescisao')
+@click.argument('data')
+@click.option('--funcionario', 'funcionarios', multiple=True, type=int, help='Restringe a simulação a estes IDs (pode repetir).')
+@click.option('--saida', default=None, help='Arquivo CSV com o TRCT de cada funcionário.')
+@click.option('--verificar', is_flag=True, help='Confere cada resultado com calcular_trct.')
+def simular_rescisao_comando(data, funcionarios, saida, verificar):
+    """Simula o custo de desligar os funcionários ativos na data AAAA-MM-DD."""
+    demissao = date.fromisoformat(data)
+    inicio = time.perf_counter()
+    rescisoes, nomes = simular_rescisoes(demissao, list(funcionarios))
+    decorrido = time.perf_counter() - inicio
+
+    if saida:
+        with open(saida, 'wb') as arquivo:
+            for parte in gerar_csv(rescisoes.linhas(nomes), cabecalho=CABECALHO_RESCISAO):
+                arquivo.write(parte)
+
+    if verificar:
+        funcionarios_db = {f.id: f for f in db.session.execute(db.select(User).where(User.id.in_(list(nomes)))).scalars()}
+        divergentes = 0
+        for linha in rescisoes.linhas(nomes):
+            calculado = dict(zip(CABECALHO_RESCISAO, linha))
+            esperado = calcular_trct(funcionarios_db[calculado['funcionario_id']], demissao)
+            if any(calculado[verba] != esperado[verba] for verba in CABECALHO_RESCISAO[4:]):
+                divergentes += 1
+                print(f"Divergência no funcionário {calculado['funcionario_id']}: {calculado} != {esperado}")
+        if divergentes:
+            raise click.ClickException(f'{divergentes} funcionários divergem de calcular_trct.')
+        print(f'Conferido com calcular_trct: {len(rescisoes)} funcionários sem divergência.')
+
+    print(f'{len(rescisoes)} funcionários, custo total de R$ {rescisoes.total():.2f} em {decorrido * 1000:.1f} ms.')
+
+# Devolve o PDF do cache quando as entradas não mudaram; senão, gera pela fila
+def servir_pdf(template, contexto, nome_arquivo, user_id, tipo, referencia):
+    chave = cache_pdf.chave(template=template, renderizador=app.config['PDF_RENDERIZADOR'], **contexto)
+    caminho = cache_pdf.obter(user_id, tipo, referencia, chave)
+    if caminho:
+        return send_file(caminho, mimetype='application/pdf', download_name=nome_arquivo, etag=chave, conditional=True, max_age=0)
+
+    # O trabalho aponta para o arquivo do cache, então qualquer processo serve o PDF pronto
+    guardar = lambda pdf: cache_pdf.gravar(user_id, tipo, referencia, chave, pdf)
+    arquivo = cache_pdf.caminho(user_id, tipo, referencia, chave)
+    return enfileirar_pdf(template, contexto, nome_arquivo, etag=chave, ao_concluir=guardar, arquivo=arquivo)
+
+# Envia o documento para a fila de PDFs e redireciona para a página de acompanhamento
+def enfileirar_pdf(template, contexto, nome_arquivo, etag=None, ao_concluir=None, arquivo=None):
+    html = render_template(template, **contexto) if fila_pdf.renderizador.precisa_html else None
+    try:
+        trabalho = fila_pdf.enfileirar(template, contexto, current_user.id, nome_arquivo, html, etag, ao_concluir, arquivo)
+    except FilaCheia:
+        response = make_response('Muitos PDFs em geração no momento. Tente novamente em instantes.', 503)
+        response.headers['Retry-After'] = '10'
+        return response
+    return redirect(url_for('status_pdf', id=trabalho.id), code=303)
+
+def obter_trabalho_pdf(id):
+    trabalho = fila_pdf.obter(id)
+    if trabalho is None or (trabalho.user_id != current_user.id and current_user.tipo != 'admin'):
+        abort(404)
+    return trabalho
+
+@app.route('/pdf/<id>')
+@login_required
+def status_pdf(id):
+    trabalho = obter_trabalho_pdf(id)
+    download = url_for('baixar_pdf', id=id) if trabalho.status == 'concluido' else None
 
-    response = make_response(pdf)
+    if quer_json():
+        return jsonify(id=trabalho.id, status=trabalho.status, download=download)
+    return render_template('pdf_status.html', trabalho=trabalho, download=download)
+
+@app.route('/pdf/<id>/download')
+@login_required
+def baixar_pdf(id):
+    trabalho = obter_trabalho_pdf(id)
+    if trabalho.status != 'concluido':
+        abort(409)
+
+    response = make_response(trabalho.pdf)
     response.headers['Content-Type'] = 'application/pdf'
-    response.headers['Content-Disposition'] = f'inline; filename=TRCT_{funcionario.nome}.pdf'
+    response.headers['Content-Disposition'] = f'inline; filename={trabalho.nome_arquivo}'
+    if trabalho.etag:
+        response.set_etag(trabalho.etag)
+        response.make_conditional(request)
     return response
 
 # Página de login
@@ -317,16 +667,40 @@ def login():
     if request.method == 'POST':
         email = request.form['email']
         senha = request.form['senha']
-       
-        user = User.query.filter_by(email=email).first()
+        conta = email.strip().lower()
+
+        # Recusa antes de calcular qualquer hash quando o IP ou a conta passaram do limite
+        espera = credenciais.espera(request.remote_addr, conta)
+        if espera:
+            segundos = int(espera) + 1
+            flash(f'Muitas tentativas de login. Tente novamente em {segundos} segundos.', 'danger')
+            return render_template('login.html'), 429, {'Retry-After': str(segundos)}
 
-        if user and check_password_hash(user.senha, senha):
+        user = buscar_por_email(conta)
+        try:
+            # Email desconhecido também paga a verificação, para não revelar quais contas existem
+            senha_certa = credenciais.verificar(user.senha if user else None, senha)
+        except ServidorOcupado:
+            flash('Servidor ocupado. Tente novamente em instantes.', 'danger')
+            return render_template('login.html'), 503, {'Retry-After': '1'}
+
+        if senha_certa and not user.ativo:
+            # Só depois de conferir a senha, para não revelar a situação da conta a quem não a sabe
+            flash('Usuário desligado. Procure o administrador.', 'danger')
+            return render_template('login.html'), 403
+        if senha_certa:
+            novo_hash = credenciais.atualizar(user.senha, senha)
+            if novo_hash:  # Hash gravado com parâmetros antigos
+                user.senha = novo_hash
+                db.session.commit()
+            credenciais.entrou(conta)
             login_user(user)
             if user.tipo == 'admin':
                 return redirect(url_for('admin_dashboard'))
             else:
                 return redirect(url_for('dashboard'))
         else:
+            credenciais.falhou(conta)
             flash('E-Mail ou senha incorretos.', 'danger')
 
     return render_template('login.html')
@@ -339,11 +713,443 @@ def logout():
     return redirect(url_for('login'))
 
 class Ponto(db.Model):
+    __table_args__ = (db.Index('ix_ponto_user_data', 'user_id', 'data', unique=True),)  # Um registro por dia
+
     id = db.Column(db.Integer, primary_key=True)
     user_id = db.Column(db.Integer, db.ForeignKey('user.id'))
-    data = db.Column(db.String(10))
-    hora_entrada = db.Column(db.String(8))
-    hora_saida = db.Column(db.String(8))
+    data = db.Column(db.Date, nullable=False, index=True)
+    entrada = db.Column(db.Integer)  # Epoch em segundos
+    saida = db.Column(db.Integer)  # Epoch em segundos
+
+    # Horários formatados para exibição nas templates
+    @property
+    def hora_entrada(self):
+        return formatar_hora(self.entrada)
+
+    @property
+    def hora_saida(self):
+        return formatar_hora(self.saida)
+
+def formatar_hora(epoch):
+    return datetime.fromtimestamp(epoch).strftime("%H:%M:%S") if epoch is not None else None
+
+# Primeiro dia do mês e primeiro dia do mês seguinte, para consultas por intervalo
+def intervalo_mes(ano, mes):
+    inicio = date(ano, mes, 1)
+    fim = date(ano + 1, 1, 1) if mes == 12 else date(ano, mes + 1, 1)
+    return inicio, fim
+
+def filtro_mes(ano, mes):
+    inicio, fim = intervalo_mes(ano, mes)
+    return Ponto.data >= inicio, Ponto.data < fim
+
+# Anos de ponto já movidos para ponto_AAAA (ver arquivo_ponto.py)
+class PontoArquivado(db.Model):
+    __tablename__ = 'ponto_arquivado'
+
+    ano = db.Column(db.Integer, primary_key=True)
+    registros = db.Column(db.Integer, nullable=False)
+    arquivado_em = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
+
+particoes_ponto = ParticoesPonto(Ponto.__table__, app.config['PONTO_ANOS_QUENTES'])
+
+def consulta_ano_arquivado(ano):
+    return db.select(PontoArquivado.ano).where(PontoArquivado.ano == ano)
+
+# O ano, se os registros dele estão em ponto_AAAA; None se estão na tabela ponto
+def ano_arquivado(ano):
+    arquivado = particoes_ponto.conhecido(ano)
+    if arquivado is None:
+        arquivado = db.session.execute(consulta_ano_arquivado(ano)).first() is not None
+        if arquivado:
+            particoes_ponto.marcar(ano)
+    return ano if arquivado else None
+
+# Uma consulta sobre Ponto restrita a um ano, lida da tabela onde o ano está
+def rotear_ponto(consulta, ano):
+    return particoes_ponto.rotear(consulta, ano_arquivado(ano))
+
+# Apuração das horas dos registros de um mês, sem carregar objetos do ORM, com a jornada vigente nele
+def apurar_pontos(ano, mes, *criterios, ordem=None):
+    consulta = rotear_ponto(consulta_pontos(*criterios, ordem=ordem), ano)
+    return apurar(ColunasPonto.de_linhas(db.session.execute(consulta)), tabelas_folha.jornada(ano, mes))
+
+def consulta_pontos(*criterios, ordem=None):
+    consulta = db.select(Ponto.data, Ponto.entrada, Ponto.saida).where(*criterios)
+    if ordem is not None:
+        consulta = consulta.order_by(ordem)
+    return consulta
+
+# Totais de horas somados no próprio banco (GROUP BY), sem trazer os registros.
+# jornada: segundos por dia, um número ou uma expressão SQL (jornada_por_data)
+def colunas_totais(jornada):
+    trabalhadas = Ponto.saida - Ponto.entrada
+    extras = db.case((trabalhadas > jornada, trabalhadas - jornada), else_=0)
+    return (
+        db.func.coalesce(db.func.sum(trabalhadas), 0),
+        db.func.coalesce(db.func.sum(extras), 0),
+        db.func.count(Ponto.id),
+    )
+
+# Jornada vigente na data de cada registro: um CASE pelas vigências das tabelas da folha em que ela muda
+def jornada_por_data(data):
+    jornadas = tabelas_folha.jornadas()
+    if len(jornadas) == 1:
+        return jornadas[0][1]
+    faixas = [(data < inicio, jornada) for (_, jornada), (inicio, _) in zip(jornadas, jornadas[1:])]
+    return db.case(*faixas, else_=jornadas[-1][1])
+
+# Resumo mensal mantido a cada registro de ponto, para consultas sem varrer a tabela ponto
+class ResumoMensal(db.Model):
+    __tablename__ = 'resumo_mensal'
+
+    user_id = db.Column(db.Integer, db.ForeignKey('user.id'), primary_key=True)
+    ano = db.Column(db.Integer, primary_key=True)
+    mes = db.Column(db.Integer, primary_key=True)
+    segundos_trabalhados = db.Column(db.Integer, nullable=False, default=0)
+    segundos_extras = db.Column(db.Integer, nullable=False, default=0)
+    dias_trabalhados = db.Column(db.Integer, nullable=False, default=0)
+    saldo_segundos = db.Column(db.Integer, nullable=False, default=0)
+
+# Números pré-calculados pelo agendador, com a hora do cálculo (UTC)
+class Agregado(db.Model):
+    __tablename__ = 'agregado'
+
+    nome = db.Column(db.String(50), primary_key=True)
+    chave = db.Column(db.String(50), primary_key=True)
+    valor = db.Column(db.Text, nullable=False)  # JSON
+    calculado_em = db.Column(db.DateTime, nullable=False)
+
+# INSERT com ON CONFLICT, no dialeto do banco em uso
+def comando_insert(modelo):
+    if db.engine.dialect.name == 'postgresql':
+        from sqlalchemy.dialects.postgresql import insert
+    else:
+        from sqlalchemy.dialects.sqlite import insert
+    return insert(modelo)
+
+# INSERT que não faz nada se a linha já existir (ON CONFLICT DO NOTHING)
+def inserir_se_ausente(modelo, **valores):
+    return comando_insert(modelo).values(**valores).on_conflict_do_nothing()
+
+def consulta_agregado(nome, chave):
+    return db.select(Agregado.valor, Agregado.calculado_em).where(Agregado.nome == nome, Agregado.chave == chave)
+
+def ler_agregado(linha):
+    return None if linha is None else (json.loads(linha.valor), linha.calculado_em)
+
+def carregar_agregado(nome, chave):
+    return ler_agregado(db.session.execute(consulta_agregado(nome, chave)).first())
+
+def gravar_agregado(nome, chave, valor, calculado_em):
+    comando = comando_insert(Agregado).values(nome=nome, chave=chave, valor=json.dumps(valor), calculado_em=calculado_em)
+    db.session.execute(comando.on_conflict_do_update(
+        index_elements=[Agregado.nome, Agregado.chave],
+        set_={'valor': comando.excluded.valor, 'calculado_em': comando.excluded.calculado_em},
+    ))
+    db.session.commit()
+
+def abrir_resumo(user_id, dia):
+    db.session.execute(inserir_se_ausente(
+        ResumoMensal, user_id=user_id, ano=dia.year, mes=dia.month,
+        segundos_trabalhados=0, segundos_extras=0, dias_trabalhados=0, saldo_segundos=0,
+    ))
+
+# Soma um dia fechado ao resumo do mês, na mesma transação do registro de saída
+def acumular_resumo(user_id, dia, trabalhadas, jornada):
+    abrir_resumo(user_id, dia)
+    db.session.execute(
+        db.update(ResumoMensal)
+        .where(ResumoMensal.user_id == user_id, ResumoMensal.ano == dia.year, ResumoMensal.mes == dia.month)
+        .values(
+            segundos_trabalhados=ResumoMensal.segundos_trabalhados + trabalhadas,
+            segundos_extras=ResumoMensal.segundos_extras + max(trabalhadas - jornada, 0),
+            dias_trabalhados=ResumoMensal.dias_trabalhados + 1,
+            saldo_segundos=ResumoMensal.saldo_segundos + trabalhadas - jornada,
+        )
+        .execution_options(synchronize_session=False)
+    )
+
+def colunas_resumo():
+    return (
+        db.func.coalesce(db.func.sum(ResumoMensal.segundos_trabalhados), 0),
+        db.func.coalesce(db.func.sum(ResumoMensal.segundos_extras), 0),
+        db.func.coalesce(db.func.sum(ResumoMensal.dias_trabalhados), 0),
+    )
+
+def resumo_do_mes(user_id, ano, mes):
+    resumo = db.session.get(ResumoMensal, (user_id, ano, mes))
+    if resumo is None:
+        return Totais(0, 0, 0)
+    return Totais(resumo.segundos_trabalhados, resumo.segundos_extras, resumo.dias_trabalhados)
+
+def resumos_do_mes(ano, mes):
+    consulta = db.select(
+        ResumoMensal.user_id, ResumoMensal.segundos_trabalhados, ResumoMensal.segundos_extras, ResumoMensal.dias_trabalhados
+    ).where(ResumoMensal.ano == ano, ResumoMensal.mes == mes)
+    return {user_id: Totais(*totais) for user_id, *totais in db.session.execute(consulta)}
+
+def resumir(*criterios):
+    return Totais(*db.session.execute(db.select(*colunas_resumo()).where(*criterios)).one())
+
+# Sem argumentos, refaz a tabela inteira; com ano e mês, só os resumos daquele mês
+def recalcular_resumos(ano=None, mes=None):
+    coluna_ano = db.extract('year', Ponto.data)
+    coluna_mes = db.extract('month', Ponto.data)
+    db.create_all()
+    criterios, apagar = [], db.delete(ResumoMensal)
+    if ano is not None:
+        criterios = filtro_mes(ano, mes)
+        apagar = apagar.where(ResumoMensal.ano == ano, ResumoMensal.mes == mes)
+        particoes = [ano_arquivado(ano)]
+        jornada = tabelas_folha.jornada(ano, mes)
+    else:
+        particoes = [None, *db.session.execute(db.select(PontoArquivado.ano)).scalars()]
+        jornada = jornada_por_data(Ponto.data)
+    consulta = (
+        db.select(Ponto.user_id, coluna_ano, coluna_mes, *colunas_totais(jornada))
+        .where(Ponto.entrada.isnot(None), Ponto.saida.isnot(None), *criterios)
+        .group_by(Ponto.user_id, coluna_ano, coluna_mes)
+    )
+
+    db.session.execute(apagar)
+    linhas = [
+        {
+            'user_id': user_id, 'ano': int(a), 'mes': int(m),
+            'segundos_trabalhados': trabalhadas, 'segundos_extras': extras, 'dias_trabalhados': dias,
+            'saldo_segundos': trabalhadas - tabelas_folha.jornada(int(a), int(m)) * dias,
+        }
+        for particao in particoes
+        for user_id, a, m, trabalhadas, extras, dias in db.session.execute(particoes_ponto.rotear(consulta, particao))
+    ]
+    if linhas:
+        db.session.execute(db.insert(ResumoMensal), linhas)
+    db.session.commit()
+    return len(linhas)
+
+@app.cli.command('reconstruir-resumo')
+def reconstruir_resumo():
+    """Recalcula a tabela resumo_mensal a partir dos registros de ponto."""
+    print(f'{recalcular_resumos()} resumos mensais recalculados.')
+
+# Pré-cálculo dos números do painel e das horas por funcionário, e fechamento do mês
+agendador = Agendador(carregar_agregado, gravar_agregado, app)
+
+def mes_corrente():
+    return date.today().strftime('%Y-%m')
+
+def calcular_painel(chave):
+    ano, mes = map(int, chave.split('-'))
+    totais = resumir(ResumoMensal.ano == ano, ResumoMensal.mes == mes)
+    return dict(
+        total_funcionarios=User.query.filter_by(tipo='funcionario').count(),
+        total_registros=Ponto.query.count() + db.session.execute(db.select(db.func.coalesce(db.func.sum(PontoArquivado.registros), 0))).scalar(),
+        total_horas=round(totais.horas_trabalhadas, 2),
+    )
+
+# Horas de toda a vida de cada funcionário (base do valor mostrado no desligamento)
+def calcular_horas_funcionarios(chave):
+    consulta = db.select(ResumoMensal.user_id, *colunas_resumo()).group_by(ResumoMensal.user_id)
+    return {str(user_id): list(totais) for user_id, *totais in db.session.execute(consulta)}
+
+agendador.registrar('painel_admin', calcular_painel, *app.config['AGENDADOR_METRICAS']['painel_admin'], chaves=lambda: [mes_corrente()])
+agendador.registrar('horas_funcionarios', calcular_horas_funcionarios, *app.config['AGENDADOR_METRICAS']['horas_funcionarios'])
+
+# Mês encerrado: os resumos são refeitos a partir dos registros (saídas lançadas depois, correções)
+@agendador.ao_fechar_mes
+def fechar_resumos(ano, mes):
+    return {'resumos': recalcular_resumos(ano, mes), **resumir(ResumoMensal.ano == ano, ResumoMensal.mes == mes)._asdict()}
+
+# Move os registros de um ano encerrado para ponto_AAAA, numa transação; devolve quantos moveu
+def arquivar_ano(ano):
+    if ano >= date.today().year:
+        raise ValueError('o ano corrente não pode ser arquivado')
+    do_ano = (Ponto.data >= date(ano, 1, 1), Ponto.data < date(ano + 1, 1, 1))
+    if db.session.execute(db.select(Ponto.id).where(*do_ano).limit(1)).first() is None:
+        return 0
+
+    tabela = particoes_ponto.tabela(ano)
+    tabela.create(db.session.connection(), checkfirst=True)
+    copiar = comando_insert(tabela).from_select(
+        ['id', 'user_id', 'data', 'entrada', 'saida'],
+        db.select(Ponto.id, Ponto.user_id, Ponto.data, Ponto.entrada, Ponto.saida).where(*do_ano).order_by(Ponto.user_id, Ponto.data),
+    )
+    # Um ano já arquivado pode receber registros de novo (ex.: migrar-ponto); os da tabela ponto prevalecem
+    movidos = db.session.execute(copiar.on_conflict_do_update(
+        index_elements=['user_id', 'data'],
+        set_={'id': copiar.excluded.id, 'entrada': copiar.excluded.entrada, 'saida': copiar.excluded.saida},
+    )).rowcount
+    db.session.execute(db.delete(Ponto).where(*do_ano).execution_options(synchronize_session=False))
+    registros = db.session.execute(db.select(db.func.count()).select_from(tabela)).scalar()
+    db.session.merge(PontoArquivado(ano=ano, registros=registros, arquivado_em=datetime.utcnow()))
+    db.session.commit()
+    particoes_ponto.marcar(ano)
+    return movidos
+
+# Arquiva os anos que passaram de PONTO_ANOS_QUENTES; devolve {ano: registros movidos}
+def arquivar_anos_antigos():
+    db.create_all()
+    primeiro = db.session.execute(db.select(db.func.min(Ponto.data))).scalar()
+    if primeiro is None:
+        return {}
+    arquivados = {ano: arquivar_ano(ano) for ano in range(primeiro.year, particoes_ponto.ultimo_ano_a_arquivar() + 1)}
+    return {ano: movidos for ano, movidos in arquivados.items() if movidos}
+
+# Desligado por padrão: o fechamento roda na primeira requisição após subir o servidor, e arquivar move registros
+@agendador.ao_fechar_mes
+def arquivar_ponto(ano, mes):
+    return arquivar_anos_antigos() if app.config['PONTO_ARQUIVAR_AUTOMATICO'] else {}
+
+@app.cli.command('arquivar-ponto')
+@click.option('--ano', type=int, default=None, help='Ano a arquivar; sem ele, todos os anteriores a PONTO_ANOS_QUENTES')
+def arquivar_ponto_comando(ano):
+    """Move os registros de ponto de anos encerrados para tabelas ponto_AAAA."""
+    if ano is None:
+        arquivados = arquivar_anos_antigos()
+    else:
+        try:
+            arquivados = {ano: arquivar_ano(ano)}
+        except ValueError as erro:
+            raise click.ClickException(str(erro))
+    for a, movidos in sorted(arquivados.items()):
+        print(f'{a}: {movidos} registros movidos para ponto_{a}.')
+    if not any(arquivados.values()):
+        print('Nenhum registro a arquivar.')
+
+@app.before_request
+def iniciar_agendador():
+    if app.config['AGENDADOR_THREAD']:
+        agendador.iniciar()
+
+@app.cli.command('executar-agendador')
+def executar_agendador():
+    """Mantém os números pré-calculados atualizados, num processo separado do servidor web."""
+    print('Agendador em execução (Ctrl+C para parar).')
+    try:
+        agendador.executar()
+    except KeyboardInterrupt:
+        pass
+
+@app.route('/admin/estatisticas/agregados')
+@login_required
+def estatisticas_agregados():
+    if current_user.tipo != 'admin':
+        abort(403)
+    return jsonify(agendador.estado())
+
+@app.route('/admin/agregados/recalcular', methods=['POST'])
+@login_required
+def recalcular_agregados():
+    if current_user.tipo != 'admin':
+        abort(403)
+
+    nome = request.form.get('nome') or None
+    if nome is not None and nome not in agendador.metricas:
+        abort(404)
+    total = agendador.recalcular(nome)
+    cache_fragmentos.invalidar('painel_admin')
+    if quer_json():
+        return jsonify(recalculados=total)
+    flash(f'{total} número(s) recalculado(s).', 'success')
+    return redirect(url_for('admin_dashboard'))
+
+# Descarta PDFs em cache quando os registros de ponto ou o salário mudam
+@db.event.listens_for(Ponto, 'after_insert')
+@db.event.listens_for(Ponto, 'after_update')
+@db.event.listens_for(Ponto, 'after_delete')
+def invalidar_pdf_ponto(mapper, connection, ponto):
+    if ponto.data is not None:
+        cache_pdf.invalidar(ponto.user_id, 'holerite', f"{ponto.data.year}-{ponto.data.month:02d}")
+
+@db.event.listens_for(User, 'after_update')
+def invalidar_pdf_salario(mapper, connection, user):
+    if db.inspect(user).attrs.salario_mensal.history.has_changes():
+        cache_pdf.invalidar(user.id)
+
+# Converte a tabela ponto antiga (data e horas em texto) para o formato tipado
+LOTE_MIGRACAO = 10000
+
+def converter_data_legada(texto):
+    for formato in ("%Y-%m-%d", "%d-%m-%Y"):
+        try:
+            return datetime.strptime(texto, formato).date()
+        except (TypeError, ValueError):
+            pass
+    return None
+
+def converter_hora_legada(dia, texto):
+    if not texto:
+        return None
+    hora = datetime.strptime(texto, "%H:%M:%S").time()
+    return int(datetime.combine(dia, hora).timestamp())
+
+@app.cli.command('migrar-ponto')
+def migrar_ponto():
+    """Converte os registros de ponto antigos para colunas tipadas e indexadas."""
+    from sqlalchemy import inspect, text
+
+    colunas = {c['name'] for c in inspect(db.engine).get_columns('ponto')}
+    if 'hora_entrada' not in colunas:
+        indices = {i['name']: i for i in inspect(db.engine).get_indexes('ponto')}
+        if indices.get('ix_ponto_user_data', {}).get('unique'):
+            print('A tabela ponto já está no formato novo.')
+            return
+
+        indice = next(i for i in Ponto.__table__.indexes if i.name == 'ix_ponto_user_data')
+        with db.engine.begin() as conn:
+            conn.execute(text('DROP INDEX IF EXISTS ix_ponto_user_data'))
+            indice.create(conn)
+        print('Índice único (user_id, data) criado na tabela ponto.')
+        return
+
+    if inspect(db.engine).has_table('ponto_legado'):
+        raise click.ClickException('A tabela ponto_legado de uma migração anterior ainda existe; confira-a e apague-a antes.')
+
+    validos = ignorados = 0
+    with db.engine.begin() as conn:
+        conn.execute(text('ALTER TABLE ponto RENAME TO ponto_legado'))
+        db.metadata.create_all(conn, tables=[Ponto.__table__])
+
+        resultado = conn.execute(text('SELECT id, user_id, data, hora_entrada, hora_saida FROM ponto_legado'))
+        while True:
+            linhas = resultado.fetchmany(LOTE_MIGRACAO)
+            if not linhas:
+                break
+
+            lote = []
+            for id_, user_id, data, hora_entrada, hora_saida in linhas:
+                dia = converter_data_legada(data)
+                try:
+                    entrada = converter_hora_legada(dia, hora_entrada) if dia else None
+                    saida = converter_hora_legada(dia, hora_saida) if dia else None
+                except ValueError:
+                    dia = None
+                if dia is None:
+                    ignorados += 1
+                    continue
+                lote.append({'id': id_, 'user_id': user_id, 'data': dia, 'entrada': entrada, 'saida': saida})
+
+            if lote:
+                # Registros repetidos no mesmo dia viram um só: a primeira entrada e a última saída
+                # (no SQLite, min/max de duas colunas dão NULL se uma delas for NULL, daí o coalesce)
+                inserir = comando_insert(Ponto)
+                atual, nova = Ponto.__table__.c, inserir.excluded
+                menor, maior = (db.func.least, db.func.greatest) if conn.dialect.name == 'postgresql' else (db.func.min, db.func.max)
+                conn.execute(inserir.on_conflict_do_update(
+                    index_elements=['user_id', 'data'],
+                    set_={
+                        'entrada': menor(db.func.coalesce(atual.entrada, nova.entrada), db.func.coalesce(nova.entrada, atual.entrada)),
+                        'saida': maior(db.func.coalesce(atual.saida, nova.saida), db.func.coalesce(nova.saida, atual.saida)),
+                    },
+                ), lote)
+                validos += len(lote)
+
+        convertidos = conn.execute(db.select(db.func.count()).select_from(Ponto.__table__)).scalar()
+
+    # ponto_legado fica no banco: é a única cópia dos registros ignorados e dos repetidos como estavam
+    print(f'{convertidos} registros convertidos ({validos - convertidos} repetidos no mesmo dia foram mesclados), '
+          f'{ignorados} ignorados por data ou hora inválida.')
+    print('Os registros originais continuam na tabela ponto_legado; apague-a depois de conferir a migração.')
 
 # Página de registro
 @app.route('/registrar_funcionario', methods=['GET', 'POST'])
@@ -355,7 +1161,7 @@ def registrar_funcionario():
         tipo = request.form.get('tipo', 'funcionario')
         chave_admin = request.form.get('chave_admin', '')
         
-        if User.query.filter_by(email=email).first():
+        if buscar_por_email(email):
             flash('Email já cadastrado.', 'warning')
             return redirect(url_for('registrar_funcionario'))
         
@@ -364,7 +1170,7 @@ def registrar_funcionario():
                 flash('Chave de autenticação inválida para administrador.', 'danger')
                 return redirect(url_for('registrar_funcionario'))
         
-        novo_user = User(nome=nome, email=email, senha=generate_password_hash(senha), tipo=tipo, ativo=True)
+        novo_user = User(nome=nome, email=email, senha=credenciais.gerar(senha), tipo=tipo, ativo=True)
         db.session.add(novo_user)
         db.session.commit()
         flash('Cadastro realizado com sucesso. Faça login.', 'success')
@@ -375,134 +1181,155 @@ def registrar_funcionario():
 @app.route('/registrar_entrada')
 @login_required
 def registrar_entrada():
-    hoje = datetime.now().strftime("%d-%m-%Y")
-    hora = datetime.now().strftime("%H:%M:%S")
+    if not current_user.ativo:
+        flash('Usuário desligado não pode registrar ponto.', 'danger')
+        return redirect(url_for('dashboard'))
+
+    agora = datetime.now()
     
-    # Verificação de entradas ou saídas existentes
-    ponto = Ponto(user_id=current_user.id, data=hoje, hora_entrada=hora)
-    if ponto:
+    # A entrada só é gravada se ainda não houver registro no dia (índice único)
+    registrada = enviar_ponto('entrada', agora)
+    if registrada is None:
+        flash('Não foi possível registrar o ponto agora. Tente novamente.', 'danger')
+    elif not registrada:
         flash('Você já registrou sua entrada hoje.', 'warning')
     else:
-        novo_ponto = ponto(user_id=current_user.id, data=hoje, hora_entrada=hora)
-        db.session.add(novo_ponto)
-        db.session.commit()
-        flash('Entrada registrada às {hora}.', 'success')
-    
-    if not current_user.ativo:
-        flash('Usuário desligado não pode registrar ponto.', 'danger')
+        flash(f'Entrada registrada às {agora:%H:%M:%S}.', 'success')
     
     return redirect(url_for('dashboard'))
 
 @app.route('/registrar_saida')
 @login_required
 def registrar_saida():
-    hoje = datetime.now().strftime("%d-%m-%Y")
-    hora = datetime.now().strftime("%H:%M:%S")
+    if not current_user.ativo:
+        flash('Usuário desligado não pode registrar ponto.', 'danger')
+        return redirect(url_for('dashboard'))
+
+    agora = datetime.now()
     
-    ponto = Ponto.query.filter_by(user_id=current_user.id, data=hoje, hora_saida=None).first()
-    if ponto:
-        ponto.hora_saida = hora
-        db.session.commit()
-        flash('Saída registrada às {hora}.', 'success')
+    registrada = enviar_ponto('saida', agora)
+    if registrada is None:
+        flash('Não foi possível registrar o ponto agora. Tente novamente.', 'danger')
+    elif registrada:
+        flash(f'Saída registrada às {agora:%H:%M:%S}.', 'success')
     else:
         flash('Você não registrou sua entrada ou já registrou sua saída hoje.', 'warning')
-
-    if not current_user.ativo:
-        flash('Usuário desligado não pode registrar ponto.', 'danger')
     
     return redirect(url_for('dashboard'))
 
+# Grava um lote de entradas/saídas numa única transação (executado pela thread de gravação).
+# Cada item roda num SAVEPOINT: um registro que falha é desfeito sozinho e volta como exceção.
+def gravar_pontos(itens):
+    resultados = []
+    alterados = set()
+    with app.app_context():
+        iniciar_escrita(db.session.connection())
+        for operacao, user_id, dia, momento in itens:
+            try:
+                with db.session.begin_nested():
+                    gravado = gravar_ponto(operacao, user_id, dia, momento)
+            except Exception as erro:
+                resultados.append(erro)
+                continue
+
+            if gravado:
+                alterados.add((user_id, f"{dia.year}-{dia.month:02d}"))
+            resultados.append(gravado)
+        db.session.commit()
+
+    for user_id, referencia in alterados:
+        cache_pdf.invalidar(user_id, 'holerite', referencia)
+    return resultados
+
+def gravar_ponto(operacao, user_id, dia, momento):
+    if operacao == 'entrada':
+        gravado = db.session.execute(inserir_se_ausente(Ponto, user_id=user_id, data=dia, entrada=momento)).rowcount == 1
+        if gravado:
+            abrir_resumo(user_id, dia)
+        return gravado
+
+    entrada = db.session.execute(
+        db.update(Ponto)
+        .where(Ponto.user_id == user_id, Ponto.data == dia, Ponto.entrada.isnot(None), Ponto.saida.is_(None))
+        .values(saida=momento)
+        .returning(Ponto.entrada)
+        .execution_options(synchronize_session=False)
+    ).scalar()
+    if entrada is None:
+        return False
+    acumular_resumo(user_id, dia, momento - entrada, tabelas_folha.jornada(dia.year, dia.month))
+    return True
+
+fila_ponto = FilaGravacao(gravar_pontos, app.config['PONTO_LOTE_MAXIMO'], app.config['PONTO_INTERVALO'])
+
+# Envia o registro para a fila de gravação e espera o resultado (None em caso de falha)
+def enviar_ponto(operacao, agora):
+    futuro = fila_ponto.enviar((operacao, current_user.id, agora.date(), int(agora.timestamp())))
+    db.session.close()  # Devolve a conexão ao pool enquanto a thread de gravação trabalha
+    try:
+        return futuro.result(timeout=app.config['PONTO_ESPERA'])
+    except Exception:
+        app.logger.exception('Falha ao gravar registro de ponto')
+        return None
+
 @app.route('/historico')
 @login_required
 def historico():
-    # Parâmetros do GET
-    mes_param = request.args.get('mes')
-    hoje = datetime.today()
-    if mes_param:
-        try:
-            ano, mes = map(int, mes_param.split('-'))
-            mes_display = f"{ano}-{mes:02d}"
-        except:
-            ano, mes = hoje.year, hoje.month
-            mes_display = hoje.strftime("%m-%Y")
-    else:
-        ano, mes = hoje.year, hoje.month
-        mes_display = hoje.strftime("%m-%Y")
+    ano, mes, mes_display = periodo_historico()
+    apuracao = apurar_pontos(ano, mes, *criterios_historico(ano, mes), ordem=Ponto.data.desc())
+    return renderizar_historico(apuracao, mes_display)
 
-    registros = Ponto.query.filter(Ponto.user_id == current_user.id, Ponto.data.startswith(f"{ano}-{mes:02d}")).order_by(Ponto.data.desc()).all()
-    
-    jornada_padrao = timedelta(hours=10)
-    historico_calculado = []
-    saldo_total = timedelta()
-
-    for r in registros:
-        entrada = datetime.strptime(r.hora_entrada, "%H:%M:%S") if r.hora_entrada else None
-        saida = datetime.strptime(r.hora_saida, "%H:%M:%S") if r.hora_saida else None
-        data = r.data
-
-        if entrada and saida:
-            horas_trabalhadas = saida - entrada
-            saldo_dia = horas_trabalhadas - jornada_padrao
-            saldo_total += saldo_dia
-        else:
-            horas_trabalhadas = None
-            saldo_dia = None
-        
-        historico_calculado.append({
+# Parâmetros do GET: (ano, mês, mês como exibido); sem ?mes, o mês atual; mês inválido, 400
+def periodo_historico():
+    mes_param = request.args.get('mes')
+    if not mes_param:
+        hoje = datetime.today()
+        return hoje.year, hoje.month, hoje.strftime("%m-%Y")
+    try:
+        ano, mes = map(int, mes_param.split('-'))
+        intervalo_mes(ano, mes)  # Recusa mês fora de 1..12 e ano fora do que date aceita
+    except (ValueError, OverflowError):
+        abort(400)
+    return ano, mes, f"{ano}-{mes:02d}"
+
+def criterios_historico(ano, mes):
+    return (Ponto.user_id == current_user.id, *filtro_mes(ano, mes))
+
+def renderizar_historico(apuracao, mes_display):
+    historico_calculado = montar_historico(apuracao)
+    return render_template('historico.html', registros=historico_calculado, saldo_total=str(apuracao.saldo), mes_atual=mes_display)
+
+# Linhas da tabela de histórico a partir da apuração do mês
+def montar_historico(apuracao):
+    lista = []
+    for data, entrada, saida, trabalhadas, saldo in apuracao.dias():
+        lista.append({
             'data': data,
-            'entrada': r.hora_entrada,
-            'saida': r.hora_saida,
-            'horas_trabalhadas': str(horas_trabalhadas) if horas_trabalhadas else '—',
-            'saldo': str(saldo_dia) if saldo_dia else '—'
+            'entrada': formatar_hora(entrada),
+            'saida': formatar_hora(saida),
+            'horas_trabalhadas': str(timedelta(seconds=trabalhadas)) if trabalhadas else '—',
+            'saldo': str(timedelta(seconds=saldo)) if saldo else '—'
         })
-
-    return render_template('historico.html', registros=historico_calculado, saldo_total=str(saldo_total), mes_atual=mes_display)
+    return lista
 
 @app.route('/holerite')
 @login_required
 def gerar_holerite():
-    from datetime import datetime, timedelta
-
-    mes_param = request.args.get('mes')
-    hoje = datetime.today()
-    ano, mes = hoje.year, hoje.month
-
-    if mes_param:
-        try:
-            ano, mes = map(int, mes_param.split('-'))
-        except:
-            pass
-        
+    ano, mes, _ = periodo_historico()
     mes_display = f"{ano}-{mes:02d}"
         
-    registros = Ponto.query.filter(Ponto.user_id == current_user.id, Ponto.data.startswith(f"{ano}-{mes:02d}")).order_by(Ponto.data.desc()).all()
-    
-    jornada_padrao = timedelta(hours=10)
-    total_trabalhado = timedelta()
-    dias_trabalhados = 0
-
-    for r in registros:
-        if r.hora_entrada and r.hora_saida:
-            entrada = datetime.strptime(r.hora_entrada, "%H:%M:%S")
-            saida = datetime.strptime(r.hora_saida, "%H:%M:%S")
-            total_trabalhado += (saida - entrada)
-            dias_trabalhados += 1
-
-    salario_base = 1940.00 # Salário base
-    valor_hora = salario_base / (jornada_padrao.total_seconds() / 3600 * 22)
-    horas_trabalhadas = total_trabalhado.total_seconds() / 3600
+    totais = resumo_do_mes(current_user.id, ano, mes)
+    salario_mensal = db.session.execute(db.select(User.salario_mensal).where(User.id == current_user.id)).scalar()
+    dias_trabalhados = totais.dias_trabalhados
+
+    valor_hora = tabelas_folha.regras(ano, mes).valor_hora(salario_mensal)
+    horas_trabalhadas = totais.horas_trabalhadas
     salario_total = round(valor_hora * horas_trabalhadas, 2)
 
     
-    rendered_html = render_template("holerite.html", nome=current_user.nome, mes=mes_display, dias=dias_trabalhados, horas=round(horas_trabalhadas, 2), salario=salario_total)
-    
-    config = pdfkit.configuration(wkhtmltopdf=r'C:/Arquivos de Programas/wkhtmltopdf/bin/wkhtmltopdf.exe')
-    pdf = pdfkit.from_string(rendered_html, False, configuration=config)
+    contexto = dict(nome=current_user.nome, mes=mes_display, dias=dias_trabalhados, horas=round(horas_trabalhadas, 2), salario=salario_total)
     
-    response = make_response(pdf)
-    response.headers['Content-Type'] = 'application/pdf'
-    response.headers['Content-Disposition'] = f'inline; filename=holerite_{mes_display}.pdf'
-    return response
+    return servir_pdf("holerite.html", contexto, f'holerite_{mes_display}.pdf', current_user.id, 'holerite', mes_display)
 
 @app.route('/admin/funcionarios')
 @login_required
@@ -510,8 +1337,12 @@ def funcionarios():
     if current_user.tipo != 'admin':
         abort(403)
 
-    lista = User.query.filter(User.tipo == 'funcionario').order_by(User.data_demissao.isnot(None), User.nome).all()
-    return render_template('admin/admin_funcionario.html', funcionarios=lista)
+    # Ativos primeiro, depois os desligados, cada grupo por nome; a situação exibida vem de data_demissao
+    desligado = db.case((User.data_demissao.isnot(None), 1), else_=0).label('desligado')
+    lista, proximo = paginar(consultar_funcionarios(desligado, User.data_demissao), [desligado, User.nome, User.id])
+    if quer_json():
+        return linhas_json(lista, proximo, ocultas=('desligado',))
+    return render_template('admin/admin_funcionario.html', funcionarios=lista, proximo=proximo)
 
 @app.route('/admin/funcionario/<int:id>/editar', methods=['GET', 'POST'])
 @login_required
@@ -525,6 +1356,7 @@ def editar_funcionario(id):
         funcionario.nome = request.form['nome']
         funcionario.email = request.form['email']
         db.session.commit()
+        cache_usuarios.invalidar(funcionario.id)
         flash('Funcionário atualizado com sucesso.', 'success')
         return redirect(url_for('funcionarios'))
     
@@ -539,6 +1371,7 @@ def excluir_funcionario(id):
     funcionario = User.query.get_or_404(id)
     db.session.delete(funcionario)
     db.session.commit()
+    cache_usuarios.invalidar(id)
     flash('Funcionário excluído com sucesso.', 'success')
     return redirect(url_for('funcionarios'))
     
@@ -549,106 +1382,378 @@ def historico_funcionario(id):
         abort(403)
 
     user = User.query.get_or_404(id)
-    mes_param = request.args.get('mes')
+    ano, mes, _ = periodo_historico()
 
-    hoje = datetime.today()
-    ano, mes = hoje.year, hoje.month
-    if mes_param:
-        try:
-            ano, mes = map(int, mes_param.split('-'))
-        except:
-            pass
+    apuracao = apurar_pontos(ano, mes, Ponto.user_id == user.id, *filtro_mes(ano, mes), ordem=Ponto.data)
+    lista = montar_historico(apuracao)
 
-    registros = Ponto.query.filter(Ponto.user_id == user.id, Ponto.data.startswith(f"{ano}-{mes:02d}")).order_by(Ponto.data).all()
+    return render_template('historico_funcionario.html', nome=user.nome, registros=lista, saldo_total=str(apuracao.saldo), mes_atual=f"{ano}-{mes:02d}", id=user.id)
 
-    jornada_padrao = timedelta(hours=10)
-    saldo_total = timedelta()
-    lista = []
-    for r in registros:
-        ent = datetime.strptime(r.hora_entrada, "%H:%M:%S") if r.hora_entrada else None
-        sai = datetime.strptime(r.hora_saida, "%H:%M:%S") if r.hora_saida else None
-        data = r.data
-
-        if ent and sai:
-            trabalhadas = sai - ent
-            saldo = trabalhadas - jornada_padrao
-            saldo_total += saldo
+@app.route('/admin/funcionario/<int:id>/holerite')
+@login_required
+def holerite_funcionario(id):
+    if current_user.tipo != 'admin':
+        abort(403)
+
+    user = User.query.get_or_404(id)
+    ano, mes, _ = periodo_historico()
+
+    totais = resumo_do_mes(user.id, ano, mes)
+    contexto = calcular_holerite(user.nome, f"{ano}-{mes:02d}", totais, user.salario_mensal, tabelas_folha.regras(ano, mes))
+
+    return servir_pdf("holerite.html", contexto, f'holerite_{user.nome}.pdf', user.id, 'holerite', f"{ano}-{mes:02d}")
+
+# Importação de funcionários em lote a partir de um CSV
+LOTE_IMPORTACAO = 1000
+hash_senhas = HashSenhas(app.config['IMPORTACAO_PROCESSOS'])  # Pool compartilhado pelas importações da web
+
+def importar_funcionarios(texto, hashes=hash_senhas):
+    validos, relatorio = ler_funcionarios(texto, credenciais.metodo)
+
+    # Emails que já existem no banco, consultados em blocos (os do arquivo já vêm em minúsculas)
+    emails = [dados['email'] for _, dados in validos]
+    email_minusculo = db.func.lower(User.email)
+    existentes = set()
+    for i in range(0, len(emails), 500):
+        existentes.update(db.session.execute(db.select(email_minusculo).where(email_minusculo.in_(emails[i:i + 500]))).scalars())
+
+    novos = []
+    for numero, dados in validos:
+        if dados['email'] in existentes:
+            relatorio.append({'linha': numero, 'email': dados['email'], 'status': 'erro', 'mensagem': 'email já cadastrado', 'senha_inicial': ''})
         else:
-            trabalhadas = None
-            saldo = None
+            novos.append((numero, dados))
+
+    # O hash das senhas é o passo caro; é distribuído entre processos
+    senhas = hashes.gerar([dados['senha'] for _, dados in novos], [dados['metodo_hash'] for _, dados in novos])
+
+    salario_padrao = tabelas_folha.regras_do_dia().salario_padrao
+    registros = [
+        {
+            'nome': dados['nome'], 'email': dados['email'], 'senha': senha_hash, 'tipo': 'funcionario', 'ativo': True,
+            'cpf': dados['cpf'], 'salario_mensal': dados['salario_mensal'] if dados['salario_mensal'] is not None else salario_padrao,
+            'data_admissao': dados['data_admissao'],
+        }
+        for (_, dados), senha_hash in zip(novos, senhas)
+    ]
+    for i in range(0, len(registros), LOTE_IMPORTACAO):
+        db.session.execute(db.insert(User), registros[i:i + LOTE_IMPORTACAO])
+    db.session.commit()
 
-        lista.append({
-            'data': data,
-            'entrada': r.hora_entrada,
-            'saida': r.hora_saida,
-            'horas_trabalhadas': str(trabalhadas) if trabalhadas else '—',
-            'saldo': str(saldo) if saldo else '—'
+    for numero, dados in novos:
+        relatorio.append({
+            'linha': numero, 'email': dados['email'], 'status': 'importado', 'mensagem': '',
+            'senha_inicial': dados['senha'] if dados['senha_gerada'] else '',
         })
+    return len(novos), relatorio
+
+@app.cli.command('importar-funcionarios')
+@click.argument('arquivo', type=click.Path(exists=True, dir_okay=False))
+@click.option('--relatorio', default='relatorio_importacao.csv', show_default=True, help='Arquivo CSV com o resultado de cada linha.')
+@click.option('--processos', default=None, type=int, help='Processos para o hash das senhas (padrão: número de CPUs).')
+def importar_funcionarios_comando(arquivo, relatorio, processos):
+    """Cadastra funcionários a partir de um CSV (nome, email, cpf, salario_mensal, data_admissao)."""
+    inicio = time.monotonic()
+    with open(arquivo, encoding='utf-8-sig') as entrada:
+        texto = entrada.read()
+    hashes = HashSenhas(processos)
+    try:
+        importados, linhas = importar_funcionarios(texto, hashes)
+    except ErroImportacao as erro:
+        raise click.ClickException(str(erro))
+    finally:
+        hashes.encerrar()
+
+    with open(relatorio, 'w', encoding='utf-8', newline='') as saida:
+        saida.write(escrever_relatorio(linhas))
+    print(f'{importados} funcionários importados, {len(linhas) - importados} linhas com erro em {time.monotonic() - inicio:.1f}s. Relatório: {relatorio}')
+
+@app.route('/admin/importar_funcionarios', methods=['POST'])
+@login_required
+def importar_funcionarios_arquivo():
+    if current_user.tipo != 'admin':
+        abort(403)
 
-    return render_template('historico_funcionario.html', nome=user.nome, registros=lista, saldo_total=str(saldo_total), mes_atual=f"{ano}-{mes:02d}", id=user.id)
+    arquivo = request.files.get('arquivo')
+    if not arquivo or arquivo.filename == '':
+        abort(400)
+    try:
+        _, linhas = importar_funcionarios(arquivo.read().decode('utf-8-sig'))
+    except (ErroImportacao, UnicodeDecodeError) as erro:
+        return make_response(f'Arquivo inválido: {erro}', 400)
+
+    response = make_response(escrever_relatorio(linhas))
+    response.headers['Content-Type'] = 'text/csv; charset=utf-8'
+    response.headers['Content-Disposition'] = 'attachment; filename=relatorio_importacao.csv'
+    return response
 
-@app.route('/admin/funcionario/<int:id>/holerite')
+# Exportação dos registros de ponto para a contabilidade (CSV ou XLSX), em fluxo
+@app.route('/admin/exportar/ponto')
 @login_required
-def holerite_funcionario(id):
+def exportar_ponto():
     if current_user.tipo != 'admin':
         abort(403)
 
-    user = User.query.get_or_404(id)
-    mes_param = request.args.get('mes')
-    from datetime import datetime, timedelta
-
     hoje = datetime.today()
-    ano, mes = hoje.year, hoje.month
-    if mes_param:
-        try:
-            ano, mes = map(int, mes_param.split('-'))
-        except:
-            pass
+    try:
+        inicio = date.fromisoformat(request.args['inicio']) if request.args.get('inicio') else hoje.date().replace(day=1)
+        fim = date.fromisoformat(request.args['fim']) if request.args.get('fim') else hoje.date()
+    except ValueError:
+        abort(400)
+    funcionarios = request.args.getlist('funcionario', type=int)
+    formato = request.args.get('formato', 'csv')
+    if formato not in ('csv', 'xlsx'):
+        abort(400)
+
+    consulta = (
+        db.select(Ponto.user_id, User.nome, Ponto.data, Ponto.entrada, Ponto.saida)
+        .join(User, User.id == Ponto.user_id)
+        .where(Ponto.data >= inicio, Ponto.data <= fim)
+    )
+    if funcionarios:
+        consulta = consulta.where(Ponto.user_id.in_(funcionarios))
+
+    # Períodos que incluem anos arquivados juntam a tabela ponto e as ponto_AAAA
+    particoes = particoes_do_periodo(inicio, fim)
+    if len(particoes) == 1:
+        consulta = particoes_ponto.rotear(consulta.order_by(Ponto.user_id, Ponto.data), particoes[0])
+    else:
+        uniao = db.union_all(*(particoes_ponto.rotear(consulta, particao) for particao in particoes)).subquery()
+        consulta = db.select(uniao).order_by(uniao.c.user_id, uniao.c.data)
+    consulta = consulta.execution_options(yield_per=1000)
 
-    registros = Ponto.query.filter(Ponto.user_id == user.id, Ponto.data.startswith(f"{ano}-{mes:02d}")).all()
+    def registros():
+        yield from db.session.execute(consulta)
 
-    jornada = timedelta(hours=10)
-    total = timedelta()
-    extras = timedelta()
-    dias_trabalhados = 0
+    nome_arquivo = f'ponto_{inicio.isoformat()}_{fim.isoformat()}.{formato}'
+    if formato == 'csv':
+        corpo, tipo = gerar_csv(linhas_ponto(registros(), tabelas_folha.jornada)), 'text/csv; charset=utf-8'
+    else:
+        corpo, tipo = gerar_xlsx(linhas_ponto(registros(), tabelas_folha.jornada)), 'application/vnd.openxmlformats-officedocument.spreadsheetml.sheet'
 
-    for r in registros:
-        if r.hora_entrada and r.hora_saida:
-            ent = datetime.strptime(r.hora_entrada, "%H:%M:%S")
-            sai = datetime.strptime(r.hora_saida, "%H:%M:%S")
-            trabalhadas = sai - ent
-            total += trabalhadas
-            dias_trabalhados += 1
+    response = Response(stream_with_context(corpo), mimetype=tipo)
+    response.headers['Content-Disposition'] = f'attachment; filename={nome_arquivo}'
+    return response
 
-            if trabalhadas > jornada:
-                extras += (trabalhadas - jornada)
+# Valores do holerite a partir dos totais do mês e das regras da folha vigentes nele
+def calcular_holerite(nome, referencia, totais, salario_mensal, regras):
+    dias_trabalhados = totais.dias_trabalhados
 
     # Cálculo do salário
-    salario_base = 1940.00
-    horas_trabalhadas = total.total_seconds() / 3600 # Total de horas trabalhadas
-    horas_extras = extras.total_seconds() / 3600 # Total de horas extras
+    salario_base = regras.salario(salario_mensal)
+    horas_trabalhadas = totais.horas_trabalhadas # Total de horas trabalhadas
+    horas_extras = totais.horas_extras # Total de horas extras
 
-    valor_hora = salario_base / (22 * 10)  # 22 dias úteis, 10 horas por dia
+    valor_hora = salario_base / regras.horas_mes
     valor_base = round(horas_trabalhadas * valor_hora, 2) # Salário base
-    valor_extras = round(horas_extras * valor_hora * 1.5, 2)  # 50% a mais para horas extras
+    valor_extras = round(horas_extras * valor_hora * regras.adicional_extra, 2)
     bruto = valor_base + valor_extras
 
-    desconto_inss = round(bruto * 0.08, 2)  # 8% de INSS
-    desconto_vt = round(bruto * 0.05, 2)  # 5% de vale transporte
+    desconto_inss = round(regras.desconto_inss(bruto), 2)
+    desconto_vt = round(bruto * regras.vale_transporte, 2)
     liquido = round(bruto - desconto_inss - desconto_vt, 2) # Salário líquido 
 
-    rendered_html = render_template("holerite.html", nome=user.nome, mes=f"{ano}-{mes:02d}", dias=dias_trabalhados, horas=round(horas_trabalhadas, 2), salario_base=salario_base, valor_base=valor_base, valor_extras=valor_extras, bruto=bruto, desconto_inss=desconto_inss, desconto_vt=desconto_vt, valor_liquido=liquido)
+    return dict(nome=nome, mes=referencia, dias=dias_trabalhados, horas=round(horas_trabalhadas, 2), salario_base=salario_base, valor_base=valor_base, valor_extras=valor_extras, bruto=bruto, desconto_inss=desconto_inss, desconto_vt=desconto_vt, valor_liquido=liquido)
+
+# Folha de pagamento do mês: todos os holerites em um ZIP, gerados em paralelo
+@app.cli.command('folha-pagamento')
+@click.argument('referencia')
+@click.option('--saida', default=None, help='Arquivo ZIP de saída (padrão: folha_AAAA-MM.zip).')
+@click.option('--processos', default=os.cpu_count(), show_default=True, help='Processos geradores de PDF.')
+@click.option('--limite', default=None, type=float, help='Tempo máximo em segundos; o que não terminar fica pendente.')
+def folha_pagamento(referencia, saida, processos, limite):
+    """Gera os holerites de todos os funcionários ativos no mês AAAA-MM."""
+    ano, mes = map(int, referencia.split('-'))
+    referencia = f"{ano}-{mes:02d}"
+    saida = saida or f'folha_{referencia}.zip'
+    inicio = time.monotonic()
+
+    funcionarios = db.session.execute(
+        db.select(User.id, User.nome, User.salario_mensal).where(User.tipo == 'funcionario', User.ativo.is_(True)).order_by(User.nome)
+    ).all()
+    totais = resumos_do_mes(ano, mes)
+    regras = tabelas_folha.regras(ano, mes)  # Uma só consulta às tabelas para o mês inteiro
+    renderizador = fila_pdf.renderizador
+    template = app.jinja_env.get_template('holerite.html')
+
+    status = {}
+    ultimo_erro = None
+    with ProcessPoolExecutor(max_workers=processos) as executor, zipfile.ZipFile(saida, 'w') as arquivo_zip:
+        futuros = {}
+        for user_id, nome, salario_mensal in funcionarios:
+            contexto = calcular_holerite(nome, referencia, totais.get(user_id, Totais(0, 0, 0)), salario_mensal, regras)
+            html = template.render(**contexto) if renderizador.precisa_html else None
+            futuro = executor.submit(renderizador.renderizar, 'holerite.html', contexto, html)
+            futuros[futuro] = (user_id, nome, cache_pdf.chave(template='holerite.html', renderizador=app.config['PDF_RENDERIZADOR'], **contexto))
 
-    import pdfkit
-    
-    config = pdfkit.configuration(wkhtmltopdf=r'C:/Arquivos de Programas/wkhtmltopdf/bin/wkhtmltopdf.exe')
-    pdf = pdfkit.from_string(rendered_html, False, configuration=config)
-   
-    response = make_response(pdf)
-    response.headers['Content-Type'] = 'application/pdf'
-    response.headers['Content-Disposition'] = f'inline; filename=holerite_{user.nome}.pdf'
+        try:
+            for feitos, futuro in enumerate(as_completed(futuros, timeout=limite), 1):
+                user_id, nome, chave = futuros[futuro]
+                if futuro.exception() is not None:
+                    status[user_id] = 'erro'
+                    ultimo_erro = futuro.exception()
+                else:
+                    pdf = futuro.result()
+                    arquivo_zip.writestr(f'holerite_{referencia}_{user_id}_{secure_filename(nome)}.pdf', pdf)
+                    cache_pdf.gravar(user_id, 'holerite', referencia, chave, pdf)
+                    status[user_id] = 'gerado'
+
+                if feitos % 100 == 0 or feitos == len(futuros):
+                    print(f'{feitos}/{len(futuros)} holerites processados em {time.monotonic() - inicio:.1f}s')
+        except TimeoutError:
+            executor.shutdown(wait=False, cancel_futures=True)
+            print(f'Tempo limite de {limite}s atingido.')
+
+        relatorio = ['user_id;nome;status']
+        relatorio += [f'{user_id};{nome};{status.get(user_id, "pendente")}' for user_id, nome, _ in funcionarios]
+        arquivo_zip.writestr('relatorio.csv', '\n'.join(relatorio) + '\n')
+
+    gerados = sum(1 for s in status.values() if s == 'gerado')
+    erros = sum(1 for s in status.values() if s == 'erro')
+    print(f'{saida}: {gerados} gerados, {erros} com erro, {len(funcionarios) - gerados - erros} pendentes em {time.monotonic() - inicio:.1f}s.')
+    if ultimo_erro is not None:
+        print(f'Último erro: {ultimo_erro}')
+
+# API JSON (v1) para os terminais de ponto e o aplicativo
+#
+# As respostas são compactas (listas de colunas + linhas, horários em epoch)
+# e levam ETag/Last-Modified calculados a partir da versão dos dados, antes de
+# montar o conteúdo: quando nada mudou, a resposta é um 304 sem corpo e sem
+# a consulta das linhas.
+def exigir_login_api():
+    if not current_user.is_authenticated:
+        abort(401)
+
+def mes_da_requisicao():
+    hoje = datetime.today()
+    try:
+        ano, mes = map(int, request.args.get('mes', f'{hoje.year}-{hoje.month}').split('-'))
+        intervalo_mes(ano, mes)
+    except ValueError:
+        abort(400)
+    return ano, mes
+
+# Funcionário consultado: o próprio usuário ou, para administradores, ?funcionario=ID
+def funcionario_da_requisicao():
+    user_id = request.args.get('funcionario', type=int)
+    if user_id is None or user_id == current_user.id:
+        return current_user.id
+    if current_user.tipo != 'admin':
+        abort(403)
+    return user_id
+
+def responder_condicional(versao, gerar, ultima_alteracao=None):
+    etag = hashlib.sha256(repr(versao).encode('utf-8')).hexdigest()[:32]
+    if not is_resource_modified(request.environ, etag=etag, last_modified=ultima_alteracao):
+        response = Response(status=304)
+    else:
+        response = Response(json.dumps(gerar(), separators=(',', ':'), ensure_ascii=False, default=str), mimetype='application/json')
+    response.set_etag(etag)
+    if ultima_alteracao is not None:
+        response.last_modified = ultima_alteracao
+    response.cache_control.private = True
+    response.cache_control.no_cache = True  # Sempre revalidar, mas com resposta condicional
     return response
 
+# Partições com registros entre as datas: None (tabela ponto) e/ou os anos arquivados
+def particoes_do_periodo(inicio, fim):
+    anos = range(inicio.year, fim.year + 1)
+    arquivados = db.session.execute(
+        db.select(PontoArquivado.ano).where(PontoArquivado.ano.between(anos.start, anos.stop - 1)).order_by(PontoArquivado.ano)
+    ).scalars().all()
+    for ano in arquivados:
+        particoes_ponto.marcar(ano)
+    if anos and len(arquivados) == len(anos):
+        return arquivados
+    return [None] + arquivados
+
+def epoch_para_data(epoch):
+    return datetime.fromtimestamp(epoch, timezone.utc) if epoch else None
+
+@app.route('/api/v1/ponto')
+def api_ponto():
+    exigir_login_api()
+    user_id = funcionario_da_requisicao()
+    ano, mes = mes_da_requisicao()
+    criterios = (Ponto.user_id == user_id, *filtro_mes(ano, mes))
+
+    # Versão do mês: muda a cada entrada ou saída registrada
+    quantidade, entradas, saidas, ultima = db.session.execute(rotear_ponto(
+        db.select(db.func.count(), db.func.sum(Ponto.entrada), db.func.sum(Ponto.saida), db.func.max(db.func.coalesce(Ponto.saida, Ponto.entrada)))
+        .where(*criterios),
+        ano,
+    )).one()
+
+    def gerar():
+        apuracao = apurar_pontos(ano, mes, *criterios, ordem=Ponto.data)
+        return {
+            'funcionario': user_id,
+            'mes': f'{ano}-{mes:02d}',
+            'jornada': apuracao.jornada,
+            'totais': {
+                'segundos_trabalhados': apuracao.segundos_trabalhados,
+                'segundos_extras': apuracao.segundos_extras,
+                'dias_trabalhados': apuracao.dias_trabalhados,
+                'saldo_segundos': apuracao.saldo_segundos,
+            },
+            'colunas': ['data', 'entrada', 'saida', 'trabalhadas', 'saldo'],
+            'linhas': [[data.isoformat(), entrada, saida, trabalhadas, saldo] for data, entrada, saida, trabalhadas, saldo in apuracao.dias()],
+        }
+
+    versao = ('ponto', user_id, ano, mes, quantidade, entradas, saidas, tabelas_folha.jornada(ano, mes))
+    return responder_condicional(versao, gerar, epoch_para_data(ultima))
+
+@app.route('/api/v1/holerite')
+def api_holerite():
+    exigir_login_api()
+    user_id = funcionario_da_requisicao()
+    ano, mes = mes_da_requisicao()
+
+    funcionario = db.session.execute(db.select(User.nome, User.salario_mensal).where(User.id == user_id)).one_or_none()
+    if funcionario is None:
+        abort(404)
+    totais = resumo_do_mes(user_id, ano, mes)
+    regras = tabelas_folha.regras(ano, mes)
+
+    gerar = lambda: calcular_holerite(funcionario.nome, f'{ano}-{mes:02d}', totais, funcionario.salario_mensal, regras)
+    return responder_condicional(('holerite', user_id, ano, mes, tuple(funcionario), tuple(totais), regras.vigencia), gerar)
+
+@app.route('/api/v1/avisos')
+def api_avisos():
+    exigir_login_api()
+
+    # Versão do mural: avisos são só incluídos, então quantidade e último id bastam
+    quantidade, ultimo_id, ultimo = db.session.execute(
+        db.select(db.func.count(Aviso.id), db.func.max(Aviso.id), db.func.max(Aviso.criado_em))
+    ).one()
+
+    def gerar():
+        consulta = db.select(Aviso.id, Aviso.titulo, Aviso.conteudo, Aviso.imagem, Aviso.criado_em)
+        avisos, proximo = paginar(consulta, [Aviso.criado_em, Aviso.id], decrescente=True)
+        return {
+            'colunas': ['id', 'titulo', 'conteudo', 'imagem', 'criado_em'],
+            'linhas': [
+                [id, titulo, conteudo, url_imagem_aviso(imagem) if imagem else None, criado_em.isoformat()]
+                for id, titulo, conteudo, imagem, criado_em in avisos
+            ],
+            'proximo': proximo,
+        }
+
+    versao = ('avisos', quantidade, ultimo_id, request.args.get('cursor'), request.args.get('limite'))
+    return responder_condicional(versao, gerar, ultimo.replace(tzinfo=timezone.utc) if ultimo else None)
+
+@app.route('/api/v1/funcionarios')
+def api_funcionarios():
+    exigir_login_api()
+    if current_user.tipo != 'admin':
+        abort(403)
+
+    # Cadastros podem ser editados, então a versão é o próprio conteúdo da página
+    lista, proximo = paginar(consultar_funcionarios(User.data_admissao, User.data_demissao), [User.nome, User.id])
+    colunas = ['id', 'nome', 'email', 'cpf', 'tipo', 'ativo', 'data_admissao', 'data_demissao']
+    linhas = [[v.isoformat() if isinstance(v, date) else v for v in linha] for linha in lista]
+    return responder_condicional(('funcionarios', linhas, proximo), lambda: {'colunas': colunas, 'linhas': linhas, 'proximo': proximo})
+
 # Rodar o app
 if __name__ == '__main__':
     with app.app_context():
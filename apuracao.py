@@ -0,0 +1,94 @@
+# Apuração de horas a partir dos registros de ponto
+#
+# Os registros são carregados em colunas (array) a partir de tuplas
+# (data, entrada, saida) vindas de um SELECT simples, sem objetos do ORM.
+# Entrada e saída são epoch em segundos, como gravados na tabela ponto.
+from array import array
+from collections import namedtuple
+from datetime import date, timedelta
+
+JORNADA_PADRAO = 10 * 3600  # 10 horas por dia, em segundos (valor inicial das tabelas da folha)
+SEM_REGISTRO = -1  # Marca entrada/saída ausente nas colunas
+
+
+class ColunasPonto:
+    def __init__(self):
+        self.datas = array('l')  # date.toordinal()
+        self.entradas = array('q')
+        self.saidas = array('q')
+
+    def __len__(self):
+        return len(self.datas)
+
+    @classmethod
+    def de_linhas(cls, linhas):
+        colunas = cls()
+        datas, entradas, saidas = colunas.datas, colunas.entradas, colunas.saidas
+        for data, entrada, saida in linhas:
+            datas.append(data.toordinal())
+            entradas.append(SEM_REGISTRO if entrada is None else entrada)
+            saidas.append(SEM_REGISTRO if saida is None else saida)
+        return colunas
+
+
+class Apuracao:
+    def __init__(self, colunas, trabalhadas, jornada):
+        self.colunas = colunas
+        self.trabalhadas = trabalhadas  # Segundos por registro, SEM_REGISTRO se incompleto
+        self.jornada = jornada
+
+        completos = [t for t in trabalhadas if t != SEM_REGISTRO]
+        self.dias_trabalhados = len(completos)
+        self.segundos_trabalhados = sum(completos)
+        self.segundos_extras = sum(t - jornada for t in completos if t > jornada)
+        self.saldo_segundos = self.segundos_trabalhados - jornada * self.dias_trabalhados
+
+    @property
+    def horas_trabalhadas(self):
+        return self.segundos_trabalhados / 3600
+
+    @property
+    def horas_extras(self):
+        return self.segundos_extras / 3600
+
+    @property
+    def saldo(self):
+        return timedelta(seconds=self.saldo_segundos)
+
+    def dias(self):
+        """Percorre os registros como (data, entrada, saida, trabalhadas, saldo), com None no que faltar."""
+        colunas, jornada = self.colunas, self.jornada
+        for ordinal, entrada, saida, trabalhadas in zip(colunas.datas, colunas.entradas, colunas.saidas, self.trabalhadas):
+            completo = trabalhadas != SEM_REGISTRO
+            yield (
+                date.fromordinal(ordinal),
+                None if entrada == SEM_REGISTRO else entrada,
+                None if saida == SEM_REGISTRO else saida,
+                trabalhadas if completo else None,
+                trabalhadas - jornada if completo else None,
+            )
+
+
+# Totais já somados (pelo banco ou por uma apuração), sem os registros individuais
+class Totais(namedtuple('Totais', 'segundos_trabalhados segundos_extras dias_trabalhados')):
+    __slots__ = ()
+
+    @property
+    def horas_trabalhadas(self):
+        return self.segundos_trabalhados / 3600
+
+    @property
+    def horas_extras(self):
+        return self.segundos_extras / 3600
+
+    def saldo_segundos(self, jornada):
+        return self.segundos_trabalhados - jornada * self.dias_trabalhados
+
+
+def apurar(colunas, jornada):
+    """jornada: segundos por dia vigentes no período (RegrasFolha.jornada)."""
+    trabalhadas = array('q', [
+        SEM_REGISTRO if entrada == SEM_REGISTRO or saida == SEM_REGISTRO else saida - entrada
+        for entrada, saida in zip(colunas.entradas, colunas.saidas)
+    ])
+    return Apuracao(colunas, trabalhadas, jornada)
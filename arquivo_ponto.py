@@ -0,0 +1,74 @@
+# Arquivamento do ponto por ano: anos encerrados saem da tabela ponto para ponto_AAAA
+#
+# A tabela ponto guarda só os anos recentes (PONTO_ANOS_QUENTES), então o
+# tamanho dela, o do índice e o da parte que fica no cache do banco não
+# crescem com a idade da empresa. Cada ano antigo vai para uma tabela
+# própria e compacta: no SQLite, WITHOUT ROWID com chave (user_id, data),
+# o que deixa os dias de um funcionário juntos no disco e dispensa um índice
+# separado. Os resumos mensais continuam em resumo_mensal.
+#
+# As consultas continuam escritas sobre Ponto; trocar_tabela() as reescreve
+# para a tabela do ano quando ele está arquivado. Os anos arquivados ficam
+# registrados no banco (ponto_arquivado). A resposta "arquivado" fica em
+# memória, porque um ano arquivado não volta para a tabela ponto; a resposta
+# "não arquivado" é consultada de novo a cada vez, porque outro processo pode
+# ter arquivado o ano nesse meio tempo. O ano corrente nunca é arquivado.
+import threading
+from datetime import date
+
+from sqlalchemy import Column, Date, Integer, MetaData, PrimaryKeyConstraint, Table
+from sqlalchemy.sql import visitors
+
+
+def trocar_tabela(consulta, origem, destino):
+    """A mesma consulta, lendo de destino no lugar de origem (colunas com os mesmos nomes)."""
+    def trocar(elemento):
+        if elemento is origem:
+            return destino
+        if isinstance(elemento, Column) and getattr(elemento, 'table', None) is origem:
+            return destino.c[elemento.name]
+        return None
+    return visitors.replacement_traverse(consulta, {}, trocar)
+
+
+class ParticoesPonto:
+    def __init__(self, quente, anos_quentes=2):
+        self.quente = quente  # Tabela ponto
+        self.anos_quentes = anos_quentes  # Anos mantidos na tabela ponto, contando o corrente
+        self.metadata = MetaData()  # Separado do db.metadata: create_all não cria tabelas de arquivo
+        self._tabelas = {}
+        self._arquivados = set()
+        self._trava = threading.Lock()
+
+    def tabela(self, ano):
+        with self._trava:
+            if ano not in self._tabelas:
+                self._tabelas[ano] = Table(
+                    f'ponto_{ano}', self.metadata,
+                    Column('id', Integer, nullable=False),
+                    Column('user_id', Integer, nullable=False),
+                    Column('data', Date, nullable=False),
+                    Column('entrada', Integer),
+                    Column('saida', Integer),
+                    PrimaryKeyConstraint('user_id', 'data'),
+                    sqlite_with_rowid=False,
+                )
+            return self._tabelas[ano]
+
+    def ultimo_ano_a_arquivar(self, hoje=None):
+        return (hoje or date.today()).year - max(self.anos_quentes, 1)
+
+    def conhecido(self, ano):
+        """True/False quando se sabe, sem consultar o banco, se o ano está arquivado; senão None."""
+        if ano >= date.today().year:
+            return False
+        return True if ano in self._arquivados else None
+
+    def marcar(self, ano):
+        self._arquivados.add(ano)
+
+    def rotear(self, consulta, ano_arquivado):
+        """ano_arquivado: o ano, se a consulta deve ler do arquivo dele, ou None para a tabela ponto."""
+        if ano_arquivado is None:
+            return consulta
+        return trocar_tabela(consulta, self.quente, self.tabela(ano_arquivado))
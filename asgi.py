@@ -0,0 +1,252 @@
+# Modo de execução ASGI: as rotas de leitura mais acessadas consultam o banco sem bloquear
+#
+# O histórico do funcionário, o mural e os números do painel são atendidos
+# por corrotinas que leem o banco por um driver assíncrono (aiosqlite ou
+# asyncpg, conforme DATABASE_URL): enquanto uma consulta espera o banco
+# (ou um lock do SQLite), o processo continua atendendo outras conexões.
+# Consultas, autenticação, templates e métricas são os mesmos da versão
+# síncrona, dentro de um contexto de requisição do Flask. As demais rotas
+# continuam sendo o app WSGI, executado num pool de threads para não travar
+# o laço de eventos; a geração de PDF já roda nos processos da FilaPdf.
+#
+# Produção: python asgi.py [--trabalhadores N] [--host 0.0.0.0] [--porta 8000]
+# (ou: uvicorn asgi:aplicacao --workers N). Depende de uvicorn, do suporte
+# a asyncio do SQLAlchemy (greenlet) e do driver do banco.
+import argparse
+import asyncio
+import contextvars
+import io
+import sys
+from concurrent.futures import ThreadPoolExecutor
+
+from flask import abort, render_template, session
+from flask_login import current_user
+from markupsafe import Markup
+
+from agendador import idade
+from apuracao import apurar, ColunasPonto
+from banco import criar_engine_async
+from app import (
+    app, db, agendador, cache_fragmentos, cache_usuarios, login_manager, particoes_ponto, tabelas_folha, UsuarioSessao, Ponto,
+    CHAVES_MURAL, consulta_agregado, consulta_ano_arquivado, consulta_mural, consulta_pagina, consulta_pontos, consulta_usuario_sessao,
+    criterios_historico, estatisticas_painel, fechar_pagina, ler_agregado, linhas_json, mes_corrente, partes_mural,
+    periodo_historico, quer_json, renderizar_historico, responder_painel,
+)
+
+
+def montar_environ(scope, corpo):
+    """Ambiente WSGI equivalente à requisição HTTP do ASGI."""
+    environ = {
+        'REQUEST_METHOD': scope['method'],
+        'SCRIPT_NAME': scope.get('root_path', '').encode('utf-8').decode('latin-1'),
+        'PATH_INFO': scope['path'].encode('utf-8').decode('latin-1'),
+        'QUERY_STRING': scope['query_string'].decode('latin-1'),
+        'SERVER_PROTOCOL': f"HTTP/{scope['http_version']}",
+        'wsgi.version': (1, 0),
+        'wsgi.url_scheme': scope.get('scheme', 'http'),
+        'wsgi.input': io.BytesIO(corpo),
+        'wsgi.errors': sys.stderr,
+        'wsgi.multithread': True,
+        'wsgi.multiprocess': True,
+        'wsgi.run_once': False,
+    }
+    servidor = scope.get('server') or ('localhost', 80)
+    environ['SERVER_NAME'], environ['SERVER_PORT'] = servidor[0], str(servidor[1])
+    if scope.get('client'):
+        environ['REMOTE_ADDR'], environ['REMOTE_PORT'] = scope['client'][0], str(scope['client'][1])
+    for nome, valor in scope['headers']:
+        nome = nome.decode('latin-1').upper().replace('-', '_')
+        chave = nome if nome in ('CONTENT_TYPE', 'CONTENT_LENGTH') else f'HTTP_{nome}'
+        valor = valor.decode('latin-1')
+        environ[chave] = f'{environ[chave]},{valor}' if chave in environ else valor
+    return environ
+
+
+async def ler_corpo(receive):
+    partes = []
+    while True:
+        mensagem = await receive()
+        if mensagem['type'] != 'http.request':
+            break
+        partes.append(mensagem.get('body', b''))
+        if not mensagem.get('more_body'):
+            break
+    return b''.join(partes)
+
+
+def cabecalhos_asgi(cabecalhos):
+    return [(nome.lower().encode('latin-1'), valor.encode('latin-1')) for nome, valor in cabecalhos]
+
+
+def no_contexto(funcao, *args):
+    with app.app_context():
+        return funcao(*args)
+
+
+class PortalAsgi:
+    def __init__(self, app):
+        self.app = app
+        with app.app_context():
+            self.banco = criar_engine_async(db.engine.url, app.config)
+        self.threads = ThreadPoolExecutor(max_workers=app.config['ASGI_THREADS_WSGI'], thread_name_prefix='wsgi')
+        # Rotas atendidas por corrotinas (só GET, todas exigem login); o resto vai para o app WSGI
+        self.rotas = {
+            '/historico': self.historico,
+            '/avisos': self.mural,
+            '/admin/dashboard': self.painel,
+        }
+
+    async def __call__(self, scope, receive, send):
+        if scope['type'] == 'lifespan':
+            await self._ciclo_de_vida(receive, send)
+        elif scope['type'] == 'http':
+            rota = self.rotas.get(scope['path']) if scope['method'] == 'GET' else None
+            if rota is not None:
+                await self._atender(scope, send, rota)
+            else:
+                await self._atender_wsgi(scope, receive, send)
+
+    async def _ciclo_de_vida(self, receive, send):
+        while True:
+            mensagem = await receive()
+            if mensagem['type'] == 'lifespan.startup':
+                await send({'type': 'lifespan.startup.complete'})
+            elif mensagem['type'] == 'lifespan.shutdown':
+                await self.banco.dispose()
+                self.threads.shutdown(wait=False)
+                await send({'type': 'lifespan.shutdown.complete'})
+                return
+
+    # Mesmo caminho de Flask.wsgi_app/full_dispatch_request, com a view aguardada
+    async def _atender(self, scope, send, rota):
+        contexto = self.app.request_context(montar_environ(scope, b''))
+        erro = None
+        try:
+            contexto.push()
+            try:
+                try:
+                    resposta = self.app.preprocess_request()
+                    if resposta is None:
+                        await self._carregar_usuario()
+                        resposta = await rota() if current_user.is_authenticated else login_manager.unauthorized()
+                except Exception as e:
+                    resposta = self.app.handle_user_exception(e)
+                resposta = self.app.finalize_request(resposta)
+            except Exception as e:
+                erro = e
+                resposta = self.app.handle_exception(e)
+            await send({'type': 'http.response.start', 'status': resposta.status_code, 'headers': cabecalhos_asgi(resposta.headers.items())})
+            await send({'type': 'http.response.body', 'body': resposta.get_data()})
+        finally:
+            contexto.pop(erro)
+
+    # Põe o usuário da sessão no cache lido pelo user_loader, para o Flask-Login não consultar o banco de forma síncrona
+    async def _carregar_usuario(self):
+        user_id = session.get('_user_id')
+        if user_id is None or cache_usuarios.obter(int(user_id)) is not None:
+            return
+        async with self.banco.connect() as conexao:
+            linha = (await conexao.execute(consulta_usuario_sessao(int(user_id)))).first()
+        if linha is not None:
+            cache_usuarios.guardar(int(user_id), UsuarioSessao(*linha))
+
+    async def _paginar(self, consulta, chaves, decrescente=False):
+        consulta, limite = consulta_pagina(consulta, chaves, decrescente)
+        async with self.banco.connect() as conexao:
+            linhas = (await conexao.execute(consulta)).all()
+        return fechar_pagina(linhas, chaves, limite)
+
+    async def historico(self):
+        ano, mes, mes_display = periodo_historico()
+        consulta = consulta_pontos(*criterios_historico(ano, mes), ordem=Ponto.data.desc())
+        async with self.banco.connect() as conexao:
+            arquivado = particoes_ponto.conhecido(ano)
+            if arquivado is None:
+                arquivado = (await conexao.execute(consulta_ano_arquivado(ano))).first() is not None
+                if arquivado:
+                    particoes_ponto.marcar(ano)
+            linhas = await conexao.execute(particoes_ponto.rotear(consulta, ano if arquivado else None))
+        return renderizar_historico(apurar(ColunasPonto.de_linhas(linhas), tabelas_folha.jornada(ano, mes)), mes_display)
+
+    async def mural(self):
+        if quer_json():
+            return linhas_json(*await self._paginar(consulta_mural(), CHAVES_MURAL, decrescente=True))
+
+        partes = partes_mural()
+        html, versao = cache_fragmentos.procurar('mural', partes)
+        if html is None:
+            avisos, proximo = await self._paginar(consulta_mural(), CHAVES_MURAL, decrescente=True)
+            html = render_template('mural_avisos.html', avisos=avisos, proximo=proximo)
+            cache_fragmentos.guardar('mural', versao, partes, html)
+        return render_template('mural.html', avisos_html=Markup(html))
+
+    async def painel(self):
+        if current_user.tipo != 'admin':
+            abort(403)
+
+        chave = mes_corrente()
+        partes = (current_user.tipo, chave)
+        estatisticas, versao = cache_fragmentos.procurar('painel_admin', partes)
+        if estatisticas is None:
+            async with self.banco.connect() as conexao:
+                gravado = ler_agregado((await conexao.execute(consulta_agregado('painel_admin', chave))).first())
+            if gravado is None or idade(gravado[1]) > agendador.metricas['painel_admin'].validade:
+                # Valor vencido: recalcula pelo agendador (síncrono), fora do laço de eventos
+                gravado = await asyncio.get_running_loop().run_in_executor(self.threads, no_contexto, agendador.obter, 'painel_admin', chave)
+            estatisticas = estatisticas_painel(*gravado)
+            cache_fragmentos.guardar('painel_admin', versao, partes, estatisticas, self.app.config['FRAGMENTOS_VALIDADE_PAINEL'])
+        return responder_painel(estatisticas)
+
+    # Rotas síncronas: o app WSGI roda nas threads do pool, e a resposta é enviada em blocos.
+    # Cada passo roda no mesmo Context: respostas com stream_with_context abrem o contexto
+    # do Flask num bloco e o fecham em outro, talvez em outra thread.
+    async def _atender_wsgi(self, scope, receive, send):
+        environ = montar_environ(scope, await ler_corpo(receive))
+        loop = asyncio.get_running_loop()
+        executar = contextvars.Context().run
+        inicio = {}
+
+        def start_response(status, cabecalhos, exc_info=None):
+            inicio['status'] = int(status.split(' ', 1)[0])
+            inicio['cabecalhos'] = cabecalhos
+
+        resultado = await loop.run_in_executor(self.threads, executar, self.app, environ, start_response)
+        blocos = iter(resultado)
+        try:
+            enviado = False
+            while True:
+                bloco = await loop.run_in_executor(self.threads, executar, next, blocos, None)
+                if bloco is None:
+                    break
+                if not enviado:
+                    await send({'type': 'http.response.start', 'status': inicio['status'], 'headers': cabecalhos_asgi(inicio['cabecalhos'])})
+                    enviado = True
+                if bloco:
+                    await send({'type': 'http.response.body', 'body': bloco, 'more_body': True})
+            if not enviado:
+                await send({'type': 'http.response.start', 'status': inicio['status'], 'headers': cabecalhos_asgi(inicio['cabecalhos'])})
+            await send({'type': 'http.response.body', 'body': b''})
+        finally:
+            if hasattr(resultado, 'close'):
+                await loop.run_in_executor(self.threads, executar, resultado.close)
+
+
+aplicacao = PortalAsgi(app)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Servidor ASGI do portal (uvicorn).')
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--porta', type=int, default=8000)
+    parser.add_argument('--trabalhadores', type=int, default=app.config['ASGI_TRABALHADORES'], help='Processos do servidor')
+    args = parser.parse_args()
+
+    import uvicorn
+
+    with app.app_context():
+        db.create_all()
+    uvicorn.run('asgi:aplicacao', host=args.host, port=args.porta, workers=args.trabalhadores, proxy_headers=True)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,77 @@
+# Configuração do engine do banco de dados
+#
+# O perfil 'producao' liga o WAL e ajusta os PRAGMAs do SQLite para que
+# leituras (holerites, históricos) não esperem atrás das gravações de ponto,
+# e dimensiona o pool de conexões. Com DATABASE_URL apontando para o
+# PostgreSQL, só o pool é configurado. O perfil 'padrao' mantém os valores
+# padrão do SQLAlchemy/SQLite. O modo ASGI usa um engine assíncrono
+# (aiosqlite/asyncpg) criado com as mesmas opções.
+from sqlalchemy import event
+from sqlalchemy.engine import make_url
+
+# Drivers assíncronos usados no modo ASGI, por banco
+DRIVERS_ASYNC = {'sqlite': 'sqlite+aiosqlite', 'postgresql': 'postgresql+asyncpg'}
+
+PRAGMAS_PRODUCAO = {
+    'journal_mode': 'WAL',
+    'synchronous': 'NORMAL',
+    'busy_timeout': 5000,  # ms
+    'cache_size': -64000,  # Negativo = KiB (cerca de 64 MB)
+    'mmap_size': 256 * 1024 * 1024,
+    'temp_store': 'MEMORY',
+}
+
+
+def opcoes_engine(config):
+    url = make_url(config['SQLALCHEMY_DATABASE_URI'])
+    if config.get('BANCO_PERFIL') != 'producao':
+        return {}
+
+    opcoes = {
+        'pool_size': config.get('BANCO_POOL_TAMANHO', 10),
+        'max_overflow': config.get('BANCO_POOL_EXTRA', 20),
+        'pool_timeout': config.get('BANCO_POOL_ESPERA', 30),
+    }
+    if url.get_backend_name() == 'sqlite':
+        if url.database in (None, '', ':memory:'):
+            return {}  # Banco em memória usa uma única conexão, sem pool
+        opcoes['connect_args'] = {'timeout': PRAGMAS_PRODUCAO['busy_timeout'] / 1000, 'check_same_thread': False}
+    else:
+        opcoes['pool_pre_ping'] = True
+        opcoes['pool_recycle'] = 1800
+    return opcoes
+
+
+def aplicar_perfil(engine, config):
+    if config.get('BANCO_PERFIL') != 'producao' or engine.dialect.name != 'sqlite':
+        return
+
+    pragmas = {**PRAGMAS_PRODUCAO, **config.get('SQLITE_PRAGMAS', {})}
+
+    @event.listens_for(engine, 'connect')
+    def configurar_conexao(conexao_dbapi, registro):
+        cursor = conexao_dbapi.cursor()
+        for nome, valor in pragmas.items():
+            cursor.execute(f'PRAGMA {nome}={valor}')
+        cursor.close()
+
+
+def iniciar_escrita(conexao):
+    """Abre a transação do SQLite já com a trava de escrita (BEGIN IMMEDIATE), se ainda não houver uma.
+
+    O pysqlite só emite o BEGIN antes do primeiro INSERT/UPDATE/DELETE; sem isso, um SAVEPOINT
+    (session.begin_nested) no início abriria a transação sozinho e o RELEASE dele faria o commit.
+    """
+    if conexao.dialect.name == 'sqlite' and not conexao.connection.dbapi_connection.in_transaction:
+        conexao.exec_driver_sql('BEGIN IMMEDIATE')
+
+
+def criar_engine_async(url, config):
+    """Engine assíncrono para o mesmo banco do app (modo ASGI), com o mesmo perfil."""
+    from sqlalchemy.ext.asyncio import create_async_engine
+
+    url = make_url(url)
+    url = url.set(drivername=DRIVERS_ASYNC[url.get_backend_name()])
+    engine = create_async_engine(url, **opcoes_engine({**config, 'SQLALCHEMY_DATABASE_URI': url}))
+    aplicar_perfil(engine.sync_engine, config)  # Os PRAGMAs valem para as conexões do driver assíncrono também
+    return engine
@@ -0,0 +1,76 @@
+"""Microbenchmark da apuração de horas.
+
+Compara o laço antigo (objetos por linha + strptime duas vezes por registro,
+somando timedelta) com a apuração em colunas do módulo apuracao.
+
+Uso: python -m benchmarks.bench_apuracao [quantidade_de_registros]
+"""
+import random
+import sys
+import time
+from datetime import date, datetime, timedelta
+from types import SimpleNamespace
+
+from apuracao import apurar, ColunasPonto
+
+
+def gerar_registros(quantidade):
+    random.seed(42)
+    inicio = date(2024, 1, 1)
+    linhas = []
+    for i in range(quantidade):
+        dia = inicio + timedelta(days=i % 365)
+        entrada = int(datetime.combine(dia, datetime.min.time()).timestamp()) + 8 * 3600 + random.randint(0, 3600)
+        saida = None if random.random() < 0.03 else entrada + random.randint(8 * 3600, 12 * 3600)
+        linhas.append((dia, entrada, saida))
+    return linhas
+
+
+def laco_antigo(objetos):
+    jornada = timedelta(hours=10)
+    total = timedelta()
+    extras = timedelta()
+    dias = 0
+    for r in objetos:
+        if r.hora_entrada and r.hora_saida:
+            ent = datetime.strptime(r.hora_entrada, "%H:%M:%S")
+            sai = datetime.strptime(r.hora_saida, "%H:%M:%S")
+            trabalhadas = sai - ent
+            total += trabalhadas
+            dias += 1
+            if trabalhadas > jornada:
+                extras += trabalhadas - jornada
+    return total.total_seconds(), extras.total_seconds(), dias
+
+
+def medir(funcao, repeticoes=5):
+    tempos = []
+    for _ in range(repeticoes):
+        inicio = time.perf_counter()
+        resultado = funcao()
+        tempos.append(time.perf_counter() - inicio)
+    return min(tempos), resultado
+
+
+def main():
+    quantidade = int(sys.argv[1]) if len(sys.argv) > 1 else 100_000
+    linhas = gerar_registros(quantidade)
+
+    def hora(epoch):
+        return datetime.fromtimestamp(epoch).strftime("%H:%M:%S") if epoch is not None else None
+
+    objetos = [SimpleNamespace(data=d.isoformat(), hora_entrada=hora(e), hora_saida=hora(s)) for d, e, s in linhas]
+
+    tempo_antigo, (total, extras, dias) = medir(lambda: laco_antigo(objetos))
+    tempo_novo, apuracao = medir(lambda: apurar(ColunasPonto.de_linhas(linhas), 10 * 3600))  # A jornada do laço antigo
+
+    assert (apuracao.segundos_trabalhados, apuracao.segundos_extras, apuracao.dias_trabalhados) == (total, extras, dias)
+
+    print(f"Registros:              {quantidade}")
+    print(f"Laço antigo (strptime): {tempo_antigo * 1000:8.1f} ms")
+    print(f"Apuração em colunas:    {tempo_novo * 1000:8.1f} ms")
+    print(f"Ganho:                  {tempo_antigo / tempo_novo:8.1f}x")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,132 @@
+"""Leituras x gravações concorrentes com e sem o perfil de produção do banco.
+
+Para cada perfil (BANCO_PERFIL=padrao e producao) cria um banco SQLite
+temporário com funcionários e um mês de registros, e por alguns segundos
+roda ao mesmo tempo:
+  - leitores abrindo /admin/funcionario/<id>/historico pelo cliente de teste;
+  - gravadores registrando pontos com commits próprios, como vários
+    processos web fariam.
+Mostra leituras e gravações por segundo, p99 da leitura e erros de banco
+bloqueado.
+
+Uso: python -m benchmarks.bench_banco [--segundos 5] [--leitores 8] [--gravadores 4]
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from datetime import date, datetime, timedelta
+
+RAIZ = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+FUNCIONARIOS = 200
+
+
+def percentil(valores, p):
+    ordenados = sorted(valores)
+    return ordenados[min(len(ordenados) - 1, int(len(ordenados) * p / 100))] if ordenados else 0.0
+
+
+def executar_perfil(args):
+    pasta = tempfile.mkdtemp()
+    os.environ['DATABASE_URL'] = 'sqlite:///' + os.path.join(pasta, 'bench.db')
+
+    from app import app, db, User, Ponto, gravar_pontos
+
+    app.template_folder = RAIZ  # Os templates ficam na raiz do repositório
+    inicio_mes = date.today().replace(day=1)
+
+    with app.app_context():
+        db.create_all()
+        db.session.execute(db.insert(User), [
+            {'nome': f'Funcionário {i}', 'email': f'func{i}@bench.local', 'senha': '-', 'tipo': 'funcionario', 'ativo': True}
+            for i in range(FUNCIONARIOS)
+        ] + [{'nome': 'Admin', 'email': 'admin@bench.local', 'senha': '-', 'tipo': 'admin', 'ativo': True}])
+        ids = db.session.execute(db.select(User.id).where(User.tipo == 'funcionario')).scalars().all()
+        admin_id = db.session.execute(db.select(User.id).where(User.tipo == 'admin')).scalar()
+
+        registros = []
+        for user_id in ids:
+            for dia in range(20):
+                data = inicio_mes + timedelta(days=dia)
+                entrada = int(datetime.combine(data, datetime.min.time()).timestamp()) + 8 * 3600
+                registros.append({'user_id': user_id, 'data': data, 'entrada': entrada, 'saida': entrada + 9 * 3600})
+        db.session.execute(db.insert(Ponto), registros)
+        db.session.commit()
+
+    fim = time.monotonic() + args.segundos
+    latencias, gravacoes, erros = [], [0], [0]
+    trava = threading.Lock()
+
+    def leitor(indice):
+        cliente = app.test_client()
+        with cliente.session_transaction() as sessao:
+            sessao['_user_id'] = str(admin_id)
+            sessao['_fresh'] = True
+        i = indice
+        while time.monotonic() < fim:
+            inicio = time.perf_counter()
+            resposta = cliente.get(f'/admin/funcionario/{ids[i % len(ids)]}/historico')
+            with trava:
+                latencias.append(time.perf_counter() - inicio)
+                if resposta.status_code != 200:
+                    erros[0] += 1
+            i += args.leitores
+
+    def gravador(indice):
+        dia = date(2000, 1, 1) + timedelta(days=indice * 100000)
+        while time.monotonic() < fim:
+            item = ('entrada', ids[indice % len(ids)], dia, int(time.time()))
+            try:
+                gravar_pontos([item])
+                with trava:
+                    gravacoes[0] += 1
+            except Exception:
+                with trava:
+                    erros[0] += 1
+            dia += timedelta(days=1)
+
+    threads = [threading.Thread(target=leitor, args=(i,)) for i in range(args.leitores)]
+    threads += [threading.Thread(target=gravador, args=(i,)) for i in range(args.gravadores)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    print(json.dumps({
+        'leituras_s': len(latencias) / args.segundos,
+        'gravacoes_s': gravacoes[0] / args.segundos,
+        'leitura_p99_ms': percentil(latencias, 99) * 1000,
+        'erros': erros[0],
+    }))
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--segundos', type=float, default=5)
+    parser.add_argument('--leitores', type=int, default=8)
+    parser.add_argument('--gravadores', type=int, default=4)
+    parser.add_argument('--perfil', help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.perfil:
+        executar_perfil(args)
+        return
+
+    print(f"{'perfil':<10} {'leituras/s':>11} {'gravações/s':>12} {'p99 leitura (ms)':>17} {'erros':>6}")
+    for perfil in ('padrao', 'producao'):
+        ambiente = {**os.environ, 'BANCO_PERFIL': perfil}
+        saida = subprocess.run(
+            [sys.executable, '-m', 'benchmarks.bench_banco', '--perfil', perfil,
+             '--segundos', str(args.segundos), '--leitores', str(args.leitores), '--gravadores', str(args.gravadores)],
+            cwd=RAIZ, env=ambiente, capture_output=True, text=True, check=True,
+        ).stdout
+        r = json.loads(saida.strip().splitlines()[-1])
+        print(f"{perfil:<10} {r['leituras_s']:11.0f} {r['gravacoes_s']:12.0f} {r['leitura_p99_ms']:17.1f} {r['erros']:6d}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,76 @@
+"""Compara os renderizadores de PDF (wkhtmltopdf x ReportLab).
+
+Mede a latência por documento e o pico de memória de cada backend para o
+holerite e o TRCT. O wkhtmltopdf roda em processo externo, então sua
+memória é o maior RSS entre os processos filhos; a do ReportLab é o pico
+alocado no próprio processo (tracemalloc).
+
+Uso: python -m benchmarks.bench_renderizadores [caminho_wkhtmltopdf] [repeticoes]
+"""
+import os
+import resource
+import shutil
+import sys
+import time
+import tracemalloc
+
+from jinja2 import Environment, FileSystemLoader
+
+from renderizadores import RenderizadorReportlab, RenderizadorWkhtmltopdf
+
+RAIZ = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+DOCUMENTOS = {
+    'holerite.html': dict(nome='Maria da Silva', mes='2025-03', dias=21, horas=212.5, salario=1873.86),
+    'trct_pdf.html': dict(
+        funcionario=dict(nome='Maria da Silva', email='maria@empresa.com', cpf='123.456.789-00'),
+        trct=dict(
+            admissao='10/01/2023', demissao='14/03/2025', motivo_rescisao='Sem justa causa',
+            saldo_salario=905.33, ferias_vencidas=2586.67, ferias_proporcionais=2242.44,
+            decimo_terceiro=485.0, multa_fgts=1614.08, desconto_inss=155.2, desconto_vt=97.0,
+            total_liquido=7581.32,
+        ),
+    ),
+}
+
+
+def medir(renderizador, template, contexto, html, repeticoes):
+    tempos = []
+    for _ in range(repeticoes):
+        inicio = time.perf_counter()
+        pdf = renderizador.renderizar(template, contexto, html)
+        tempos.append(time.perf_counter() - inicio)
+    tempos.sort()
+    return tempos[len(tempos) // 2], len(pdf)
+
+
+def main():
+    wkhtmltopdf = sys.argv[1] if len(sys.argv) > 1 else shutil.which('wkhtmltopdf')
+    repeticoes = int(sys.argv[2]) if len(sys.argv) > 2 else 20
+    ambiente = Environment(loader=FileSystemLoader(RAIZ))
+
+    backends = [('reportlab', RenderizadorReportlab())]
+    if wkhtmltopdf:
+        backends.append(('wkhtmltopdf', RenderizadorWkhtmltopdf(wkhtmltopdf)))
+    else:
+        print('wkhtmltopdf não encontrado; medindo apenas o ReportLab.\n')
+
+    print(f"{'backend':<12} {'documento':<15} {'mediana (ms)':>13} {'bytes':>8} {'memória (KiB)':>14}")
+    for nome, renderizador in backends:
+        for template, contexto in DOCUMENTOS.items():
+            html = ambiente.get_template(template).render(**contexto) if renderizador.precisa_html else None
+            renderizador.renderizar(template, contexto, html)  # Aquecimento (imports e fontes)
+
+            tracemalloc.start()
+            mediana, tamanho = medir(renderizador, template, contexto, html, repeticoes)
+            _, pico = tracemalloc.get_traced_memory()
+            tracemalloc.stop()
+
+            if renderizador.precisa_html:
+                pico = resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss * 1024
+
+            print(f'{nome:<12} {template:<15} {mediana * 1000:13.1f} {tamanho:8d} {pico / 1024:14.0f}')
+
+
+if __name__ == '__main__':
+    main()
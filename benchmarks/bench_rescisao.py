@@ -0,0 +1,62 @@
+"""Microbenchmark do TRCT em lote.
+
+Compara calcular_trct chamado funcionário a funcionário com o cálculo em
+colunas do módulo rescisao, conferindo que todas as verbas são iguais.
+
+Uso: python -m benchmarks.bench_rescisao [quantidade_de_funcionarios]
+"""
+import os
+import random
+import sys
+import tempfile
+import time
+from datetime import date, timedelta
+from types import SimpleNamespace
+
+from rescisao import ColunasRescisao, calcular_rescisoes, CABECALHO
+
+
+def gerar_funcionarios(quantidade):
+    random.seed(42)
+    inicio = date(2010, 1, 1)
+    return [
+        (i, round(random.uniform(1412, 25000), 2), inicio + timedelta(days=random.randint(0, 5000)))
+        for i in range(1, quantidade + 1)
+    ]
+
+
+def medir(funcao, repeticoes=5):
+    tempos = []
+    for _ in range(repeticoes):
+        inicio = time.perf_counter()
+        resultado = funcao()
+        tempos.append(time.perf_counter() - inicio)
+    return min(tempos), resultado
+
+
+def main():
+    quantidade = int(sys.argv[1]) if len(sys.argv) > 1 else 10_000
+    os.environ['DATABASE_URL'] = 'sqlite:///' + os.path.join(tempfile.mkdtemp(), 'rescisao.db')
+    from app import calcular_trct, tabelas_folha
+
+    linhas = gerar_funcionarios(quantidade)
+    demissao = date(2024, 7, 19)
+    objetos = [SimpleNamespace(id=i, salario_mensal=s, data_admissao=a) for i, s, a in linhas]
+
+    tempo_antigo, esperados = medir(lambda: [calcular_trct(f, demissao) for f in objetos])
+    tempo_novo, rescisoes = medir(lambda: calcular_rescisoes(ColunasRescisao.de_linhas(linhas, demissao), tabelas_folha))
+
+    verbas = CABECALHO[4:]
+    for linha, esperado in zip(rescisoes.linhas(), esperados):
+        calculado = dict(zip(CABECALHO, linha))
+        assert all(calculado[v] == esperado[v] for v in verbas), (calculado, esperado)
+
+    print(f"Funcionários:            {quantidade}")
+    print(f"calcular_trct por linha: {tempo_antigo * 1000:8.1f} ms")
+    print(f"TRCT em colunas:         {tempo_novo * 1000:8.1f} ms")
+    print(f"Ganho:                   {tempo_antigo / tempo_novo:8.1f}x")
+    print(f"Custo total simulado:    R$ {rescisoes.total():,.2f}")
+
+
+if __name__ == '__main__':
+    main()
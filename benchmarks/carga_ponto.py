@@ -0,0 +1,79 @@
+"""Teste de carga da troca de turno: N funcionários batendo o ponto ao mesmo tempo.
+
+Cria um banco temporário com N funcionários, dispara N requisições
+simultâneas de entrada e depois N de saída pelo cliente de teste do Flask,
+e mostra registros por segundo, latências (p50/p99) e quantos commits
+foram feitos.
+
+Uso: python -m benchmarks.carga_ponto [--concorrencia 500] [--lote 200]
+     (--lote 1 grava cada registro em um commit próprio, para comparação)
+"""
+import argparse
+import os
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+
+def percentil(valores, p):
+    ordenados = sorted(valores)
+    return ordenados[min(len(ordenados) - 1, int(len(ordenados) * p / 100))]
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--concorrencia', type=int, default=500)
+    parser.add_argument('--lote', type=int, default=None, help='Registros por commit (padrão: PONTO_LOTE_MAXIMO)')
+    args = parser.parse_args()
+
+    pasta = tempfile.mkdtemp()
+    os.environ['DATABASE_URL'] = 'sqlite:///' + os.path.join(pasta, 'carga.db')
+
+    from app import app, db, User, fila_ponto
+
+    if args.lote:
+        fila_ponto.lote_maximo = args.lote
+
+    with app.app_context():
+        db.create_all()
+        db.session.execute(db.insert(User), [
+            {'nome': f'Funcionário {i}', 'email': f'func{i}@carga.local', 'senha': '-', 'tipo': 'funcionario', 'ativo': True}
+            for i in range(args.concorrencia)
+        ])
+        db.session.commit()
+        ids = db.session.execute(db.select(User.id)).scalars().all()
+
+    clientes = []
+    for user_id in ids:
+        cliente = app.test_client()
+        with cliente.session_transaction() as sessao:
+            sessao['_user_id'] = str(user_id)
+            sessao['_fresh'] = True
+        clientes.append(cliente)
+
+    for rota in ('/registrar_entrada', '/registrar_saida'):
+        largada = threading.Barrier(len(clientes))
+        lotes_antes = fila_ponto.lotes_gravados
+
+        def bater_ponto(cliente):
+            largada.wait()
+            inicio = time.perf_counter()
+            resposta = cliente.get(rota)
+            return time.perf_counter() - inicio, resposta.status_code
+
+        inicio = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=len(clientes)) as executor:
+            resultados = list(executor.map(bater_ponto, clientes))
+        duracao = time.perf_counter() - inicio
+
+        latencias = [latencia for latencia, _ in resultados]
+        falhas = sum(1 for _, status in resultados if status != 302)
+        print(f'{rota}: {len(resultados)} registros em {duracao:.2f}s '
+              f'({len(resultados) / duracao:.0f}/s), '
+              f'p50 {percentil(latencias, 50) * 1000:.0f} ms, p99 {percentil(latencias, 99) * 1000:.0f} ms, '
+              f'{fila_ponto.lotes_gravados - lotes_antes} commits, {falhas} falhas')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,238 @@
+"""Capacidade com muitas conexões simultâneas: modo WSGI atual x modo ASGI.
+
+Gera um banco sintético (benchmarks.dados_sinteticos), sobe o servidor em
+um subprocesso em cada modo e abre N conexões simultâneas, cada uma
+repetindo requisições por alguns segundos: histórico do funcionário,
+mural e números do painel (JSON). Para cada modo e nível de concorrência,
+mostra vazão, latências (p50/p99) e erros (conexões recusadas, tempo
+esgotado, status >= 500), e grava tudo em um JSON.
+
+WSGI é o servidor usado hoje (app.run, uma thread por conexão); ASGI é
+asgi.py sob o uvicorn, com o mesmo número de processos (--trabalhadores).
+
+Uso: python -m benchmarks.concorrencia [--conexoes 10,50,200] [--segundos 10]
+                                       [--trabalhadores 1] [--modos wsgi,asgi] [--saida arquivo.json]
+"""
+import argparse
+import asyncio
+import json
+import os
+import platform
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+from collections import Counter
+from datetime import date, datetime
+from itertools import cycle
+
+from benchmarks.suite import percentil, versao_git
+
+RAIZ = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def preparar_app():
+    from app import app, fila_pdf
+
+    app.config['PDF_RENDERIZADOR'] = 'reportlab'
+    fila_pdf.init_app(app)
+    if not os.path.isdir(os.path.join(app.root_path, app.template_folder)):
+        app.template_folder = app.root_path  # Nesta árvore os templates ficam na raiz do projeto
+    return app
+
+
+def criar_asgi():
+    """Fábrica usada pelo uvicorn nos processos do servidor ASGI."""
+    preparar_app()
+    from asgi import aplicacao
+    return aplicacao
+
+
+def servir(modo, porta, trabalhadores):
+    if modo == 'wsgi':
+        preparar_app().run(host='127.0.0.1', port=porta, threaded=True)
+    else:
+        import uvicorn
+        uvicorn.run('benchmarks.concorrencia:criar_asgi', factory=True, host='127.0.0.1', port=porta,
+                    workers=trabalhadores, log_level='warning')
+
+
+def porta_livre():
+    with socket.socket() as s:
+        s.bind(('127.0.0.1', 0))
+        return s.getsockname()[1]
+
+
+def esperar_porta(porta, processo, limite=60):
+    prazo = time.monotonic() + limite
+    while time.monotonic() < prazo:
+        if processo.poll() is not None:
+            raise RuntimeError(f'o servidor terminou com código {processo.returncode}')
+        try:
+            socket.create_connection(('127.0.0.1', porta), timeout=1).close()
+            return
+        except OSError:
+            time.sleep(0.2)
+    raise RuntimeError('o servidor não começou a aceitar conexões')
+
+
+async def requisitar(leitor, escritor, caminho, cookie):
+    escritor.write(f'GET {caminho} HTTP/1.1\r\nHost: 127.0.0.1\r\nCookie: {cookie}\r\n\r\n'.encode('latin-1'))
+    await escritor.drain()
+    linha_status = await leitor.readline()
+    if not linha_status:
+        raise ConnectionResetError('conexão fechada pelo servidor')
+    versao, status = linha_status.split(b' ', 2)[:2]
+    cabecalhos = {}
+    while True:
+        linha = await leitor.readline()
+        if linha in (b'\r\n', b'\n', b''):
+            break
+        nome, valor = linha.decode('latin-1').split(':', 1)
+        cabecalhos[nome.strip().lower()] = valor.strip()
+
+    if 'content-length' in cabecalhos:
+        await leitor.readexactly(int(cabecalhos['content-length']))
+    elif cabecalhos.get('transfer-encoding') == 'chunked':
+        while True:
+            tamanho = int((await leitor.readline()).split(b';')[0], 16)
+            await leitor.readexactly(tamanho + 2)
+            if tamanho == 0:
+                break
+    else:
+        await leitor.read()
+    manter = versao == b'HTTP/1.1' and cabecalhos.get('connection', '').lower() != 'close'
+    return int(status), manter
+
+
+async def cliente(porta, pedidos, prazo, latencias, status, tempo_limite):
+    leitor = escritor = None
+    while time.monotonic() < prazo:
+        caminho, cookie = next(pedidos)
+        antes = time.monotonic()
+        try:
+            if escritor is None:
+                leitor, escritor = await asyncio.wait_for(asyncio.open_connection('127.0.0.1', porta), tempo_limite)
+            codigo, manter = await asyncio.wait_for(requisitar(leitor, escritor, caminho, cookie), tempo_limite)
+        except (OSError, asyncio.IncompleteReadError, asyncio.TimeoutError, ValueError) as erro:
+            status[type(erro).__name__] += 1
+            if escritor is not None:
+                escritor.close()
+            leitor = escritor = None
+            await asyncio.sleep(0.05)
+            continue
+        latencias.append(time.monotonic() - antes)
+        status[str(codigo)] += 1
+        if not manter:
+            escritor.close()
+            leitor = escritor = None
+    if escritor is not None:
+        escritor.close()
+
+
+async def medir_nivel(porta, pedidos, conexoes, segundos, tempo_limite):
+    latencias, status = [], Counter()
+    prazo = time.monotonic() + segundos
+    inicio = time.monotonic()
+    await asyncio.gather(*(cliente(porta, pedidos, prazo, latencias, status, tempo_limite) for _ in range(conexoes)))
+    duracao = time.monotonic() - inicio
+    erros = sum(n for codigo, n in status.items() if not codigo.isdigit() or int(codigo) >= 500)
+    return {
+        'conexoes': conexoes,
+        'respostas': len(latencias),
+        'por_segundo': round(len(latencias) / duracao, 1),
+        'p50_ms': round(percentil(latencias, 50) * 1000, 2) if latencias else None,
+        'p99_ms': round(percentil(latencias, 99) * 1000, 2) if latencias else None,
+        'erros': erros,
+        'status': dict(sorted(status.items())),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--conexoes', default='10,50,200', help='Níveis de concorrência, separados por vírgula')
+    parser.add_argument('--segundos', type=float, default=10, help='Duração de cada nível')
+    parser.add_argument('--tempo-limite', type=float, default=30, help='Espera máxima por resposta')
+    parser.add_argument('--trabalhadores', type=int, default=1, help='Processos do servidor ASGI')
+    parser.add_argument('--modos', default='wsgi,asgi')
+    parser.add_argument('--funcionarios', type=int, default=200)
+    parser.add_argument('--meses', type=int, default=6)
+    parser.add_argument('--semente', type=int, default=42)
+    parser.add_argument('--saida', default=None, help='JSON de resultados (padrão: benchmarks/resultados/concorrencia-AAAAMMDD-HHMMSS.json)')
+    parser.add_argument('--servir', default=None, help=argparse.SUPPRESS)  # Uso interno: processo do servidor
+    parser.add_argument('--porta', type=int, default=None, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.servir:
+        servir(args.servir, args.porta, args.trabalhadores)
+        return
+
+    pasta = tempfile.mkdtemp()
+    ambiente = dict(
+        os.environ,
+        DATABASE_URL='sqlite:///' + os.path.join(pasta, 'benchmark.db'),
+        UPLOAD_FOLDER=os.path.join(pasta, 'avisos'),
+        AGENDADOR_THREAD='0',  # Os números do painel ficam pré-calculados antes da medição
+    )
+    os.environ.update(ambiente)
+
+    from app import app, db, User, Ponto, Aviso, agendador, recalcular_resumos
+    from benchmarks.dados_sinteticos import gerar
+
+    with app.app_context():
+        db.create_all()
+        dados = gerar(db, User, Ponto, Aviso, args.funcionarios, args.meses, 200, args.semente)
+        recalcular_resumos()
+        agendador.recalcular()
+    print(f"Dados: {dados['funcionarios']} funcionários, {dados['pontos']} registros de ponto")
+
+    # Sessões assinadas com a chave do app, como o login faria
+    assinar = app.session_interface.get_signing_serializer(app).dumps
+    nome_cookie = app.config['SESSION_COOKIE_NAME']
+    cookie = lambda user_id: f"{nome_cookie}={assinar({'_user_id': str(user_id), '_fresh': True})}"
+    hoje = date.today()
+    mes_passado = date(hoje.year - (hoje.month == 1), (hoje.month - 2) % 12 + 1, 1).strftime('%Y-%m')
+    pedidos = [(f'/historico?mes={mes_passado}', cookie(user_id)) for user_id in dados['funcionario_ids']]
+    pedidos += [('/avisos', cookie(user_id)) for user_id in dados['funcionario_ids'][:20]]
+    pedidos += [('/admin/dashboard?formato=json', cookie(dados['admin_id']))] * 20
+    niveis = [int(n) for n in args.conexoes.split(',')]
+
+    resultados = {}
+    for modo in args.modos.split(','):
+        porta = porta_livre()
+        processo = subprocess.Popen(
+            [sys.executable, '-m', 'benchmarks.concorrencia', '--servir', modo, '--porta', str(porta),
+             '--trabalhadores', str(args.trabalhadores)],
+            cwd=RAIZ, env=ambiente, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+        )
+        try:
+            esperar_porta(porta, processo)
+            resultados[modo] = []
+            for conexoes in niveis:
+                r = asyncio.run(medir_nivel(porta, cycle(pedidos), conexoes, args.segundos, args.tempo_limite))
+                resultados[modo].append(r)
+                print(f"{modo:5} {conexoes:5} conexões  {r['por_segundo']:8.1f} req/s   p50 {r['p50_ms']} ms   "
+                      f"p99 {r['p99_ms']} ms   erros {r['erros']}   status {r['status']}")
+        finally:
+            processo.terminate()
+            processo.wait()
+
+    relatorio = {
+        'data': datetime.now().isoformat(timespec='seconds'),
+        'versao': versao_git(),
+        'python': sys.version.split()[0],
+        'plataforma': platform.platform(),
+        'cpus': os.cpu_count(),
+        'parametros': {k: v for k, v in vars(args).items() if k not in ('saida', 'servir', 'porta')},
+        'modos': resultados,
+    }
+    saida = args.saida or os.path.join(os.path.dirname(__file__), 'resultados', datetime.now().strftime('concorrencia-%Y%m%d-%H%M%S') + '.json')
+    os.makedirs(os.path.dirname(os.path.abspath(saida)), exist_ok=True)
+    with open(saida, 'w', encoding='utf-8') as arquivo:
+        json.dump(relatorio, arquivo, indent=2, ensure_ascii=False)
+    print(f'Resultados em {saida}')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,109 @@
+"""Gerador de dados sintéticos para os benchmarks.
+
+Preenche User, Ponto e Aviso com volumes realistas: N funcionários com M
+meses de ponto em dias úteis (faltas, horários variados, horas extras e
+saídas não registradas), um administrador e o mural de avisos, e
+recalcula a tabela resumo_mensal. A semente fixa torna o banco gerado
+reproduzível entre execuções.
+
+Uso direto: python -m benchmarks.dados_sinteticos ARQUIVO.db [--funcionarios 200] [--meses 6]
+"""
+import argparse
+import os
+import random
+from datetime import date, datetime, timedelta
+
+from werkzeug.security import generate_password_hash
+
+SENHA = 'senha123'  # Senha de todos os usuários gerados
+LOTE = 10_000
+
+
+def dias_uteis(inicio, fim):
+    dia = inicio
+    while dia < fim:
+        if dia.weekday() < 5:
+            yield dia
+        dia += timedelta(days=1)
+
+
+def gerar(db, User, Ponto, Aviso, funcionarios=200, meses=6, avisos=200, semente=42, hoje=None,
+          faltas=0.04, sem_saida=0.03):
+    """Gera os dados e devolve um resumo com as quantidades e os ids criados."""
+    aleatorio = random.Random(semente)
+    hoje = hoje or date.today()
+    inicio = (hoje.replace(day=1) - timedelta(days=31 * (meses - 1))).replace(day=1)
+    senha = generate_password_hash(SENHA, method='pbkdf2:sha256:1000')  # Um hash só, reaproveitado
+
+    db.session.execute(db.insert(User), [{
+        'nome': 'Administrador Benchmark', 'email': 'admin@benchmark.local', 'senha': senha, 'tipo': 'admin', 'ativo': True,
+    }] + [
+        {
+            'nome': f'Funcionário {i:05d}', 'email': f'func{i}@benchmark.local', 'senha': senha,
+            'tipo': 'funcionario', 'ativo': True, 'cpf': f'{i:011d}',
+            'salario_mensal': round(aleatorio.uniform(1412, 12000), 2),
+            'data_admissao': inicio - timedelta(days=aleatorio.randint(0, 3650)),
+        }
+        for i in range(funcionarios)
+    ])
+    db.session.commit()
+    admin_id = db.session.execute(db.select(User.id).where(User.tipo == 'admin')).scalar()
+    ids = db.session.execute(db.select(User.id).where(User.tipo == 'funcionario').order_by(User.id)).scalars().all()
+
+    # Ponto: um registro por funcionário e dia útil até ontem, com faltas e saídas esquecidas
+    dias = list(dias_uteis(inicio, hoje))
+    meia_noite = {dia: int(datetime.combine(dia, datetime.min.time()).timestamp()) for dia in dias}
+    registros, total = [], 0
+    for user_id in ids:
+        for dia in dias:
+            if aleatorio.random() < faltas:
+                continue
+            entrada = meia_noite[dia] + aleatorio.randint(7 * 3600 + 1800, 9 * 3600 + 1800)
+            saida = None if aleatorio.random() < sem_saida else entrada + aleatorio.randint(8 * 3600, 11 * 3600 + 1800)
+            registros.append({'user_id': user_id, 'data': dia, 'entrada': entrada, 'saida': saida})
+            if len(registros) >= LOTE:
+                db.session.execute(db.insert(Ponto), registros)
+                total += len(registros)
+                registros = []
+    if registros:
+        db.session.execute(db.insert(Ponto), registros)
+        total += len(registros)
+
+    inicio_avisos = datetime.combine(inicio, datetime.min.time())
+    db.session.execute(db.insert(Aviso), [
+        {
+            'titulo': f'Aviso {i}', 'conteudo': f'Comunicado número {i} para todos os funcionários. ' * 3,
+            'imagem': None, 'criado_em': inicio_avisos + timedelta(minutes=aleatorio.randint(0, 60 * 24 * 31 * meses)),
+        }
+        for i in range(avisos)
+    ])
+    db.session.commit()
+
+    return {
+        'funcionarios': len(ids), 'meses': meses, 'pontos': total, 'avisos': avisos,
+        'admin_id': admin_id, 'funcionario_ids': ids, 'inicio': inicio.isoformat(),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('arquivo', help='Banco SQLite a criar')
+    parser.add_argument('--funcionarios', type=int, default=200)
+    parser.add_argument('--meses', type=int, default=6)
+    parser.add_argument('--avisos', type=int, default=200)
+    parser.add_argument('--semente', type=int, default=42)
+    args = parser.parse_args()
+
+    os.environ['DATABASE_URL'] = 'sqlite:///' + os.path.abspath(args.arquivo)
+    from app import app, db, User, Ponto, Aviso, recalcular_resumos
+
+    with app.app_context():
+        db.create_all()
+        resumo = gerar(db, User, Ponto, Aviso, args.funcionarios, args.meses, args.avisos, args.semente)
+        resumos = recalcular_resumos()
+    print(f"{args.arquivo}: {resumo['funcionarios']} funcionários, {resumo['pontos']} registros de ponto, "
+          f"{resumo['avisos']} avisos, {resumos} resumos mensais. Senha de todos: {SENHA}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,175 @@
+"""Suíte de benchmarks das rotas mais usadas, com resultados em JSON.
+
+Cria um banco temporário com dados sintéticos (benchmarks.dados_sinteticos)
+e mede pelo cliente de teste do Flask: entrada e saída do ponto, histórico
+do funcionário, histórico e holerite vistos pelo administrador, painel,
+lista de funcionários e mural. Para cada rota, mostra vazão e latências
+(p50/p90/p99) e grava tudo em um JSON; com --comparar, mostra a variação
+em relação a uma execução anterior.
+
+Uso: python -m benchmarks.suite [--funcionarios 200] [--meses 6] [--requisicoes 200]
+                                [--saida arquivo.json] [--comparar anterior.json]
+"""
+import argparse
+import json
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import time
+from collections import Counter
+from datetime import date, datetime
+from itertools import cycle
+
+from benchmarks.dados_sinteticos import gerar
+
+
+def percentil(valores, p):
+    ordenados = sorted(valores)
+    return ordenados[min(len(ordenados) - 1, int(len(ordenados) * p / 100))]
+
+
+def versao_git():
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def cliente(app, user_id):
+    c = app.test_client()
+    with c.session_transaction() as sessao:
+        sessao['_user_id'] = str(user_id)
+        sessao['_fresh'] = True
+    return c
+
+
+def medir_rota(urls, requisicoes, aquecimento=5):
+    """urls: iterador infinito de (cliente, url). Devolve as estatísticas da rota."""
+    for _ in range(aquecimento):
+        c, url = next(urls)
+        c.get(url)
+
+    latencias, status = [], Counter()
+    inicio = time.perf_counter()
+    for _ in range(requisicoes):
+        c, url = next(urls)
+        antes = time.perf_counter()
+        resposta = c.get(url)
+        resposta.close()
+        latencias.append(time.perf_counter() - antes)
+        status[resposta.status_code] += 1
+    duracao = time.perf_counter() - inicio
+
+    return {
+        'requisicoes': requisicoes,
+        'por_segundo': round(requisicoes / duracao, 1),
+        'media_ms': round(sum(latencias) / len(latencias) * 1000, 3),
+        'p50_ms': round(percentil(latencias, 50) * 1000, 3),
+        'p90_ms': round(percentil(latencias, 90) * 1000, 3),
+        'p99_ms': round(percentil(latencias, 99) * 1000, 3),
+        'max_ms': round(max(latencias) * 1000, 3),
+        'status': {str(codigo): quantidade for codigo, quantidade in sorted(status.items())},
+    }
+
+
+def comparar(atual, anterior):
+    print(f"\nComparação com {anterior.get('versao') or '?'} de {anterior.get('data')}:")
+    for rota, r in atual['rotas'].items():
+        a = anterior.get('rotas', {}).get(rota)
+        if not a:
+            continue
+        variacao = (r['p50_ms'] - a['p50_ms']) / a['p50_ms'] * 100 if a['p50_ms'] else 0.0
+        print(f"  {rota:24} p50 {a['p50_ms']:8.2f} -> {r['p50_ms']:8.2f} ms ({variacao:+.1f}%)   "
+              f"{a['por_segundo']:8.1f} -> {r['por_segundo']:8.1f} req/s")
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--funcionarios', type=int, default=200)
+    parser.add_argument('--meses', type=int, default=6)
+    parser.add_argument('--avisos', type=int, default=200)
+    parser.add_argument('--requisicoes', type=int, default=200, help='Requisições medidas por rota')
+    parser.add_argument('--semente', type=int, default=42)
+    parser.add_argument('--saida', default=None, help='JSON de resultados (padrão: benchmarks/resultados/AAAAMMDD-HHMMSS.json)')
+    parser.add_argument('--comparar', default=None, help='JSON de uma execução anterior')
+    args = parser.parse_args()
+
+    pasta = tempfile.mkdtemp()
+    os.environ['DATABASE_URL'] = 'sqlite:///' + os.path.join(pasta, 'benchmark.db')
+    os.environ.setdefault('UPLOAD_FOLDER', os.path.join(pasta, 'avisos'))
+
+    from app import app, db, User, Ponto, Aviso, recalcular_resumos, fila_pdf, cache_pdf, metricas
+
+    # Tudo o que o app grava em disco fica na pasta temporária; PDFs pelo ReportLab, sem programa externo
+    cache_pdf.pasta = os.path.join(pasta, 'cache_pdf')
+    metricas.pasta_perfis = os.path.join(pasta, 'perfis')
+    app.config['PDF_RENDERIZADOR'] = 'reportlab'
+    app.config['PDF_TRABALHOS_PASTA'] = os.path.join(pasta, 'pdf_trabalhos')
+    fila_pdf.init_app(app)
+    if not os.path.isdir(os.path.join(app.root_path, app.template_folder)):
+        app.template_folder = app.root_path  # Nesta árvore os templates ficam na raiz do projeto
+
+    inicio = time.perf_counter()
+    with app.app_context():
+        db.create_all()
+        dados = gerar(db, User, Ponto, Aviso, args.funcionarios, args.meses, args.avisos, args.semente)
+        recalcular_resumos()
+    print(f"Dados: {dados['funcionarios']} funcionários, {dados['pontos']} registros de ponto, "
+          f"{dados['avisos']} avisos em {time.perf_counter() - inicio:.1f}s")
+
+    admin = cliente(app, dados['admin_id'])
+    funcionarios = [(user_id, cliente(app, user_id)) for user_id in dados['funcionario_ids']]
+    hoje = date.today()
+    mes_passado = date(hoje.year - (hoje.month == 1), (hoje.month - 2) % 12 + 1, 1).strftime('%Y-%m')
+
+    def por_funcionario(url):
+        return cycle([(c, url.format(id=user_id)) for user_id, c in funcionarios])
+
+    def admin_por_funcionario(url):
+        return cycle([(admin, url.format(id=user_id)) for user_id, _ in funcionarios])
+
+    # Entrada e saída: cada funcionário registra uma vez (as repetições só respondem "já registrado")
+    rotas = {
+        'registrar_entrada': por_funcionario('/registrar_entrada'),
+        'registrar_saida': por_funcionario('/registrar_saida'),
+        'historico': por_funcionario(f'/historico?mes={mes_passado}'),
+        'historico_funcionario': admin_por_funcionario(f'/admin/funcionario/{{id}}/historico?mes={mes_passado}'),
+        'holerite_funcionario': admin_por_funcionario(f'/admin/funcionario/{{id}}/holerite?mes={mes_passado}'),
+        'admin_dashboard': cycle([(admin, '/admin/dashboard?formato=json')]),
+        'funcionarios': cycle([(admin, '/admin/funcionarios?formato=json')]),
+        'mural': por_funcionario('/avisos'),
+    }
+
+    resultados = {}
+    for nome, urls in rotas.items():
+        resultados[nome] = r = medir_rota(urls, args.requisicoes)
+        print(f"{nome:24} {r['por_segundo']:8.1f} req/s   p50 {r['p50_ms']:8.2f} ms   p90 {r['p90_ms']:8.2f} ms   "
+              f"p99 {r['p99_ms']:8.2f} ms   status {r['status']}")
+    fila_pdf.encerrar()
+
+    relatorio = {
+        'data': datetime.now().isoformat(timespec='seconds'),
+        'versao': versao_git(),
+        'python': sys.version.split()[0],
+        'plataforma': platform.platform(),
+        'cpus': os.cpu_count(),
+        'parametros': {k: v for k, v in vars(args).items() if k not in ('saida', 'comparar')},
+        'dados': {k: v for k, v in dados.items() if k != 'funcionario_ids'},
+        'rotas': resultados,
+    }
+
+    saida = args.saida or os.path.join(os.path.dirname(__file__), 'resultados', datetime.now().strftime('%Y%m%d-%H%M%S') + '.json')
+    os.makedirs(os.path.dirname(os.path.abspath(saida)), exist_ok=True)
+    with open(saida, 'w', encoding='utf-8') as arquivo:
+        json.dump(relatorio, arquivo, indent=2, ensure_ascii=False)
+    print(f'Resultados em {saida}')
+
+    if args.comparar:
+        with open(args.comparar, encoding='utf-8') as arquivo:
+            comparar(relatorio, json.load(arquivo))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,178 @@
+# Cache de trechos de página já renderizados (mural) e de números de painel
+#
+# Cada fragmento tem um nome e uma versão de dados; a chave inclui as duas,
+# além das partes que variam (tipo do usuário, página...). Quando os dados
+# mudam, invalidar(nome) troca a versão e as entradas antigas deixam de ser
+# encontradas. A validade limita por quanto tempo um valor pode ser servido
+# mesmo sem invalidação (ex.: estatísticas com atualização por minuto).
+#
+# Backends: 'memoria' (LRU por processo) e 'arquivo' (pasta local, visível
+# para todos os processos da máquina). Os valores precisam ser serializáveis
+# em JSON para o backend de arquivo. Nos dois, a versão de cada fragmento
+# fica num arquivo da pasta e é lida a cada consulta, então uma invalidação
+# feita por um processo vale na hora para os outros (vários trabalhadores
+# do modo ASGI). Com vários servidores, a pasta precisa ser compartilhada.
+import glob
+import hashlib
+import json
+import os
+import tempfile
+import threading
+import time
+
+from cache_ttl import CacheTTL
+
+
+# Versões só deste processo (cache criado sem app, ex.: scripts e benchmarks)
+class VersoesMemoria:
+    def __init__(self):
+        self._versoes = {}
+
+    def versao(self, nome):
+        return self._versoes.get(nome, 0)
+
+    def nova_versao(self, nome):
+        versao = time.time_ns()
+        self._versoes[nome] = versao
+        return versao
+
+
+# Versões compartilhadas pelos processos da máquina: um arquivo <nome>.versao por fragmento
+class VersoesArquivo:
+    def __init__(self, pasta):
+        self.pasta = pasta
+
+    def versao(self, nome):
+        try:
+            with open(os.path.join(self.pasta, f'{nome}.versao')) as arquivo:
+                return int(arquivo.read() or 0)
+        except (OSError, ValueError):
+            return 0
+
+    def nova_versao(self, nome):
+        os.makedirs(self.pasta, exist_ok=True)
+        versao = time.time_ns()
+        descritor, temporario = tempfile.mkstemp(dir=self.pasta, suffix='.parcial')
+        with os.fdopen(descritor, 'w') as arquivo:
+            arquivo.write(str(versao))
+        os.replace(temporario, os.path.join(self.pasta, f'{nome}.versao'))
+        return versao
+
+
+class BackendMemoria:
+    def __init__(self, maximo=1024, versoes=None):
+        self._itens = CacheTTL(maximo)
+        self._versoes = versoes or VersoesMemoria()
+
+    def obter(self, nome, versao, partes):
+        return self._itens.obter((nome, versao, partes))
+
+    def guardar(self, nome, versao, partes, valor, validade):
+        self._itens.guardar((nome, versao, partes), valor, validade)
+
+    def versao(self, nome):
+        return self._versoes.versao(nome)
+
+    def nova_versao(self, nome):
+        self._versoes.nova_versao(nome)  # As entradas antigas saem do LRU pela validade ou pelo limite
+
+    def itens(self):
+        return self._itens.estatisticas()['itens']
+
+
+class BackendArquivo:
+    def __init__(self, pasta):
+        self.pasta = pasta
+        self._versoes = VersoesArquivo(pasta)
+
+    def _caminho(self, nome, versao, partes):
+        resumo = hashlib.sha256(repr(partes).encode('utf-8')).hexdigest()[:32]
+        return os.path.join(self.pasta, f'{nome}-{versao}-{resumo}.json')
+
+    def obter(self, nome, versao, partes):
+        try:
+            with open(self._caminho(nome, versao, partes), encoding='utf-8') as arquivo:
+                item = json.load(arquivo)
+        except (OSError, ValueError):
+            return None
+        return item['valor'] if item['expira'] > time.time() else None
+
+    def guardar(self, nome, versao, partes, valor, validade):
+        os.makedirs(self.pasta, exist_ok=True)
+        descritor, temporario = tempfile.mkstemp(dir=self.pasta, suffix='.parcial')
+        with os.fdopen(descritor, 'w', encoding='utf-8') as arquivo:
+            json.dump({'expira': time.time() + validade, 'valor': valor}, arquivo)
+        os.replace(temporario, self._caminho(nome, versao, partes))
+
+    def versao(self, nome):
+        return self._versoes.versao(nome)
+
+    def nova_versao(self, nome):
+        versao = self._versoes.nova_versao(nome)
+
+        # Entradas das versões anteriores não serão mais lidas
+        for caminho in glob.glob(os.path.join(self.pasta, f'{nome}-*.json')):
+            if not os.path.basename(caminho).startswith(f'{nome}-{versao}-'):
+                try:
+                    os.remove(caminho)
+                except OSError:
+                    pass
+
+    def itens(self):
+        return len(glob.glob(os.path.join(self.pasta, '*.json')))
+
+
+class CacheFragmentos:
+    def __init__(self, app=None):
+        self.backend = BackendMemoria()
+        self.validade = 300
+        self._contagem = {}  # Nome do fragmento -> [acertos, falhas]
+        self._trava = threading.Lock()
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        self.validade = app.config.get('FRAGMENTOS_VALIDADE', self.validade)
+        if app.config.get('FRAGMENTOS_BACKEND', 'memoria') == 'arquivo':
+            self.backend = BackendArquivo(app.config['FRAGMENTOS_PASTA'])
+        else:
+            self.backend = BackendMemoria(app.config.get('FRAGMENTOS_MAXIMO', 1024), VersoesArquivo(app.config['FRAGMENTOS_PASTA']))
+
+    def obter(self, nome, partes, gerar, validade=None):
+        """Devolve o fragmento em cache ou chama gerar() e guarda o resultado."""
+        valor, versao = self.procurar(nome, partes)
+        if valor is None:
+            valor = gerar()
+            self.guardar(nome, versao, partes, valor, validade)
+        return valor
+
+    def procurar(self, nome, partes):
+        """(valor ou None, versão); para gerar o valor fora de obter(), ex.: numa corrotina."""
+        versao = self.backend.versao(nome)
+        valor = self.backend.obter(nome, versao, partes)
+        self._contar(nome, valor is not None)
+        return valor, versao
+
+    def guardar(self, nome, versao, partes, valor, validade=None):
+        # Guarda na versão lida antes de gerar: se houve invalidação no meio, o valor já nasce descartado
+        self.backend.guardar(nome, versao, partes, valor, self.validade if validade is None else validade)
+
+    def invalidar(self, nome):
+        self.backend.nova_versao(nome)
+
+    def _contar(self, nome, acerto):
+        with self._trava:
+            contagem = self._contagem.setdefault(nome, [0, 0])
+            contagem[0 if acerto else 1] += 1
+
+    def estatisticas(self):
+        with self._trava:
+            fragmentos = {
+                nome: {
+                    'acertos': acertos,
+                    'falhas': falhas,
+                    'taxa_acerto': round(acertos / (acertos + falhas), 4) if acertos + falhas else 0.0,
+                }
+                for nome, (acertos, falhas) in self._contagem.items()
+            }
+        return {'backend': type(self.backend).__name__, 'itens': self.backend.itens(), 'fragmentos': fragmentos}
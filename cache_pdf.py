@@ -0,0 +1,80 @@
+# Cache em disco dos PDFs gerados (holerite e TRCT)
+#
+# Cada arquivo é endereçado pelo hash das entradas usadas no documento
+# (totais do mês, salário, nome...), então uma mudança nos dados gera uma
+# chave nova. O tamanho total é limitado, descartando os menos usados.
+import glob
+import hashlib
+import json
+import os
+import threading
+
+
+class CachePdf:
+    def __init__(self, app=None):
+        self.pasta = None
+        self.tamanho_maximo = 512 * 1024 * 1024
+        self._trava = threading.Lock()
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        self.pasta = app.config.get('PDF_CACHE_PASTA') or os.path.join(app.instance_path, 'cache_pdf')
+        self.tamanho_maximo = app.config.get('PDF_CACHE_TAMANHO', self.tamanho_maximo)
+
+    @staticmethod
+    def chave(**entradas):
+        conteudo = json.dumps(entradas, sort_keys=True, default=str)
+        return hashlib.sha256(conteudo.encode('utf-8')).hexdigest()
+
+    def caminho(self, user_id, tipo, referencia, chave):
+        return os.path.join(self.pasta, str(user_id), f'{tipo}-{referencia}-{chave}.pdf')
+
+    def obter(self, user_id, tipo, referencia, chave):
+        caminho = self.caminho(user_id, tipo, referencia, chave)
+        try:
+            os.utime(caminho)  # Marca como usado recentemente
+        except FileNotFoundError:
+            return None
+        return caminho
+
+    def gravar(self, user_id, tipo, referencia, chave, pdf):
+        caminho = self.caminho(user_id, tipo, referencia, chave)
+        os.makedirs(os.path.dirname(caminho), exist_ok=True)
+
+        temporario = f'{caminho}.{threading.get_ident()}.tmp'
+        with open(temporario, 'wb') as arquivo:
+            arquivo.write(pdf)
+        os.replace(temporario, caminho)
+
+        self.descartar_excedente()
+        return caminho
+
+    def invalidar(self, user_id, tipo='*', referencia='*'):
+        if self.pasta is None:
+            return
+        for caminho in glob.glob(os.path.join(self.pasta, str(user_id), f'{tipo}-{referencia}-*.pdf')):
+            try:
+                os.remove(caminho)
+            except FileNotFoundError:
+                pass
+
+    def descartar_excedente(self):
+        with self._trava:
+            arquivos = []
+            for caminho in glob.glob(os.path.join(self.pasta, '*', '*.pdf')):
+                try:
+                    info = os.stat(caminho)
+                except FileNotFoundError:
+                    continue
+                arquivos.append((info.st_mtime, info.st_size, caminho))
+
+            total = sum(tamanho for _, tamanho, _ in arquivos)
+            for _, tamanho, caminho in sorted(arquivos):
+                if total <= self.tamanho_maximo:
+                    break
+                try:
+                    os.remove(caminho)
+                except FileNotFoundError:
+                    pass
+                total -= tamanho
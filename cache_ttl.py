@@ -0,0 +1,56 @@
+# Cache em memória com validade (TTL) e descarte do menos usado (LRU)
+import threading
+import time
+from collections import OrderedDict
+
+
+class CacheTTL:
+    def __init__(self, maximo=1024, validade=60):
+        self.maximo = maximo
+        self.validade = validade
+        self.acertos = 0
+        self.falhas = 0
+        self._itens = OrderedDict()
+        self._trava = threading.Lock()
+
+    def obter(self, chave, carregar=None):
+        agora = time.monotonic()
+        with self._trava:
+            item = self._itens.get(chave)
+            if item is not None and item[0] > agora:
+                self._itens.move_to_end(chave)
+                self.acertos += 1
+                return item[1]
+            self.falhas += 1
+
+        if carregar is None:
+            return None
+        valor = carregar()
+        if valor is not None:
+            self.guardar(chave, valor)
+        return valor
+
+    def guardar(self, chave, valor, validade=None):
+        with self._trava:
+            self._itens[chave] = (time.monotonic() + (self.validade if validade is None else validade), valor)
+            self._itens.move_to_end(chave)
+            while len(self._itens) > self.maximo:
+                self._itens.popitem(last=False)
+
+    def invalidar(self, chave):
+        with self._trava:
+            self._itens.pop(chave, None)
+
+    def limpar(self):
+        with self._trava:
+            self._itens.clear()
+
+    def estatisticas(self):
+        with self._trava:
+            consultas = self.acertos + self.falhas
+            return {
+                'itens': len(self._itens),
+                'acertos': self.acertos,
+                'falhas': self.falhas,
+                'taxa_acerto': round(self.acertos / consultas, 4) if consultas else 0.0,
+            }
@@ -0,0 +1,125 @@
+# Senhas: custo do hash configurável, atualização do hash no login e limite de tentativas
+#
+# O método e o custo do hash vêm de SENHA_METODO (formato do Werkzeug, ex.:
+# 'scrypt:32768:8:1' ou 'pbkdf2:sha256:600000'). Hashes gravados com outros
+# parâmetros continuam válidos e são refeitos com os atuais no próximo login
+# certo. Um email desconhecido também paga uma verificação completa (contra
+# um hash fictício), para que o tempo de resposta não revele quais contas
+# existem.
+#
+# Limites, em memória e por processo: um balde de fichas por IP (cada
+# tentativa gasta uma ficha) e um por conta (só as tentativas erradas gastam,
+# venham de onde vierem, para que um ataque espalhado por muitos IPs também
+# pare), e um teto de verificações simultâneas, para que uma rajada de
+# tentativas não ocupe todos os núcleos com hashes.
+import secrets
+import threading
+import time
+from collections import OrderedDict
+
+from werkzeug.security import check_password_hash, generate_password_hash
+
+
+class ServidorOcupado(RuntimeError):
+    pass
+
+
+class LimitadorTentativas:
+    """Balde de fichas por chave: até `capacidade` tentativas seguidas, repostas à taxa de `por_minuto`."""
+
+    def __init__(self, capacidade, por_minuto, maximo=10000):
+        self.capacidade = capacidade
+        self.por_segundo = por_minuto / 60
+        self.maximo = maximo  # Chaves guardadas; a menos usada é descartada (volta com o balde cheio)
+        self._baldes = OrderedDict()  # Chave -> (fichas, instante da última atualização)
+        self._trava = threading.Lock()
+
+    def _fichas(self, chave, agora):
+        fichas, instante = self._baldes.get(chave, (self.capacidade, agora))
+        return min(self.capacidade, fichas + (agora - instante) * self.por_segundo)
+
+    def espera(self, chave):
+        """Segundos até haver uma ficha livre (0 = pode tentar), sem gastar."""
+        with self._trava:
+            fichas = self._fichas(chave, time.monotonic())
+        return 0.0 if fichas >= 1 else (1 - fichas) / self.por_segundo
+
+    def consumir(self, chave):
+        """Gasta uma ficha; devolve 0 ou, se o balde estiver vazio, os segundos de espera."""
+        agora = time.monotonic()
+        with self._trava:
+            fichas = self._fichas(chave, agora)
+            if fichas < 1:
+                return (1 - fichas) / self.por_segundo
+            self._baldes[chave] = (fichas - 1, agora)
+            self._baldes.move_to_end(chave)
+            while len(self._baldes) > self.maximo:
+                self._baldes.popitem(last=False)
+        return 0.0
+
+    def restaurar(self, chave):
+        with self._trava:
+            self._baldes.pop(chave, None)
+
+
+class Credenciais:
+    def __init__(self, app=None):
+        self.metodo = 'scrypt:32768:8:1'
+        self.espera_verificacao = 2.0
+        self.por_ip = LimitadorTentativas(20, 10)
+        self.por_conta = LimitadorTentativas(5, 1)
+        self._verificacoes = threading.BoundedSemaphore(1)
+        self._ficticio = None
+        self._metodo_gravado = None
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        self.metodo = app.config.get('SENHA_METODO', self.metodo)
+        self.espera_verificacao = app.config.get('LOGIN_ESPERA_VERIFICACAO', self.espera_verificacao)
+        self.por_ip = LimitadorTentativas(*app.config.get('LOGIN_LIMITE_IP', (20, 10)))
+        self.por_conta = LimitadorTentativas(*app.config.get('LOGIN_LIMITE_CONTA', (5, 1)))
+        self._verificacoes = threading.BoundedSemaphore(app.config.get('LOGIN_VERIFICACOES_SIMULTANEAS', 1))
+        self._ficticio = self._metodo_gravado = None
+
+    def gerar(self, senha):
+        return generate_password_hash(senha, method=self.metodo)
+
+    def _preparar(self):
+        # O hash fictício também mostra como o Werkzeug grava o método (ex.: 'pbkdf2' -> 'pbkdf2:sha256:600000')
+        if self._ficticio is None:
+            self._ficticio = self.gerar(secrets.token_urlsafe(16))
+            self._metodo_gravado = self._ficticio.split('$', 1)[0]
+
+    def verificar(self, senha_hash, senha):
+        """Confere a senha; sem hash (email desconhecido), verifica contra o fictício e devolve False."""
+        self._preparar()
+        if not self._verificacoes.acquire(timeout=self.espera_verificacao):
+            raise ServidorOcupado('muitas verificações de senha simultâneas')
+        try:
+            certa = check_password_hash(senha_hash or self._ficticio, senha)
+        finally:
+            self._verificacoes.release()
+        return certa and senha_hash is not None
+
+    def precisa_atualizar(self, senha_hash):
+        self._preparar()
+        return senha_hash.split('$', 1)[0] != self._metodo_gravado
+
+    def atualizar(self, senha_hash, senha):
+        """Hash novo, com os parâmetros atuais, se o gravado usa outros; senão None."""
+        if not self.precisa_atualizar(senha_hash):
+            return None
+        with self._verificacoes:
+            return self.gerar(senha)
+
+    # Limites de tentativas
+    def espera(self, ip, email):
+        """Segundos que o cliente precisa esperar antes de tentar (0 = pode tentar; a tentativa é contada no IP)."""
+        return self.por_conta.espera(email) or self.por_ip.consumir(ip)
+
+    def falhou(self, email):
+        self.por_conta.consumir(email)
+
+    def entrou(self, email):
+        self.por_conta.restaurar(email)
@@ -0,0 +1,139 @@
+# Exportação dos registros de ponto em CSV e XLSX, gerada linha a linha
+#
+# Os geradores recebem um iterável de linhas e devolvem os bytes aos poucos,
+# para que a resposta comece a sair antes de a consulta terminar e a memória
+# não cresça com o tamanho do período exportado. O XLSX é montado direto como
+# um ZIP em fluxo (sem dependências), com uma única planilha.
+import csv
+import io
+import zipfile
+from datetime import datetime
+from xml.sax.saxutils import escape
+
+CABECALHO = ['funcionario_id', 'nome', 'data', 'entrada', 'saida', 'horas_trabalhadas', 'saldo_dia']
+
+
+def formatar_duracao(segundos):
+    sinal = '-' if segundos < 0 else ''
+    horas, resto = divmod(abs(segundos), 3600)
+    return f'{sinal}{horas}:{resto // 60:02d}:{resto % 60:02d}'
+
+
+def linhas_ponto(registros, jornada_do_mes):
+    """Converte (user_id, nome, data, entrada, saida) nas colunas de CABECALHO.
+
+    jornada_do_mes(ano, mes) devolve os segundos por dia vigentes no mês, base do saldo do dia.
+    """
+    mes = jornada = None
+    for user_id, nome, data, entrada, saida in registros:
+        if (data.year, data.month) != mes:
+            mes = (data.year, data.month)
+            jornada = jornada_do_mes(*mes)
+        completo = entrada is not None and saida is not None
+        yield [
+            user_id,
+            nome,
+            data.isoformat(),
+            datetime.fromtimestamp(entrada).strftime('%H:%M:%S') if entrada is not None else '',
+            datetime.fromtimestamp(saida).strftime('%H:%M:%S') if saida is not None else '',
+            formatar_duracao(saida - entrada) if completo else '',
+            formatar_duracao(saida - entrada - jornada) if completo else '',
+        ]
+
+
+def gerar_csv(linhas, cabecalho=CABECALHO):
+    buffer = io.StringIO()
+    escritor = csv.writer(buffer, delimiter=';')
+
+    def esvaziar():
+        valor = buffer.getvalue()
+        buffer.seek(0)
+        buffer.truncate()
+        return valor.encode('utf-8')
+
+    buffer.write('\ufeff')  # BOM para o Excel reconhecer UTF-8
+    escritor.writerow(cabecalho)
+    yield esvaziar()
+    for linha in linhas:
+        escritor.writerow(linha)
+        if buffer.tell() >= 64 * 1024:
+            yield esvaziar()
+    yield esvaziar()
+
+
+class _SaidaFluxo:
+    """Arquivo só de escrita, sem seek, cujo conteúdo é recolhido a cada bloco."""
+
+    def __init__(self):
+        self.partes = []
+
+    def write(self, dados):
+        self.partes.append(bytes(dados))
+        return len(dados)
+
+    def flush(self):
+        pass
+
+    def recolher(self):
+        dados = b''.join(self.partes)
+        self.partes.clear()
+        return dados
+
+
+_CONTENT_TYPES = (
+    '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+    '<Types xmlns="http://schemas.openxmlformats.org/package/2006/content-types">'
+    '<Default Extension="rels" ContentType="application/vnd.openxmlformats-package.relationships+xml"/>'
+    '<Default Extension="xml" ContentType="application/xml"/>'
+    '<Override PartName="/xl/workbook.xml" ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet.main+xml"/>'
+    '<Override PartName="/xl/worksheets/sheet1.xml" ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.worksheet+xml"/>'
+    '</Types>'
+)
+_RELS = (
+    '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+    '<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/relationships">'
+    '<Relationship Id="rId1" Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/officeDocument" Target="xl/workbook.xml"/>'
+    '</Relationships>'
+)
+_WORKBOOK = (
+    '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+    '<workbook xmlns="http://schemas.openxmlformats.org/spreadsheetml/2006/main" '
+    'xmlns:r="http://schemas.openxmlformats.org/officeDocument/2006/relationships">'
+    '<sheets><sheet name="Ponto" sheetId="1" r:id="rId1"/></sheets></workbook>'
+)
+_WORKBOOK_RELS = (
+    '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+    '<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/relationships">'
+    '<Relationship Id="rId1" Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/worksheet" Target="worksheets/sheet1.xml"/>'
+    '</Relationships>'
+)
+
+
+def _celula(valor):
+    if isinstance(valor, (int, float)) and not isinstance(valor, bool):
+        return f'<c><v>{valor}</v></c>'
+    return f'<c t="inlineStr"><is><t>{escape(str(valor))}</t></is></c>'
+
+
+def gerar_xlsx(linhas, cabecalho=CABECALHO):
+    saida = _SaidaFluxo()
+    with zipfile.ZipFile(saida, 'w', zipfile.ZIP_DEFLATED) as arquivo:
+        arquivo.writestr('[Content_Types].xml', _CONTENT_TYPES)
+        arquivo.writestr('_rels/.rels', _RELS)
+        arquivo.writestr('xl/workbook.xml', _WORKBOOK)
+        arquivo.writestr('xl/_rels/workbook.xml.rels', _WORKBOOK_RELS)
+
+        with arquivo.open('xl/worksheets/sheet1.xml', 'w') as planilha:
+            planilha.write(
+                b'<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+                b'<worksheet xmlns="http://schemas.openxmlformats.org/spreadsheetml/2006/main"><sheetData>'
+            )
+            planilha.write(('<row>' + ''.join(_celula(v) for v in cabecalho) + '</row>').encode('utf-8'))
+            yield saida.recolher()
+
+            for linha in linhas:
+                planilha.write(('<row>' + ''.join(_celula(v) for v in linha) + '</row>').encode('utf-8'))
+                if len(saida.partes) >= 16:
+                    yield saida.recolher()
+            planilha.write(b'</sheetData></worksheet>')
+    yield saida.recolher()
@@ -0,0 +1,68 @@
+# Gravação em lote (group commit) para escritas curtas e frequentes
+#
+# As requisições entregam cada item a uma fila e esperam o resultado. Uma
+# única thread gravadora junta os itens que chegarem até o lote encher ou o
+# intervalo máximo passar, e grava todos numa só transação. Assim, um pico
+# de registros de ponto vira poucos commits em vez de um por requisição.
+# Um item que falha sozinho volta como exceção no lugar do resultado e só a
+# requisição dele recebe o erro; uma falha do lote inteiro (o commit) chega
+# a todas.
+import queue
+import threading
+import time
+from concurrent.futures import Future
+
+
+class FilaGravacao:
+    def __init__(self, gravar_lote, lote_maximo=200, intervalo=0.005):
+        self.gravar_lote = gravar_lote  # Recebe a lista de itens e devolve um resultado (ou a exceção) por item
+        self.lote_maximo = lote_maximo
+        self.intervalo = intervalo  # Espera máxima, em segundos, antes de gravar um lote incompleto
+        self.lotes_gravados = 0
+        self.itens_gravados = 0
+        self._fila = queue.Queue()
+        self._thread = None
+        self._trava = threading.Lock()
+
+    def enviar(self, item):
+        futuro = Future()
+        self._iniciar()
+        self._fila.put((item, futuro))
+        return futuro
+
+    def _iniciar(self):
+        if self._thread is not None:
+            return
+        with self._trava:
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._executar, name='gravacao-lote', daemon=True)
+                self._thread.start()
+
+    def _executar(self):
+        while True:
+            pendentes = [self._fila.get()]
+            prazo = time.monotonic() + self.intervalo
+            while len(pendentes) < self.lote_maximo:
+                restante = prazo - time.monotonic()
+                if restante <= 0:
+                    break
+                try:
+                    pendentes.append(self._fila.get(timeout=restante))
+                except queue.Empty:
+                    break
+
+            itens = [item for item, _ in pendentes]
+            try:
+                resultados = self.gravar_lote(itens)
+            except Exception as erro:
+                for _, futuro in pendentes:
+                    futuro.set_exception(erro)
+                continue
+
+            self.lotes_gravados += 1
+            self.itens_gravados += len(itens)
+            for (_, futuro), resultado in zip(pendentes, resultados):
+                if isinstance(resultado, Exception):
+                    futuro.set_exception(resultado)
+                else:
+                    futuro.set_result(resultado)
@@ -0,0 +1,144 @@
+# Imagens dos avisos do mural: upload em blocos, nome pelo conteúdo e variantes reduzidas
+#
+# O arquivo enviado é copiado para o disco em blocos, com limite de tamanho,
+# e guardado com o hash SHA-256 do conteúdo no nome: envios com o mesmo nome
+# original não se sobrescrevem, o mesmo arquivo enviado duas vezes ocupa
+# espaço uma vez só, e a URL nunca muda de conteúdo, o que permite servi-la
+# com cache "immutable". As variantes WebP em larguras menores são geradas
+# depois, numa thread separada; enquanto não existem, o mural usa o original.
+# As variantes dependem do Pillow; sem ele, só o original é servido.
+import hashlib
+import os
+import tempfile
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+BLOCO = 64 * 1024
+
+# Assinaturas dos formatos aceitos, pelos primeiros bytes do arquivo
+FORMATOS = [
+    (b'\xff\xd8\xff', '.jpg'),
+    (b'\x89PNG\r\n\x1a\n', '.png'),
+    (b'GIF87a', '.gif'),
+    (b'GIF89a', '.gif'),
+]
+
+
+class ImagemInvalida(ValueError):
+    pass
+
+
+def detectar_extensao(inicio):
+    if inicio[:4] == b'RIFF' and inicio[8:12] == b'WEBP':
+        return '.webp'
+    for assinatura, extensao in FORMATOS:
+        if inicio.startswith(assinatura):
+            return extensao
+    return None
+
+
+class ImagensAviso:
+    def __init__(self, app=None):
+        self.pasta = None
+        self.maximo = 5 * 1024 * 1024
+        self.larguras = (480, 960)
+        self.qualidade = 80
+        self._executor = None
+        self._prontas = set()  # Imagens com todas as variantes já geradas
+        self._trava = threading.Lock()
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        self.pasta = app.config['UPLOAD_FOLDER']
+        self.maximo = app.config.get('AVISO_IMAGEM_MAXIMO', self.maximo)
+        self.larguras = tuple(app.config.get('AVISO_IMAGEM_LARGURAS', self.larguras))
+
+    def salvar(self, arquivo, ao_concluir=None):
+        """Copia o upload em blocos e devolve o nome final (hash + extensão).
+
+        ao_concluir(nome) é chamado quando as variantes ficarem prontas.
+        """
+        os.makedirs(self.pasta, exist_ok=True)
+        resumo = hashlib.sha256()
+        tamanho = 0
+        extensao = None
+        descritor, temporario = tempfile.mkstemp(dir=self.pasta, suffix='.parcial')
+        try:
+            with os.fdopen(descritor, 'wb') as destino:
+                while True:
+                    bloco = arquivo.stream.read(BLOCO)
+                    if not bloco:
+                        break
+                    if extensao is None:
+                        extensao = detectar_extensao(bloco)
+                        if extensao is None:
+                            raise ImagemInvalida('formato de imagem não suportado (use JPEG, PNG, GIF ou WebP)')
+                    tamanho += len(bloco)
+                    if tamanho > self.maximo:
+                        raise ImagemInvalida(f'imagem maior que {self.maximo // (1024 * 1024)} MB')
+                    resumo.update(bloco)
+                    destino.write(bloco)
+            if tamanho == 0:
+                raise ImagemInvalida('arquivo vazio')
+
+            nome = resumo.hexdigest()[:32] + extensao
+            os.replace(temporario, os.path.join(self.pasta, nome))
+        except BaseException:
+            os.remove(temporario)
+            raise
+
+        futuro = self._gerar_depois(nome)
+        if ao_concluir is not None:
+            futuro.add_done_callback(lambda f: f.exception() is None and ao_concluir(nome))
+        return nome
+
+    def nome_variante(self, nome, largura):
+        return f'{os.path.splitext(nome)[0]}_{largura}.webp'
+
+    def variantes(self, nome):
+        """Variantes já geradas como (nome, largura), da menor para a maior."""
+        if nome in self._prontas:
+            return [(self.nome_variante(nome, largura), largura) for largura in self.larguras]
+        existentes = [
+            (self.nome_variante(nome, largura), largura) for largura in self.larguras
+            if os.path.exists(os.path.join(self.pasta, self.nome_variante(nome, largura)))
+        ]
+        if len(existentes) == len(self.larguras):
+            self._prontas.add(nome)
+        return existentes
+
+    def gerar_variantes(self, nome):
+        try:
+            from PIL import Image, ImageOps
+        except ImportError:
+            return []
+
+        gerados = []
+        with Image.open(os.path.join(self.pasta, nome)) as original:
+            original = ImageOps.exif_transpose(original)
+            if original.mode not in ('RGB', 'RGBA'):
+                original = original.convert('RGBA' if 'A' in original.getbands() else 'RGB')
+            for largura in self.larguras:
+                destino = os.path.join(self.pasta, self.nome_variante(nome, largura))
+                if os.path.exists(destino):
+                    continue
+                copia = original.copy()
+                copia.thumbnail((largura, largura * 4))  # Limita a largura, sem ampliar imagens pequenas
+                temporario = destino + '.parcial'
+                copia.save(temporario, 'WEBP', quality=self.qualidade, method=4)
+                os.replace(temporario, destino)
+                gerados.append(destino)
+        self._prontas.add(nome)
+        return gerados
+
+    def _gerar_depois(self, nome):
+        if self._executor is None:
+            with self._trava:
+                if self._executor is None:
+                    self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix='imagens-aviso')
+        return self._executor.submit(self.gerar_variantes, nome)
+
+    def encerrar(self):
+        if self._executor is not None:
+            self._executor.shutdown(wait=True)
@@ -0,0 +1,138 @@
+# Leitura e validação do CSV de importação de funcionários
+#
+# Colunas esperadas: nome, email, cpf, salario_mensal, data_admissao e,
+# opcionalmente, senha. Sem senha, uma senha inicial aleatória é gerada e
+# devolvida no relatório. O separador (vírgula ou ponto e vírgula) é
+# detectado pelo cabeçalho.
+import csv
+import io
+import re
+import secrets
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from datetime import date, datetime
+
+from werkzeug.security import generate_password_hash
+
+COLUNAS_OBRIGATORIAS = {'nome', 'email'}
+RELATORIO = ['linha', 'email', 'status', 'mensagem', 'senha_inicial']
+
+# Senhas geradas têm 72 bits aleatórios, então um hash mais leve basta para elas
+# (no primeiro login o hash é refeito com SENHA_METODO); senhas informadas no
+# arquivo usam o método recebido em ler_funcionarios, ou o padrão do Werkzeug.
+METODO_SENHA_GERADA = 'pbkdf2:sha256:10000'
+METODO_SENHA_INFORMADA = 'scrypt'
+
+
+class ErroImportacao(ValueError):
+    pass
+
+
+def converter_salario(texto):
+    texto = (texto or '').strip().replace('R$', '').strip()
+    if not texto:
+        return None
+    if ',' in texto:  # Formato brasileiro: 1.940,00
+        texto = texto.replace('.', '').replace(',', '.')
+    try:
+        valor = float(texto)
+    except ValueError:
+        raise ErroImportacao(f'salário inválido: {texto}')
+    if valor < 0:
+        raise ErroImportacao('salário negativo')
+    return valor
+
+
+def converter_data(texto):
+    texto = (texto or '').strip()
+    if not texto:
+        return date.today()
+    for formato in ('%Y-%m-%d', '%d/%m/%Y'):
+        try:
+            return datetime.strptime(texto, formato).date()
+        except ValueError:
+            pass
+    raise ErroImportacao(f'data de admissão inválida: {texto}')
+
+
+def converter_cpf(texto):
+    digitos = re.sub(r'\D', '', texto or '')
+    if not digitos:
+        return None
+    if len(digitos) != 11:
+        raise ErroImportacao(f'CPF inválido: {texto}')
+    return f'{digitos[:3]}.{digitos[3:6]}.{digitos[6:9]}-{digitos[9:]}'
+
+
+def ler_funcionarios(texto, metodo_senha=METODO_SENHA_INFORMADA):
+    """Devolve (validos, erros): validos são (linha, dados); erros são linhas do relatório."""
+    amostra = texto[:4096]
+    separador = ';' if amostra.count(';') > amostra.count(',') else ','
+    leitor = csv.DictReader(io.StringIO(texto.lstrip('\ufeff')), delimiter=separador)
+    cabecalho = {c.strip().lower() for c in (leitor.fieldnames or [])}
+    faltando = COLUNAS_OBRIGATORIAS - cabecalho
+    if faltando:
+        raise ErroImportacao(f'colunas ausentes: {", ".join(sorted(faltando))}')
+
+    validos, erros, vistos = [], [], set()
+    for numero, bruto in enumerate(leitor, start=2):  # Linha 1 é o cabeçalho
+        linha = {(k or '').strip().lower(): (v or '').strip() for k, v in bruto.items()}
+        email = linha.get('email', '').lower()
+        try:
+            if not linha.get('nome'):
+                raise ErroImportacao('nome em branco')
+            if '@' not in email:
+                raise ErroImportacao('email inválido')
+            if email in vistos:
+                raise ErroImportacao('email repetido no arquivo')
+            dados = {
+                'nome': linha['nome'],
+                'email': email,
+                'cpf': converter_cpf(linha.get('cpf')),
+                'salario_mensal': converter_salario(linha.get('salario_mensal')),
+                'data_admissao': converter_data(linha.get('data_admissao')),
+                'senha': linha.get('senha') or secrets.token_urlsafe(9),
+                'senha_gerada': not linha.get('senha'),
+                'metodo_hash': metodo_senha if linha.get('senha') else METODO_SENHA_GERADA,
+            }
+        except ErroImportacao as erro:
+            erros.append({'linha': numero, 'email': email, 'status': 'erro', 'mensagem': str(erro), 'senha_inicial': ''})
+            continue
+        vistos.add(email)
+        validos.append((numero, dados))
+    return validos, erros
+
+
+def gerar_hash(senha, metodo):
+    return generate_password_hash(senha, method=metodo)
+
+
+class HashSenhas:
+    """Hash das senhas num pool de processos criado no primeiro uso e mantido pelo processo."""
+
+    def __init__(self, processos=None, minimo_pool=16):
+        self.processos = processos  # None = número de CPUs
+        self.minimo_pool = minimo_pool  # Abaixo disso, o hash é feito no próprio processo
+        self._executor = None
+        self._trava = threading.Lock()
+
+    def gerar(self, senhas, metodos):
+        if len(senhas) < self.minimo_pool:
+            return [gerar_hash(senha, metodo) for senha, metodo in zip(senhas, metodos)]
+        with self._trava:
+            if self._executor is None:
+                self._executor = ProcessPoolExecutor(max_workers=self.processos)
+        return list(self._executor.map(gerar_hash, senhas, metodos, chunksize=64))
+
+    def encerrar(self):
+        if self._executor is not None:
+            self._executor.shutdown()
+            self._executor = None
+
+
+def escrever_relatorio(linhas):
+    saida = io.StringIO()
+    escritor = csv.DictWriter(saida, fieldnames=RELATORIO, delimiter=';')
+    escritor.writeheader()
+    escritor.writerows(sorted(linhas, key=lambda l: l['linha']))
+    return saida.getvalue()
@@ -0,0 +1,172 @@
+# Métricas de desempenho por requisição, no formato de texto do Prometheus
+#
+# Registra, por rota: latência (histograma), número e tempo das consultas
+# SQL (eventos do SQLAlchemy) e o tempo de renderização de cada template
+# (sinais do Flask). Etapas explícitas, como a geração de PDF, são medidas
+# com observar()/medir(). Tudo fica em memória, no processo, e é exportado
+# por exportar() para a rota /admin/metrics.
+#
+# Perfil sob demanda: uma requisição de administrador com o cabeçalho
+# X-Perfil roda sob cProfile, e o resultado é gravado em PERFIL_PASTA
+# (o nome do arquivo volta no cabeçalho X-Perfil-Arquivo).
+import cProfile
+import os
+import threading
+import time
+from bisect import bisect_left
+from contextlib import contextmanager
+
+from flask import g, request, has_request_context, before_render_template, template_rendered
+from flask_login import current_user
+from sqlalchemy import event
+
+BALDES_SEGUNDOS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30)
+BALDES_CONSULTAS = (0, 1, 2, 5, 10, 20, 50, 100, 500)
+
+# Nome -> (tipo, descrição, baldes do histograma)
+DEFINICOES = {
+    'portal_requisicao_segundos': ('histogram', 'Latência das requisições por rota.', BALDES_SEGUNDOS),
+    'portal_requisicoes_total': ('counter', 'Requisições atendidas por rota, método e status.', None),
+    'portal_sql_consultas_por_requisicao': ('histogram', 'Consultas SQL feitas em cada requisição.', BALDES_CONSULTAS),
+    'portal_sql_consultas_total': ('counter', 'Consultas SQL por rota (- fora de requisição).', None),
+    'portal_sql_segundos_total': ('counter', 'Tempo gasto em consultas SQL por rota.', None),
+    'portal_template_segundos': ('histogram', 'Tempo de renderização de cada template.', BALDES_SEGUNDOS),
+    'portal_pdf_segundos': ('histogram', 'Tempo de geração de PDF no processo gerador.', BALDES_SEGUNDOS),
+}
+
+
+class Histograma:
+    def __init__(self, baldes):
+        self.baldes = baldes
+        self.contagens = [0] * (len(baldes) + 1)  # O último é o +Inf
+        self.soma = 0.0
+
+    def observar(self, valor):
+        self.contagens[bisect_left(self.baldes, valor)] += 1
+        self.soma += valor
+
+
+def _rotulos(rotulos, extra=None):
+    itens = list(rotulos) + ([extra] if extra else [])
+    if not itens:
+        return ''
+    escapar = lambda v: str(v).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+    return '{' + ','.join(f'{nome}="{escapar(valor)}"' for nome, valor in itens) + '}'
+
+
+class Metricas:
+    def __init__(self, app=None, engine=None):
+        self.pasta_perfis = None
+        self._series = {nome: {} for nome in DEFINICOES}  # Nome -> rótulos -> Histograma ou valor
+        self._trava = threading.Lock()
+        if app is not None:
+            self.init_app(app, engine)
+
+    def init_app(self, app, engine):
+        self.pasta_perfis = app.config.get('PERFIL_PASTA', os.path.join(app.instance_path, 'perfis'))
+        app.before_request(self._inicio_requisicao)
+        app.after_request(self._fim_requisicao)
+        app.teardown_request(self._encerrar_requisicao)
+        before_render_template.connect(self._inicio_template, app)
+        template_rendered.connect(self._fim_template, app)
+        event.listen(engine, 'before_cursor_execute', self._inicio_consulta)
+        event.listen(engine, 'after_cursor_execute', self._fim_consulta)
+
+    def observar(self, nome, valor, **rotulos):
+        chave = tuple(sorted(rotulos.items()))
+        with self._trava:
+            serie = self._series[nome]
+            if chave not in serie:
+                serie[chave] = Histograma(DEFINICOES[nome][2])
+            serie[chave].observar(valor)
+
+    def incrementar(self, nome, valor=1, **rotulos):
+        chave = tuple(sorted(rotulos.items()))
+        with self._trava:
+            serie = self._series[nome]
+            serie[chave] = serie.get(chave, 0) + valor
+
+    @contextmanager
+    def medir(self, nome, **rotulos):
+        inicio = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observar(nome, time.perf_counter() - inicio, **rotulos)
+
+    def exportar(self):
+        linhas = []
+        with self._trava:
+            for nome, (tipo, descricao, baldes) in DEFINICOES.items():
+                linhas.append(f'# HELP {nome} {descricao}')
+                linhas.append(f'# TYPE {nome} {tipo}')
+                for rotulos, valor in sorted(self._series[nome].items()):
+                    if tipo == 'counter':
+                        linhas.append(f'{nome}{_rotulos(rotulos)} {valor}')
+                        continue
+                    acumulado = 0
+                    for limite, contagem in zip(baldes + ('+Inf',), valor.contagens):
+                        acumulado += contagem
+                        linhas.append(f'{nome}_bucket{_rotulos(rotulos, ("le", limite))} {acumulado}')
+                    linhas.append(f'{nome}_sum{_rotulos(rotulos)} {valor.soma}')
+                    linhas.append(f'{nome}_count{_rotulos(rotulos)} {acumulado}')
+        return '\n'.join(linhas) + '\n'
+
+    # Requisições
+    def _inicio_requisicao(self):
+        g.metricas_inicio = time.perf_counter()
+        g.metricas_consultas = [0, 0.0]
+        if request.headers.get('X-Perfil') and current_user.is_authenticated and current_user.tipo == 'admin':
+            g.metricas_perfil = cProfile.Profile()
+            g.metricas_perfil.enable()
+
+    def _fim_requisicao(self, response):
+        endpoint = request.endpoint or 'nao_encontrado'
+        self.incrementar('portal_requisicoes_total', endpoint=endpoint, metodo=request.method, status=response.status_code)
+
+        perfil = g.pop('metricas_perfil', None)
+        if perfil is not None:
+            perfil.disable()
+            os.makedirs(self.pasta_perfis, exist_ok=True)
+            nome = f'{endpoint}-{time.time_ns()}.prof'
+            perfil.dump_stats(os.path.join(self.pasta_perfis, nome))
+            response.headers['X-Perfil-Arquivo'] = nome
+        return response
+
+    def _encerrar_requisicao(self, erro=None):
+        perfil = g.pop('metricas_perfil', None)
+        if perfil is not None:  # A requisição falhou antes de after_request
+            perfil.disable()
+        inicio = g.pop('metricas_inicio', None)
+        if inicio is None:
+            return
+        endpoint = request.endpoint or 'nao_encontrado'
+        if erro is not None:
+            self.incrementar('portal_requisicoes_total', endpoint=endpoint, metodo=request.method, status=500)
+        consultas, segundos = g.pop('metricas_consultas')
+        self.observar('portal_requisicao_segundos', time.perf_counter() - inicio, endpoint=endpoint)
+        self.observar('portal_sql_consultas_por_requisicao', consultas, endpoint=endpoint)
+        self.incrementar('portal_sql_consultas_total', consultas, endpoint=endpoint)
+        self.incrementar('portal_sql_segundos_total', segundos, endpoint=endpoint)
+
+    # Templates (pilha, porque um template pode ser renderizado dentro de outra renderização)
+    def _inicio_template(self, app, template, context, **extra):
+        g.setdefault('metricas_templates', []).append(time.perf_counter())
+
+    def _fim_template(self, app, template, context, **extra):
+        pilha = g.get('metricas_templates')
+        if pilha:
+            self.observar('portal_template_segundos', time.perf_counter() - pilha.pop(), template=template.name)
+
+    # Consultas SQL
+    def _inicio_consulta(self, conexao, cursor, sql, parametros, contexto, varios):
+        conexao.info.setdefault('metricas_inicio', []).append(time.perf_counter())
+
+    def _fim_consulta(self, conexao, cursor, sql, parametros, contexto, varios):
+        segundos = time.perf_counter() - conexao.info['metricas_inicio'].pop()
+        if has_request_context() and 'metricas_consultas' in g:
+            g.metricas_consultas[0] += 1
+            g.metricas_consultas[1] += segundos
+        else:
+            self.incrementar('portal_sql_consultas_total', endpoint='-')
+            self.incrementar('portal_sql_segundos_total', segundos, endpoint='-')
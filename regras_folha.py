@@ -0,0 +1,127 @@
+# Regras da folha de pagamento: tabelas de valores com vigência por mês
+#
+# Cada versão da tabela vale a partir do mês em "vigencia" até a próxima e
+# só precisa trazer o que mudou; o resto é herdado da versão anterior. As
+# tabelas são lidas uma vez (das TABELAS_PADRAO ou de um JSON em
+# FOLHA_TABELAS) e cada versão vira um RegrasFolha com as faixas do INSS e
+# os fatores já calculados, para que holerites e rescisões em lote só
+# consultem valores prontos.
+import json
+from bisect import bisect_left, bisect_right
+from datetime import date
+
+from apuracao import JORNADA_PADRAO
+
+# INSS: lista de [teto da faixa, alíquota], em ordem; teto None = sem limite.
+TABELAS_PADRAO = [
+    {
+        'vigencia': '2000-01',
+        'salario_padrao': 1940.00,
+        'dias_uteis': 22,
+        'horas_dia': JORNADA_PADRAO / 3600,
+        'adicional_extra': 1.5,  # 50% a mais para horas extras
+        'inss': [[None, 0.08]],
+        'vale_transporte': 0.05,
+        'fgts': 0.08,
+        'multa_fgts': 0.4,  # 40% de multa sobre o FGTS na rescisão sem justa causa
+    },
+]
+
+
+class ErroTabelaFolha(ValueError):
+    pass
+
+
+def _mes(vigencia):
+    ano, mes = map(int, vigencia.split('-'))
+    if not 1 <= mes <= 12:
+        raise ErroTabelaFolha(f'vigência inválida: {vigencia}')
+    return ano * 12 + mes - 1
+
+
+class RegrasFolha:
+    def __init__(self, vigencia, salario_padrao, dias_uteis, horas_dia, adicional_extra, inss, vale_transporte, fgts, multa_fgts):
+        self.vigencia = vigencia
+        self.inicio = date(*map(int, vigencia.split('-')), 1)
+        self.salario_padrao = salario_padrao
+        self.dias_uteis = dias_uteis
+        self.horas_dia = horas_dia
+        self.horas_mes = dias_uteis * horas_dia
+        self.jornada = int(horas_dia * 3600)  # Segundos por dia
+        self.adicional_extra = adicional_extra
+        self.vale_transporte = vale_transporte
+        self.fgts = fgts
+        self.multa_fgts = multa_fgts
+
+        # Faixas progressivas: piso de cada faixa, alíquota e o desconto acumulado até o piso
+        self._pisos, self._aliquotas, self._acumulados = [], [], []
+        piso = acumulado = 0
+        for teto, aliquota in inss:
+            if teto is not None and teto <= piso:
+                raise ErroTabelaFolha(f'faixas do INSS fora de ordem em {vigencia}')
+            self._pisos.append(piso)
+            self._aliquotas.append(aliquota)
+            self._acumulados.append(acumulado)
+            if teto is None:
+                break
+            acumulado += (teto - piso) * aliquota
+            piso = teto
+        else:
+            # Última faixa com teto: acima dele o desconto não cresce
+            self._pisos.append(piso)
+            self._aliquotas.append(0)
+            self._acumulados.append(acumulado)
+
+    def salario(self, salario_mensal):
+        return self.salario_padrao if salario_mensal is None else salario_mensal
+
+    def valor_hora(self, salario_mensal):
+        return self.salario(salario_mensal) / self.horas_mes
+
+    def desconto_inss(self, base):
+        if base <= 0:
+            return 0.0
+        faixa = bisect_left(self._pisos, base) - 1
+        return self._acumulados[faixa] + (base - self._pisos[faixa]) * self._aliquotas[faixa]
+
+
+class TabelasFolha:
+    def __init__(self, versoes):
+        if not versoes:
+            raise ErroTabelaFolha('nenhuma tabela da folha informada')
+
+        self.versoes = []
+        atual = {}
+        for versao in sorted(versoes, key=lambda v: _mes(v['vigencia'])):
+            atual = {**atual, **versao}
+            try:
+                self.versoes.append(RegrasFolha(**atual))
+            except TypeError as erro:
+                raise ErroTabelaFolha(f"tabela de {versao['vigencia']} incompleta: {erro}")
+        self._inicios = [_mes(r.vigencia) for r in self.versoes]
+
+    @classmethod
+    def carregar(cls, caminho=None):
+        if not caminho:
+            return cls(TABELAS_PADRAO)
+        with open(caminho, encoding='utf-8') as arquivo:
+            return cls(json.load(arquivo))
+
+    def regras(self, ano, mes):
+        indice = bisect_right(self._inicios, ano * 12 + mes - 1) - 1
+        return self.versoes[max(indice, 0)]  # Antes da primeira vigência vale a primeira tabela
+
+    def regras_do_dia(self, dia=None):
+        dia = dia or date.today()
+        return self.regras(dia.year, dia.month)
+
+    def jornada(self, ano, mes):
+        return self.regras(ano, mes).jornada
+
+    def jornadas(self):
+        """[(início da vigência, segundos por dia)], só nas vigências em que a jornada muda."""
+        mudancas = []
+        for regras in self.versoes:
+            if not mudancas or mudancas[-1][1] != regras.jornada:
+                mudancas.append((regras.inicio, regras.jornada))
+        return mudancas
@@ -0,0 +1,194 @@
+# Fila de geração de PDFs (holerite e TRCT) fora do processo web
+#
+# Os PDFs são gerados por um pool limitado de processos. As rotas apenas
+# enfileiram o documento (template, contexto e, se o renderizador precisar,
+# o HTML) e devolvem o id do trabalho, que é consultado depois pela rota de
+# status e baixado quando estiver pronto.
+#
+# Com vários processos servindo o portal, a consulta de status pode chegar a
+# um processo diferente do que gerou o PDF. Por isso cada trabalho também fica
+# registrado em disco (pasta de trabalhos, um JSON por id) com o caminho do
+# arquivo onde o PDF pronto é gravado (o do cache de PDFs, quando houver);
+# os outros processos respondem a partir desse registro e do arquivo.
+import glob
+import json
+import os
+import threading
+import time
+import uuid
+from concurrent.futures import ProcessPoolExecutor
+
+from renderizadores import criar_renderizador
+
+
+class FilaCheia(Exception):
+    pass
+
+
+# Roda no processo gerador; devolve o PDF e o tempo gasto só na geração, sem a espera na fila
+def renderizar_medindo(renderizador, template, contexto, html):
+    inicio = time.perf_counter()
+    pdf = renderizador.renderizar(template, contexto, html)
+    return pdf, time.perf_counter() - inicio
+
+
+class TrabalhoPdf:
+    def __init__(self, id, user_id, nome_arquivo, futuro, etag=None):
+        self.id = id
+        self.user_id = user_id
+        self.nome_arquivo = nome_arquivo
+        self.futuro = futuro
+        self.etag = etag
+        self.arquivo = None  # Onde o PDF pronto fica gravado
+        self.criado_em = time.time()
+
+    @property
+    def status(self):
+        if not self.futuro.done():
+            return 'pendente'
+        if self.futuro.exception() is not None:
+            return 'erro'
+        return 'concluido'
+
+    @property
+    def pdf(self):
+        return self.futuro.result()[0]
+
+
+# Trabalho de outro processo, lido do registro em disco
+class TrabalhoGravado:
+    def __init__(self, registro, validade):
+        self.id = registro['id']
+        self.user_id = registro['user_id']
+        self.nome_arquivo = registro['nome_arquivo']
+        self.etag = registro['etag']
+        self.arquivo = registro['arquivo']
+        self.criado_em = registro['criado_em']
+        self._status = registro['status']
+        self._validade = validade
+
+    @property
+    def status(self):
+        if self._status == 'pendente':
+            # O arquivo pode ter sido gravado antes do registro ser atualizado; sem ele, depois
+            # da validade, o processo que gerava o PDF terminou sem concluir
+            if os.path.exists(self.arquivo):
+                return 'concluido'
+            if self.criado_em < time.time() - self._validade:
+                return 'erro'
+        return self._status
+
+    @property
+    def pdf(self):
+        with open(self.arquivo, 'rb') as arquivo:
+            return arquivo.read()
+
+
+class FilaPdf:
+    def __init__(self, app=None):
+        self.processos = 2
+        self.maximo_pendentes = 100
+        self.validade = 600  # Segundos que um PDF pronto fica disponível para download
+        self.pasta = None  # Registros dos trabalhos, compartilhados entre processos
+        self.renderizador = None
+        self.ao_medir = None  # Chamado com (template, segundos) a cada PDF gerado
+        self._executor = None
+        self._trabalhos = {}
+        self._trava = threading.Lock()
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        self.processos = app.config.get('PDF_PROCESSOS', self.processos)
+        self.maximo_pendentes = app.config.get('PDF_FILA_MAXIMA', self.maximo_pendentes)
+        self.validade = app.config.get('PDF_VALIDADE', self.validade)
+        self.pasta = app.config.get('PDF_TRABALHOS_PASTA') or os.path.join(app.instance_path, 'pdf_trabalhos')
+        self.renderizador = criar_renderizador(app.config)
+
+    def enfileirar(self, template, contexto, user_id, nome_arquivo, html=None, etag=None, ao_concluir=None, arquivo=None):
+        """arquivo: onde ao_concluir grava o PDF pronto; sem ele, a própria fila grava na pasta de trabalhos."""
+        with self._trava:
+            self._limpar()
+            pendentes = sum(1 for t in self._trabalhos.values() if not t.futuro.done())
+            if pendentes >= self.maximo_pendentes:
+                raise FilaCheia()
+
+            if self._executor is None:
+                self._executor = ProcessPoolExecutor(max_workers=self.processos)
+
+            futuro = self._executor.submit(renderizar_medindo, self.renderizador, template, contexto, html)
+            if self.ao_medir is not None:
+                futuro.add_done_callback(lambda f: f.exception() is None and self.ao_medir(template, f.result()[1]))
+            trabalho = TrabalhoPdf(uuid.uuid4().hex, user_id, nome_arquivo, futuro, etag)
+            if self.pasta is not None:
+                trabalho.arquivo = arquivo or os.path.join(self.pasta, f'{trabalho.id}.pdf')
+                self._registrar(trabalho, 'pendente')
+            futuro.add_done_callback(lambda f: self._concluir(trabalho, ao_concluir, gravar=arquivo is None))
+            self._trabalhos[trabalho.id] = trabalho
+            return trabalho
+
+    def obter(self, id):
+        with self._trava:
+            trabalho = self._trabalhos.get(id)
+        if trabalho is not None or self.pasta is None or not id.isalnum():
+            return trabalho
+
+        try:
+            with open(os.path.join(self.pasta, f'{id}.json'), encoding='utf-8') as arquivo:
+                trabalho = TrabalhoGravado(json.load(arquivo), self.validade)
+        except (FileNotFoundError, ValueError):
+            return None
+        # PDF pronto que já saiu do cache (dados alterados ou limite de tamanho): o trabalho expirou
+        if trabalho.status == 'concluido' and not os.path.exists(trabalho.arquivo):
+            return None
+        return trabalho
+
+    # Grava o PDF (no cache, por ao_concluir, ou na pasta de trabalhos) antes de marcar o trabalho como concluído
+    def _concluir(self, trabalho, ao_concluir, gravar):
+        if trabalho.futuro.cancelled() or trabalho.futuro.exception() is not None:
+            self._registrar(trabalho, 'erro')
+            return
+        pdf = trabalho.pdf
+        if ao_concluir is not None:
+            ao_concluir(pdf)
+        if gravar and trabalho.arquivo is not None:
+            self._gravar(trabalho.arquivo, pdf)
+        self._registrar(trabalho, 'concluido')
+
+    def _registrar(self, trabalho, status):
+        if trabalho.arquivo is None:
+            return
+        registro = {
+            'id': trabalho.id, 'user_id': trabalho.user_id, 'nome_arquivo': trabalho.nome_arquivo, 'etag': trabalho.etag,
+            'arquivo': trabalho.arquivo, 'criado_em': trabalho.criado_em, 'status': status,
+        }
+        self._gravar(os.path.join(self.pasta, f'{trabalho.id}.json'), json.dumps(registro).encode('utf-8'))
+
+    @staticmethod
+    def _gravar(caminho, conteudo):
+        os.makedirs(os.path.dirname(caminho), exist_ok=True)
+        temporario = f'{caminho}.{threading.get_ident()}.tmp'
+        with open(temporario, 'wb') as arquivo:
+            arquivo.write(conteudo)
+        os.replace(temporario, caminho)
+
+    def encerrar(self):
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+
+    def _limpar(self):
+        limite = time.time() - self.validade
+        expirados = [id for id, t in self._trabalhos.items() if t.futuro.done() and t.criado_em < limite]
+        for id in expirados:
+            del self._trabalhos[id]
+
+        # Registros (e PDFs sem cache) de todos os processos; os pendentes antigos são de processos que pararam
+        if self.pasta is None:
+            return
+        for caminho in glob.glob(os.path.join(self.pasta, '*.json')) + glob.glob(os.path.join(self.pasta, '*.pdf')):
+            try:
+                if os.path.getmtime(caminho) < limite:
+                    os.remove(caminho)
+            except FileNotFoundError:
+                pass
@@ -0,0 +1,147 @@
+# Renderizadores de PDF para os documentos do portal (holerite e TRCT)
+#
+# Todos recebem o nome do template, o contexto usado nele e, quando o
+# renderizador precisa, o HTML já renderizado. O de wkhtmltopdf converte o
+# HTML em um processo externo; o de ReportLab desenha os mesmos documentos
+# direto no processo, sem passar por HTML.
+import io
+
+import pdfkit
+
+
+class Renderizador:
+    precisa_html = True
+
+    def renderizar(self, template, contexto, html=None):
+        raise NotImplementedError
+
+
+class RenderizadorWkhtmltopdf(Renderizador):
+    def __init__(self, wkhtmltopdf):
+        self.wkhtmltopdf = wkhtmltopdf
+
+    def renderizar(self, template, contexto, html=None):
+        config = pdfkit.configuration(wkhtmltopdf=self.wkhtmltopdf)
+        return pdfkit.from_string(html, False, configuration=config)
+
+
+class RenderizadorReportlab(Renderizador):
+    precisa_html = False
+
+    def renderizar(self, template, contexto, html=None):
+        from reportlab.lib.pagesizes import A4
+        from reportlab.pdfgen.canvas import Canvas
+
+        desenhar = {
+            'holerite.html': desenhar_holerite,
+            'trct_pdf.html': desenhar_trct,
+        }[template]
+
+        saida = io.BytesIO()
+        canvas = Canvas(saida, pagesize=A4, pageCompression=1)
+        desenhar(Pagina(canvas, *A4), contexto)
+        canvas.showPage()
+        canvas.save()
+        return saida.getvalue()
+
+
+# Cursor de escrita de cima para baixo, com margens iguais às dos templates (40px)
+class Pagina:
+    def __init__(self, canvas, largura, altura, margem=40):
+        self.canvas = canvas
+        self.largura = largura
+        self.margem = margem
+        self.y = altura - margem
+
+    def titulo(self, texto):
+        self.y -= 20
+        self.canvas.setFont('Helvetica-Bold', 16)
+        self.canvas.drawCentredString(self.largura / 2, self.y, texto)
+        self.y -= 30
+
+    def campo(self, rotulo, valor, tamanho=11):
+        self.canvas.setFont('Helvetica-Bold', tamanho)
+        self.canvas.drawString(self.margem, self.y, f'{rotulo}:')
+        largura_rotulo = self.canvas.stringWidth(f'{rotulo}: ', 'Helvetica-Bold', tamanho)
+        self.canvas.setFont('Helvetica', tamanho)
+        self.canvas.drawString(self.margem + largura_rotulo, self.y, str(valor))
+        self.y -= tamanho + 8
+
+    def linha_tabela(self, descricao, valor, negrito=False):
+        fonte = 'Helvetica-Bold' if negrito else 'Helvetica'
+        direita = self.largura - self.margem
+        meio = self.margem + (direita - self.margem) * 0.6
+        self.canvas.rect(self.margem, self.y - 8, direita - self.margem, 24)
+        self.canvas.line(meio, self.y - 8, meio, self.y + 16)
+        self.canvas.setFont(fonte, 11)
+        self.canvas.drawString(self.margem + 8, self.y, descricao)
+        self.canvas.drawString(meio + 8, self.y, str(valor))
+        self.y -= 24
+
+    def separador(self):
+        self.y -= 6
+        self.canvas.line(self.margem, self.y, self.largura - self.margem, self.y)
+        self.y -= 20
+
+    def espaco(self, altura=20):
+        self.y -= altura
+
+
+def desenhar_holerite(pagina, contexto):
+    pagina.titulo(f"Holerite = {contexto['mes']}")
+    pagina.campo('Funcionário', contexto['nome'])
+    pagina.campo('Mês', contexto['mes'])
+    pagina.campo('Dias Trabalhados', contexto['dias'])
+    pagina.campo('Horas Trabalhadas', contexto['horas'])
+    pagina.espaco()
+
+    pagina.linha_tabela('Descrição', 'Valor (R$)', negrito=True)
+    if 'valor_liquido' in contexto:
+        pagina.linha_tabela('Salário Proporcional', contexto['valor_base'])
+        pagina.linha_tabela('Horas Extras', contexto['valor_extras'])
+        pagina.linha_tabela('Desconto INSS', contexto['desconto_inss'])
+        pagina.linha_tabela('Desconto VT', contexto['desconto_vt'])
+        pagina.linha_tabela('Valor líquido', contexto['valor_liquido'], negrito=True)
+    else:
+        pagina.linha_tabela('Salário Proporcional', contexto['salario'])
+        pagina.linha_tabela('Descontos', '0.00')
+        pagina.linha_tabela('Valor líquido', contexto['salario'], negrito=True)
+
+
+def desenhar_trct(pagina, contexto):
+    funcionario, trct = contexto['funcionario'], contexto['trct']
+
+    pagina.titulo('TRCT - Termo de Rescisão do Contrato de Trabalho')
+    pagina.campo('Nome do Funcionário', funcionario['nome'])
+    pagina.campo('CPF', funcionario['cpf'] or '—')
+    pagina.campo('Email', funcionario['email'])
+    pagina.campo('Data de Admissão', trct['admissao'])
+    pagina.campo('Data de Demissão', trct['demissao'])
+    pagina.campo('Motivo da Rescisão', trct['motivo_rescisao'])
+    pagina.separador()
+
+    pagina.campo('Saldo de Salário', f"R$ {trct['saldo_salario']}")
+    pagina.campo('Férias Vencidas + 1/3', f"R$ {trct['ferias_vencidas']}")
+    pagina.campo('Férias Proporcionais + 1/3', f"R$ {trct['ferias_proporcionais']}")
+    pagina.campo('13º Salário Proporcional', f"R$ {trct['decimo_terceiro']}")
+    pagina.campo('Multa do FGTS (40%)', f"R$ {trct['multa_fgts']}")
+    pagina.separador()
+
+    pagina.campo('Desconto INSS (8%)', f"-R$ {trct['desconto_inss']}")
+    pagina.campo('Desconto VT (5%)', f"-R$ {trct['desconto_vt']}")
+    pagina.separador()
+
+    pagina.campo('Total Líquido a Receber', f"R$ {trct['total_liquido']}", tamanho=13)
+    pagina.espaco(40)
+    pagina.campo('Assinatura do Empregador', '_' * 44)
+    pagina.campo('Assinatura do Funcionário', '_' * 44)
+    pagina.campo('Data', '____/____/______')
+
+
+def criar_renderizador(config):
+    nome = config.get('PDF_RENDERIZADOR', 'wkhtmltopdf')
+    if nome == 'wkhtmltopdf':
+        return RenderizadorWkhtmltopdf(config['WKHTMLTOPDF'])
+    if nome == 'reportlab':
+        return RenderizadorReportlab()
+    raise ValueError(f'Renderizador de PDF desconhecido: {nome}')
@@ -0,0 +1,105 @@
+# Cálculo do TRCT (rescisão) em lote, para simular desligamentos em massa
+#
+# Os funcionários são carregados em colunas (array) a partir de tuplas
+# (user_id, salario_mensal, data_admissao) e cada verba do TRCT é calculada
+# coluna a coluna, com as mesmas fórmulas e arredondamentos de calcular_trct,
+# para que um departamento inteiro (ou a empresa toda) seja simulado numa
+# única passada, sem objetos do ORM. Alíquotas e salário padrão vêm das
+# regras da folha vigentes no mês de cada demissão.
+from array import array
+from datetime import date
+
+SEM_SALARIO = -1.0  # Marca salário não informado; vale o salário padrão das regras
+
+VERBAS = [
+    'saldo_salario', 'ferias_vencidas', 'ferias_proporcionais', 'decimo_terceiro',
+    'multa_fgts', 'desconto_inss', 'desconto_vt', 'total_liquido',
+]
+CABECALHO = ['funcionario_id', 'nome', 'admissao', 'demissao'] + VERBAS
+
+
+class ColunasRescisao:
+    def __init__(self):
+        self.user_ids = array('q')
+        self.salarios = array('d')
+        self.admissoes = array('l')  # date.toordinal()
+        self.demissoes = array('l')
+
+    def __len__(self):
+        return len(self.user_ids)
+
+    @classmethod
+    def de_linhas(cls, linhas, demissao):
+        """Monta as colunas; demissao é uma data única ou um dicionário user_id -> data."""
+        colunas = cls()
+        por_funcionario = isinstance(demissao, dict)
+        for user_id, salario, admissao in linhas:
+            dia = demissao[user_id] if por_funcionario else demissao
+            colunas.user_ids.append(user_id)
+            colunas.salarios.append(SEM_SALARIO if salario is None else salario)
+            colunas.admissoes.append((admissao or dia).toordinal())  # Sem admissão, conta como admitido no dia
+            colunas.demissoes.append(dia.toordinal())
+        return colunas
+
+
+class Rescisoes:
+    def __init__(self, colunas, verbas):
+        self.colunas = colunas
+        self.verbas = verbas  # Nome da verba -> array('d') alinhado às colunas
+
+    def __len__(self):
+        return len(self.colunas)
+
+    def total(self, verba='total_liquido'):
+        return round(sum(self.verbas[verba]), 2)
+
+    def totais(self):
+        return {verba: self.total(verba) for verba in VERBAS}
+
+    def linhas(self, nomes=None):
+        """Percorre as rescisões nas colunas de CABECALHO; nomes é um dicionário user_id -> nome."""
+        colunas = [self.verbas[verba] for verba in VERBAS]
+        for i, user_id in enumerate(self.colunas.user_ids):
+            yield [
+                user_id,
+                (nomes or {}).get(user_id, ''),
+                date.fromordinal(self.colunas.admissoes[i]).isoformat(),
+                date.fromordinal(self.colunas.demissoes[i]).isoformat(),
+            ] + [coluna[i] for coluna in colunas]
+
+
+def calcular_rescisoes(colunas, tabelas):
+    admissoes = [date.fromordinal(o) for o in colunas.admissoes]
+    demissoes = [date.fromordinal(o) for o in colunas.demissoes]
+    regras = [tabelas.regras(d.year, d.month) for d in demissoes]
+    salarios = [r.salario_padrao if s == SEM_SALARIO else s for s, r in zip(colunas.salarios, regras)]
+
+    # Meses entre admissão e demissão e mês da demissão, por funcionário
+    meses = [(d.year - a.year) * 12 + (d.month - a.month) for a, d in zip(admissoes, demissoes)]
+    mes_demissao = [d.month for d in demissoes]
+    dia_demissao = [d.day for d in demissoes]
+    duodecimos = [s / 12 for s in salarios]
+
+    saldo_salario = array('d', [round((s / 30) * dia, 2) for s, dia in zip(salarios, dia_demissao)])
+    ferias_vencidas = array('d', [round(s + (s / 3), 2) for s in salarios])
+    ferias_proporcionais = array('d', [round((u * m) + ((u * m) / 3), 2) for u, m in zip(duodecimos, meses)])
+    decimo_terceiro = array('d', [round(u * mes, 2) for u, mes in zip(duodecimos, mes_demissao)])
+    multa_fgts = array('d', [round(round((s * r.fgts) * m, 2) * r.multa_fgts, 2) for s, m, r in zip(salarios, meses, regras)])
+    desconto_inss = array('d', [round(r.desconto_inss(s), 2) for s, r in zip(salarios, regras)])
+    desconto_vt = array('d', [round(s * r.vale_transporte, 2) for s, r in zip(salarios, regras)])
+    total_liquido = array('d', [
+        round(saldo + vencidas + proporcionais + decimo + multa - inss - vt, 2)
+        for saldo, vencidas, proporcionais, decimo, multa, inss, vt in zip(
+            saldo_salario, ferias_vencidas, ferias_proporcionais, decimo_terceiro, multa_fgts, desconto_inss, desconto_vt)
+    ])
+
+    return Rescisoes(colunas, {
+        'saldo_salario': saldo_salario,
+        'ferias_vencidas': ferias_vencidas,
+        'ferias_proporcionais': ferias_proporcionais,
+        'decimo_terceiro': decimo_terceiro,
+        'multa_fgts': multa_fgts,
+        'desconto_inss': desconto_inss,
+        'desconto_vt': desconto_vt,
+        'total_liquido': total_liquido,
+    })
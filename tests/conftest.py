@@ -0,0 +1,17 @@
+import os
+import sys
+import tempfile
+
+import pytest
+
+RAIZ = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, RAIZ)
+
+# O app cria o banco ao ser importado; nos testes ele fica numa pasta temporária
+os.environ['DATABASE_URL'] = 'sqlite:///' + os.path.join(tempfile.mkdtemp(), 'testes.db')
+
+
+@pytest.fixture(scope='session')
+def app_modulo():
+    import app
+    return app
@@ -0,0 +1,65 @@
+"""calcular_rescisoes (em colunas) tem de dar, verba a verba, o mesmo que calcular_trct."""
+from datetime import date
+from types import SimpleNamespace
+
+import pytest
+
+from regras_folha import TabelasFolha, TABELAS_PADRAO
+from rescisao import ColunasRescisao, calcular_rescisoes, CABECALHO, VERBAS
+
+# Faixas progressivas do INSS (tabela de 2024), vigentes a partir de 2024-01
+FAIXAS_INSS = [[1412.00, 0.075], [2666.68, 0.09], [4000.03, 0.12], [7786.02, 0.14]]
+TABELAS = TabelasFolha(TABELAS_PADRAO + [{'vigencia': '2024-01', 'inss': FAIXAS_INSS}])
+
+
+def comparar(app_modulo, monkeypatch, funcionarios, demissao):
+    monkeypatch.setattr(app_modulo, 'tabelas_folha', TABELAS)
+    linhas = [(f.id, f.salario_mensal, f.data_admissao) for f in funcionarios]
+    rescisoes = calcular_rescisoes(ColunasRescisao.de_linhas(linhas, demissao), TABELAS)
+
+    assert len(rescisoes) == len(funcionarios)
+    for funcionario, linha in zip(funcionarios, rescisoes.linhas()):
+        calculado = dict(zip(CABECALHO, linha))
+        esperado = app_modulo.calcular_trct(funcionario, demissao)
+        assert calculado['funcionario_id'] == funcionario.id
+        for verba in VERBAS:
+            assert calculado[verba] == esperado[verba], (funcionario, verba)
+
+
+def funcionario(id_, salario=2500.00, admissao=date(2020, 5, 11)):
+    return SimpleNamespace(id=id_, salario_mensal=salario, data_admissao=admissao)
+
+
+@pytest.mark.parametrize('demissao', [
+    date(2024, 1, 15),  # Janeiro: 13º de um mês só
+    date(2024, 12, 31),  # Dezembro: 13º inteiro
+    date(2024, 2, 29),
+    date(2023, 7, 19),  # Antes das faixas progressivas: alíquota única
+])
+def test_datas_de_demissao(app_modulo, monkeypatch, demissao):
+    comparar(app_modulo, monkeypatch, [funcionario(1), funcionario(2, 1412.00, date(2015, 12, 1))], demissao)
+
+
+def test_sem_data_de_admissao(app_modulo, monkeypatch):
+    comparar(app_modulo, monkeypatch, [funcionario(1, admissao=None)], date(2024, 6, 10))
+
+
+def test_sem_salario_usa_o_salario_padrao(app_modulo, monkeypatch):
+    comparar(app_modulo, monkeypatch, [funcionario(1, salario=None), funcionario(2, salario=None, admissao=None)], date(2024, 6, 10))
+
+
+@pytest.mark.parametrize('admissao, demissao', [
+    (date(2024, 3, 10), date(2024, 3, 25)),  # Mesmo mês
+    (date(2024, 3, 20), date(2024, 4, 5)),  # Virada de mês sem um mês completo
+    (date(2023, 12, 28), date(2024, 1, 3)),  # Virada de ano
+])
+def test_demissao_antes_do_primeiro_mes_completo(app_modulo, monkeypatch, admissao, demissao):
+    comparar(app_modulo, monkeypatch, [funcionario(1, admissao=admissao)], demissao)
+
+
+def test_salarios_nos_limites_das_faixas_do_inss(app_modulo, monkeypatch):
+    salarios = [0.0, 0.01]
+    for teto, _ in FAIXAS_INSS:
+        salarios += [round(teto - 0.01, 2), teto, round(teto + 0.01, 2)]
+    funcionarios = [funcionario(i, salario) for i, salario in enumerate(salarios, 1)]
+    comparar(app_modulo, monkeypatch, funcionarios, date(2024, 8, 20))